@@ -7,13 +7,16 @@
 # This code is licensed for use and distribution under the GPLv3+
 #
 
-import requests
+# requests, dnspython, the html parser and the thread pool are imported
+# where they are first used, so that the CLI and the Ansible modules start
+# quickly and only pay for what an action actually needs.
+import contextlib
+import random
 import socket
+import threading
 import time
 import sys
-from dns.resolver import NXDOMAIN, Resolver, LifetimeTimeout
-from bs4 import BeautifulSoup
-from requests.auth import HTTPBasicAuth
+from bawuenet.domains.zone import Record, Zone
 
 def error(msg):
     sys.stderr.write("ERROR:   " + msg + "\n")
@@ -24,6 +27,20 @@ def warn(msg):
 class DomainsAPI:
     base_url = "https://my.bawue.net/domains.php"
     auth_ns = "ns1.bawue.net"
+    auth_ns_port = 53
+    # seconds to wait for a change to show up on the name server
+    wait_timeout = 660
+    # first poll interval, growth factor and longest poll interval
+    poll_schedule = (1, 2, 30)
+    # connect and read timeout of requests to the web interface
+    request_timeout = (5, 30)
+    # repetitions of a failed request, first and longest pause between them
+    retries = 4
+    retry_backoff = (0.5, 30)
+    # answers after which a request is repeated
+    retry_status = (429, 500, 502, 503, 504)
+    # seconds a zone, kept up to date with our own changes, is reused
+    zone_ttl = 60
 
     type_table = {
         "A": 1,
@@ -35,12 +52,163 @@ class DomainsAPI:
         "SRV": 512,
     }
 
-    def __init__(self, username, password):
-        self.session = requests.Session()
-        self.session.auth = HTTPBasicAuth(username, password)
+    def __init__(
+        self,
+        username,
+        password,
+        cache=None,
+        pool_size=10,
+        timings=None,
+        throttle=None,
+        journal=None,
+    ):
+        self.username = username
+        self.password = password
+        self.cache = cache
+        self.pool_size = pool_size
+        # a bawuenet.domains.timings.Timings collecting the phases of calls
+        self.timings = timings
+        # a bawuenet.domains.throttle.Throttle limiting the requests
+        self.throttle = throttle
+        # a bawuenet.domains.journal.Journal recording the mutations
+        self.journal = journal
+        # domain -> (Zone, time it was known to be current)
+        self._zones = {}
+        # domain -> lock held while changing it
+        self._domain_locks = {}
+        self._zones_lock = threading.Lock()
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._resolver = None
+
+    @property
+    def session(self):
+        """The HTTP session, created on first use"""
+        with self._session_lock:
+            if self._session is None:
+                import requests
+                from requests.auth import HTTPBasicAuth
+
+                session = requests.Session()
+                session.auth = HTTPBasicAuth(self.username, self.password)
+                self._mount_pool(session, self.pool_size)
+                self._session = session
+            return self._session
+
+    @session.setter
+    def session(self, session):
+        self._session = session
+
+    def _mount_pool(self, session, pool_size):
+        """Keep up to pool_size connections to the web interface open"""
+        from requests.adapters import HTTPAdapter
+
+        self.pool_size = pool_size
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+    def _span(self, phase):
+        """Time a phase if timings are collected"""
+        if self.timings is None:
+            from bawuenet.domains.timings import NULL_SPAN
+
+            return NULL_SPAN
+        return self.timings.span(phase)
+
+    def _get(self, params=None, idempotent=True, **kwargs):
+        """Send a request to the web interface
+
+        Failed requests are repeated after a jittered, exponentially
+        growing pause (or as long as Retry-After asks for). Requests which
+        are not idempotent are only repeated if they cannot have reached
+        the server.
+        """
+        import requests
+
+        attempt = 0
+        while True:
+            try:
+                with contextlib.ExitStack() as stack:
+                    if self.throttle is not None:
+                        with self._span("throttle"):
+                            stack.enter_context(self.throttle.slot())
+                    with self._span("http") as span:
+                        r = self.session.get(
+                            "%s" % self.base_url,
+                            params=params,
+                            timeout=self.request_timeout,
+                            **kwargs,
+                        )
+                        if kwargs.get("stream"):
+                            span.bytes = int(r.headers.get("Content-Length") or 0)
+                        else:
+                            span.bytes = len(r.content)
+            except requests.RequestException as exc:
+                # a connect timeout means that the request was never sent
+                retry = isinstance(exc, requests.ConnectTimeout) or (
+                    idempotent
+                    and isinstance(exc, (requests.ConnectionError, requests.Timeout))
+                )
+                if not retry or attempt >= self.retries:
+                    raise RuntimeError(f"Request failed due to {exc}")
+                delay = self._backoff(attempt)
+            else:
+                if (
+                    attempt >= self.retries
+                    or r.status_code not in self.retry_status
+                    or not (idempotent or r.status_code == 429)
+                ):
+                    return r
+                delay = max(self._backoff(attempt), self._retry_after(r))
+                r.close()
+            with self._span("retry"):
+                time.sleep(delay)
+            attempt += 1
+
+    def _backoff(self, attempt):
+        """Pause before repeating a request for the attempt-th time"""
+        first, longest = self.retry_backoff
+        return random.uniform(0, min(longest, first * 2**attempt))
+
+    @staticmethod
+    def _retry_after(r):
+        """Seconds a server asked to wait with Retry-After, else 0"""
+        value = r.headers.get("Retry-After")
+        if not value:
+            return 0
+        try:
+            return max(0, float(value))
+        except ValueError:
+            pass
+        from email.utils import parsedate_to_datetime
+
+        try:
+            return max(0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0
+
+    def _cached(self, key, fetch):
+        """Return a value from the cache, calling fetch() on a miss"""
+        if self.cache is None:
+            return fetch()
+        value = self.cache.get(self.username, key)
+        if value is None:
+            value = fetch()
+            self.cache.set(self.username, key, value)
+        return value
+
+    def _invalidate(self, domain):
+        """Forget the cached zone of a modified domain"""
+        if self.cache is not None:
+            self.cache.invalidate(self.username, "zone:" + domain)
 
     def parse_html_table(self, table, formdata=False):
-        """Parse a html table, return headers and data"""
+        """Parse a html table, return headers and data
+
+        Expects a BeautifulSoup element; the pages of the web interface are
+        parsed with the faster bawuenet.domains.parser.extract_table.
+        """
         headers = [x.text for x in table.find("tr").find_all("th")]
         data = []
         metadata = []
@@ -64,12 +232,16 @@ class DomainsAPI:
 
     def get_domain_data(self):
         """Get user owned domains"""
-        r = self.session.get("%s" % self.base_url)
+        return self._cached("domains", self._fetch_domain_data)
+
+    def _fetch_domain_data(self):
+        from bawuenet.domains.parser import extract_table
+
+        r = self._get()
         if not r.ok:
             raise RuntimeError(f"Request failed due to {r.reason} ({r.status_code})")
-        soup = BeautifulSoup(r.text, "html.parser")
-        data = soup.find("table")
-        headers, data = self.parse_html_table(data)
+        with self._span("parse"):
+            headers, data = extract_table(r.text)
         return (headers[:-1], [x[:-1] for x in data])
 
     def get_domains(self):
@@ -78,108 +250,574 @@ class DomainsAPI:
 
     def get_domain_records(self, domain):
         """Get RRs from a domain"""
+        return self._cached(
+            "zone:" + domain, lambda: self._fetch_domain_records(domain)
+        )
+
+    def _fetch_domain_records(self, domain):
         params = {"domain": domain, "action": "edit"}
-        r = self.session.get("%s" % self.base_url, params=params)
+        r = self._get(params)
         if not r.ok:
             raise RuntimeError(f"Request failed due to {r.reason} ({r.status_code})")
-        soup = BeautifulSoup(r.text, "html.parser")
-        data = soup.find("table")
-        headers, data, metadata = self.parse_html_table(data, True)
+        return self._parse_zone_page(r.text)
+
+    def _parse_zone_page(self, html):
+        """Headers and rows (with the delete form as metadata) of a zone page"""
+        from bawuenet.domains.parser import extract_table
+
+        with self._span("parse"):
+            headers, data, metadata = extract_table(html, True)
         table = []
         for idx in range(len(data)):
             table.append(data[idx] + [metadata[idx]])
         return (headers + ["metadata"], table)
 
-    def add_record(self, domain, host, dnstype, rr):
-        """Add a record to the DNS"""
-        fullhost = host + "." + domain
-        headers, records = self.get_domain_records(domain)
-        # keep only the records fitting our criteria
-        records = [
-            y
-            for y in [dict(zip(headers, x)) for x in records]
-            if y["Owner"] == fullhost and y["Ressource Record"] == rr
-        ]
-        if records:
-            warn(f"Record {fullhost} with ressource {rr} already exists")
-            return None  # nothing to be done
-        params = {
-            "owner": host,
+    def iter_domain_records(self, domain):
+        """Yield the RRs of a domain one by one while the page is parsed
+
+        Every record is a dict of the columns of get_domain_records. A
+        cached zone is reused, but a freshly fetched one is not cached, so
+        that memory stays flat however large the zone is.
+        """
+        from bawuenet.domains.parser import CHUNK_SIZE, iter_table
+
+        cached = None
+        if self.cache is not None:
+            cached = self.cache.get(self.username, "zone:" + domain)
+        if cached is not None:
+            headers, table = cached
+            for row in table:
+                yield dict(zip(headers, row))
+            return
+        params = {"domain": domain, "action": "edit"}
+        r = self._get(params, stream=True)
+        try:
+            if not r.ok:
+                raise RuntimeError(
+                    f"Request failed due to {r.reason} ({r.status_code})"
+                )
+            if r.encoding is None:
+                r.encoding = "utf-8"
+            chunks = r.iter_content(CHUNK_SIZE, decode_unicode=True)
+            for headers, data, metadata in iter_table(chunks, True):
+                record = dict(zip(headers, data))
+                record["metadata"] = metadata
+                yield record
+        finally:
+            r.close()
+
+    def get_all_domain_records(self, domains=None, max_workers=8):
+        """Get RRs from many domains (default: all) concurrently
+
+        Yields (domain, headers, records) tuples as soon as each zone has
+        been fetched, so the order is not predictable.
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        if domains is None:
+            domains = self.get_domains()
+        if max_workers > self.pool_size:
+            self._mount_pool(self.session, max_workers)
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        futures = {
+            executor.submit(self.get_domain_records, domain): domain
+            for domain in domains
+        }
+        try:
+            for future in as_completed(futures):
+                headers, records = future.result()
+                yield (futures[future], headers, records)
+        finally:
+            # the caller might stop early or a zone might fail
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    @staticmethod
+    def fullhost(host, domain):
+        """Owner name as shown by the web interface, @ is the domain itself"""
+        if host in ("", "@"):
+            return domain
+        return host + "." + domain
+
+    @staticmethod
+    def hostname(owner, domain):
+        """Host name relative to the domain, the reverse of fullhost"""
+        if owner == domain:
+            return "@"
+        if owner.endswith("." + domain):
+            return owner[: -len(domain) - 1]
+        return None
+
+    def _commit_params(self, domain, host, dnstype, rr):
+        """The parameters of an add request"""
+        return {
+            "owner": "" if host == "@" else host,
             "type": self.type_table[dnstype],
             "RRecord": rr,
             "Domainname": domain,
             "action": "domain-dns-admin-commit-zone-entry",
         }
-        r = self.session.get("%s" % self.base_url, params=params)
+
+    @staticmethod
+    def _delete_params(domain, rr_id):
+        """The parameters of a delete request"""
+        return {
+            "Domainname": domain,
+            "zoneentryid": rr_id,
+            "action": "domain-dns-admin-del-zone-entry",
+        }
+
+    def _check_answer(self, domain, r):
+        """Raise if a change was not accepted, the zone is unknown then"""
         if r.status_code != 200:
+            self._forget_zone(domain)
             raise RuntimeError(f"Request failed due to {r.reason} ({r.status_code})")
-        else:
-            return True
+
+    def _committed(self, domain, host, dnstype, rr, r):
+        """Update the zone kept with the answer to an add request"""
+        self._check_answer(domain, r)
+        if self._zone_from_page(domain, r.text) is None:
+            self._invalidate(domain)
+            zone = self._known_zone(domain)
+            if zone is not None:
+                # the entry id is unknown until the zone is fetched again
+                zone.add(Record(self.fullhost(host, domain), "IN", dnstype, rr))
+                zone.provisional = True
+
+    def _deleted(self, domain, rr_id, r):
+        """Update the zone kept with the answer to a delete request"""
+        if self._zone_from_page(domain, r.text) is None:
+            self._invalidate(domain)
+            zone = self._known_zone(domain)
+            if zone is not None and zone.get(rr_id) is not None:
+                zone.remove(zone.get(rr_id))
+
+    def _commit_record(self, domain, host, dnstype, rr):
+        """Send a single add request to the web interface"""
+        params = self._commit_params(domain, host, dnstype, rr)
+        # repeating it could add the record twice
+        r = self._get(params, idempotent=False)
+        self._committed(domain, host, dnstype, rr, r)
+
+    def _send_delete(self, domain, rr_id):
+        """Send a delete request, without looking at the returned zone"""
+        r = self._get(self._delete_params(domain, rr_id))
+        self._check_answer(domain, r)
+        return r
+
+    def _delete_record(self, domain, rr_id):
+        """Send a single delete request to the web interface"""
+        self._deleted(domain, rr_id, self._send_delete(domain, rr_id))
+
+    def _known_zone(self, domain):
+        """The zone kept for a domain, if it is still fresh"""
+        with self._zones_lock:
+            entry = self._zones.get(domain)
+        if entry is None or time.monotonic() - entry[1] >= self.zone_ttl:
+            return None
+        return entry[0]
+
+    def _keep_zone(self, domain, zone, replace=False):
+        """Remember a current zone, updating the Zone kept so far in place"""
+        with self._zones_lock:
+            entry = self._zones.get(domain)
+            if entry is not None and not replace:
+                entry[0].update(zone)
+                zone = entry[0]
+            self._zones[domain] = (zone, time.monotonic())
+        return zone
+
+    def _domain_lock(self, domain):
+        """The lock taken by apply_changes, one per domain"""
+        with self._zones_lock:
+            return self._domain_locks.setdefault(domain, threading.Lock())
+
+    def _forget_zone(self, domain):
+        self._invalidate(domain)
+        with self._zones_lock:
+            self._zones.pop(domain, None)
+
+    def _zone_from_page(self, domain, html):
+        """Keep the zone if a change was answered with the updated zone page"""
+        from bawuenet.domains.parser import NoTableError
+
+        try:
+            headers, table = self._parse_zone_page(html)
+        except NoTableError:
+            return None
+        if "Owner" not in headers or "Ressource Record" not in headers:
+            return None
+        if any(x[-1].get("Domainname", domain) != domain for x in table):
+            return None
+        if self.cache is not None:
+            self.cache.set(self.username, "zone:" + domain, (headers, table))
+        return self._keep_zone(domain, Zone.from_table(domain, headers, table))
+
+    def _refresh_zone(self, domain):
+        """Fetch a zone (unless cached) and keep it"""
+        zone = Zone.from_table(domain, *self.get_domain_records(domain))
+        return self._keep_zone(domain, zone)
+
+    def get_zone(self, domain):
+        """Get the records of a domain as an indexed Zone
+
+        The Zone is kept and patched with the changes made through this
+        object, so that consecutive operations reuse it for zone_ttl
+        seconds instead of fetching the zone again.
+        """
+        zone = self._known_zone(domain)
+        if zone is None:
+            zone = self._refresh_zone(domain)
+        return zone
+
+    def _as_zone(self, domain, records):
+        """Turn a zone snapshot (Zone or headers and table) into a Zone"""
+        if records is None:
+            return self.get_zone(domain)
+        return Zone.from_snapshot(domain, records)
+
+    def add_record(self, domain, host, dnstype, rr):
+        """Add a record to the DNS"""
+        return self.apply_changes(
+            domain, [{"host": host, "type": dnstype, "rr": rr, "state": "present"}]
+        )[0]
 
     def remove_record(self, domain, host, dnstype, rr):
         """Remove a record from the DNS"""
-        fullhost = host + "." + domain
-        headers, records = self.get_domain_records(domain)
-        # keep only the records fitting our criteria
-        records = [
-            y
-            for y in [dict(zip(headers, x)) for x in records]
-            if y["Owner"] == fullhost and y["Ressource Record"] == rr
-        ]
-        if not records:
-            warn(f"Record {fullhost} with ressource {rr} not found")
-            return None  # nothing to be done
-        for r in records:
-            rr_id = r["metadata"]["zoneentryid"]
-            params = {
-                "Domainname": domain,
-                "zoneentryid": rr_id,
-                "action": "domain-dns-admin-del-zone-entry",
-            }
-            r = self.session.get("%s" % self.base_url, params=params)
-            if r.status_code != 200:
-                raise RuntimeError(
-                    f"Request failed due to {r.reason} ({r.status_code})"
+        # all records with the same combination are removed
+        return self.apply_changes(
+            domain, [{"host": host, "type": dnstype, "rr": rr, "state": "absent"}]
+        )[0]
+
+    def diff_records(self, domain, changes, exclusive=False, records=None):
+        """Compute the changes needed to bring a domain into a desired state
+
+        Takes a list of changes (and optionally a zone snapshot) as for
+        apply_changes and returns only those which would modify the zone.
+        With exclusive, all other records of the zone are to be removed as
+        well.
+        """
+        return self._diff_zone(
+            domain, self._as_zone(domain, records), changes, exclusive
+        )
+
+    def _diff_zone(self, domain, zone, changes, exclusive):
+        listed = set()
+        delta = []
+        for change in changes:
+            key = (self.fullhost(change["host"], domain), change["rr"])
+            state = change.get("state", "present")
+            if key in listed:
+                continue
+            listed.add(key)
+            if (key in zone) != (state == "present"):
+                delta.append(
+                    {
+                        "host": change["host"],
+                        "type": change["type"],
+                        "rr": change["rr"],
+                        "state": state,
+                    }
                 )
-            # we don't leave the loop so that all records with the same
-            # combination are removed
+        if exclusive:
+            for record in zone:
+                key = (record.owner, record.rr)
+                if key in listed:
+                    continue
+                listed.add(key)
+                host = self.hostname(record.owner, domain)
+                if host is None:
+                    warn(f"Record {record.owner} cannot be removed")
+                    continue
+                delta.append(
+                    {
+                        "host": host,
+                        "type": record.type,
+                        "rr": record.rr,
+                        "state": "absent",
+                    }
+                )
+        return delta
+
+    @classmethod
+    def check_changes(cls, changes):
+        """Raise a RuntimeError for a change which cannot be applied
+
+        apply_changes calls this before sending anything, so that a bad
+        change does not leave a batch partly applied.
+        """
+        for change in changes:
+            if not isinstance(change, dict):
+                raise RuntimeError(f"Change is not a mapping: {change!r}")
+            missing = [x for x in ("host", "type", "rr") if x not in change]
+            if missing:
+                raise RuntimeError(f"Change lacks {', '.join(missing)}: {change}")
+            for key in ("host", "rr"):
+                # a number (e.g. from YAML) would only fail when sent
+                if not isinstance(change[key], str):
+                    raise RuntimeError(f"{key} is not a string: {change}")
+            if change["type"] not in cls.type_table:
+                raise RuntimeError(f"Unknown type {change['type']}: {change}")
+            if change.get("state", "present") not in ("present", "absent"):
+                raise RuntimeError(f"Unknown state {change['state']}: {change}")
+
+    @staticmethod
+    def _change_entry(domain, change):
+        """A change of a domain as an entry of the journal"""
+        return {
+            "domain": domain,
+            "host": change["host"],
+            "type": change["type"],
+            "rr": change["rr"],
+            "state": change.get("state", "present"),
+        }
+
+    def _plan(self, entries):
+        """Journal mutations as planned, False for those done before"""
+        if self.journal is None:
+            return [True] * len(entries)
+        return self.journal.plan(entries)
+
+    @contextlib.contextmanager
+    def _journaled(self, entry):
+        """Journal a mutation as done, or as failed if it raises"""
+        if self.journal is None:
+            yield
+            return
+        try:
+            yield
+        except RuntimeError as exc:
+            self.journal.fail(entry, str(exc))
+            raise
+        self.journal.complete(entry)
+
+    def _change_step(self, domain, zone, change):
+        """What a change needs: "add", "delete", "refresh" or None
+
+        "refresh" is a deletion of records added before without an answer
+        showing the zone, their entry id is only known after fetching it
+        again. None if there is nothing to do.
+        """
+        fullhost, rr = self.fullhost(change["host"], domain), change["rr"]
+        if change.get("state", "present") == "present":
+            if (fullhost, rr) in zone:
+                warn(f"Record {fullhost} with ressource {rr} already exists")
+                return None
+            return "add"
+        if (fullhost, rr) not in zone:
+            warn(f"Record {fullhost} with ressource {rr} not found")
+            return None
+        if any(x.zoneentryid is None for x in zone.find(fullhost, rr)):
+            return "refresh"
+        return "delete"
+
+    def _apply_change(self, domain, change):
+        """Apply a single change, True if the zone was modified"""
+        host, dnstype, rr = change["host"], change["type"], change["rr"]
+        zone = self.get_zone(domain)
+        step = self._change_step(domain, zone, change)
+        if step is None:
+            return None
+        if step == "add":
+            self._commit_record(domain, host, dnstype, rr)
+            return True
+        if step == "refresh":
+            zone = self._refresh_zone(domain)
+        for record in zone.find(self.fullhost(host, domain), rr):
+            self._delete_record(domain, record.zoneentryid)
         return True
 
+    def _outstanding(self, domain, changes, records):
+        """Keep the snapshot passed to apply_changes and plan its changes
+
+        Returns per change its journal entry, None if it was done before.
+        """
+        if records is not None:
+            # the caller's snapshot becomes the zone kept for the domain
+            self._keep_zone(domain, Zone.from_snapshot(domain, records), True)
+        entries = [self._change_entry(domain, x) for x in changes]
+        return [x if todo else None for x, todo in zip(entries, self._plan(entries))]
+
+    def apply_changes(self, domain, changes, records=None):
+        """Apply a list of changes to a domain with a single zone fetch
+
+        Each change is a dict with the keys host, type, rr and optionally
+        state (present or absent, defaults to present). Returns a list with
+        one entry per change: True if the zone was modified, None if there
+        was nothing to be done. A snapshot of the zone just fetched with
+        get_zone or get_domain_records can be passed as records; it is kept
+        (a Zone updated) to reflect the changes. With a journal, changes it
+        lists as done are skipped (None) without looking at the zone.
+        Concurrent calls for the same domain take turns, so that each one
+        sees the zone as modified by the previous ones.
+        """
+        self.check_changes(changes)
+        with self._domain_lock(domain):
+            results = []
+            entries = self._outstanding(domain, changes, records)
+            for change, entry in zip(changes, entries):
+                if entry is None:
+                    results.append(None)
+                    continue
+                with self._journaled(entry):
+                    results.append(self._apply_change(domain, change))
+            return results
+
+    @staticmethod
+    def _delete_entry(domain, rr_id):
+        """The deletion of a zone entry as an entry of the journal"""
+        return {"domain": domain, "zoneentryid": str(rr_id)}
+
+    def delete_records(self, entries, max_workers=8):
+        """Delete many records by their known zoneentryid concurrently
+
+        entries is a list of (domain, zoneentryid) pairs, e.g. of records
+        selected with Zone.match, possibly of many domains. The requests go
+        through a pool of max_workers threads, without fetching the zones
+        again; those zones are forgotten afterwards. Returns per entry None
+        or the message of the RuntimeError it failed with. With a journal,
+        entries it lists as done are skipped. apply_changes for the same
+        domains waits until the deletions are done.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        def delete(entry, todo):
+            if not todo:
+                return None
+            try:
+                with self._journaled(self._delete_entry(*entry)):
+                    self._send_delete(*entry)
+            except RuntimeError as exc:
+                return str(exc)
+            return None
+
+        outstanding = self._plan([self._delete_entry(*x) for x in entries])
+        if max_workers > self.pool_size:
+            self._mount_pool(self.session, max_workers)
+        domains = sorted(set(x[0] for x in entries))
+        with contextlib.ExitStack() as stack:
+            # always in the same order, so that two calls cannot deadlock
+            for domain in domains:
+                stack.enter_context(self._domain_lock(domain))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(delete, entries, outstanding))
+            for domain in domains:
+                self._forget_zone(domain)
+        return results
+
+    def _get_resolver(self):
+        """Return a resolver asking the authoritative name server"""
+        if self._resolver is None:
+            from dns.resolver import Resolver
+
+            resolver = Resolver(configure=False)
+            resolver.nameservers = [socket.gethostbyname(self.auth_ns)]
+            resolver.port = self.auth_ns_port
+            resolver.timeout = 5
+            resolver.lifetime = 5
+            self._resolver = resolver
+        return self._resolver
+
     def query_dns_server(self, record, type):
-        resolver = Resolver(configure=False)
-        resolver.nameservers = [socket.gethostbyname(self.auth_ns)]
-        resolver.timeout = 5
-        resolver.lifetime = 5
+        from dns.resolver import NXDOMAIN, NoAnswer, LifetimeTimeout
+
         try:
-            dns_query = resolver.resolve(record, type)
+            with self._span("dns"):
+                dns_query = self._get_resolver().resolve(record, type)
             return dns_query
-        except (NXDOMAIN, LifetimeTimeout):
+        except (NXDOMAIN, NoAnswer, LifetimeTimeout):
             return False
 
-    def wait_for_add_record(self, domain, host, type, rr):
-        for i in range(22):
-            answer = self.query_dns_server("%s.%s." % (host, domain), type)
-            try:
-                for i in answer.response.answer:
-                    for j in i.items:
-                        if rr in j.to_text():
-                            sys.stdout.write("\n")
-                            sys.stdout.flush()
-                            return
-            except (AttributeError, TypeError):
-                pass
-            time.sleep(30)
-            sys.stdout.write(".")
-            sys.stdout.flush()
-        raise RuntimeError("Timeout exceeded waiting for DNS change...")
-
-    def wait_for_remove_record(self, domain, host, type, rr):
-        for i in range(22):
-            if not self.query_dns_server("%s.%s." % (host, domain), type):
-                sys.stdout.write("\n")
-                sys.stdout.flush()
-                return
-            time.sleep(30)
-            sys.stdout.write(".")
-            sys.stdout.flush()
-        raise RuntimeError("Timeout exceeded waiting for DNS change...")
+    def get_soa_serial(self, domain):
+        """Get the SOA serial of a zone from the authoritative name server"""
+        answer = self.query_dns_server(domain + ".", "SOA")
+        try:
+            return answer[0].serial
+        except (IndexError, TypeError):
+            return None
+
+    def record_visible(self, domain, host, type, rr):
+        """Check if the authoritative name server serves a record"""
+        answer = self.query_dns_server(self.fullhost(host, domain) + ".", type)
+        try:
+            for i in answer.response.answer:
+                for j in i.items:
+                    if rr in j.to_text():
+                        return True
+        except (AttributeError, TypeError):
+            pass
+        return False
+
+    def wait_for_records(self, records, serials=None, timeout=None, max_workers=16):
+        """Poll until many records are (or are no longer) served
+
+        records is a list of (domain, host, type, rr, state) tuples, state
+        being "present" or "absent". In every round the SOA serials of the
+        pending zones are queried concurrently and the records of the zones
+        whose serial changed (or all of them, at the latest after the
+        longest poll interval) are checked concurrently. The poll interval
+        starts short and grows exponentially. serials may map domains to
+        their SOA serial from before the change. Every round writes a dot
+        to stderr.
+
+        Returns the seconds each record took to settle, in the order of
+        records.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        from bawuenet.domains.poll import Poll
+
+        if timeout is None:
+            timeout = self.wait_timeout
+        poll = Poll(records, serials, timeout, self.poll_schedule)
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+        def visible(idx):
+            return self.record_visible(*records[idx][:4])
+
+        def check(indexes):
+            """Query records concurrently"""
+            poll.settled(indexes, list(executor.map(visible, indexes)))
+
+        def get_serials():
+            domains = poll.domains()
+            return dict(zip(domains, executor.map(self.get_soa_serial, domains)))
+
+        try:
+            check(poll.pending)
+            poll.first_serials(get_serials())
+            waited = False
+            while True:
+                pause = poll.pause()
+                if pause is None:
+                    break
+                with self._span("wait"):
+                    with self._span("sleep"):
+                        time.sleep(pause)
+                    sys.stderr.write(".")
+                    sys.stderr.flush()
+                    waited = True
+                    recheck = poll.recheck(get_serials())
+                    if recheck:
+                        check(recheck)
+            if waited:
+                sys.stderr.write("\n")
+                sys.stderr.flush()
+        finally:
+            executor.shutdown()
+        return poll.result()
+
+    def wait_for_add_record(self, domain, host, type, rr, serial=None, timeout=None):
+        """Wait until a record is served by the authoritative name server
+
+        Pass the SOA serial from before the change (see get_soa_serial) to
+        notice the zone update as early as possible.
+        """
+        serials = None if serial is None else {domain: serial}
+        self.wait_for_records([(domain, host, type, rr, "present")], serials, timeout)
+
+    def wait_for_remove_record(self, domain, host, type, rr, serial=None, timeout=None):
+        """Wait until a record is no longer served by the name server"""
+        serials = None if serial is None else {domain: serial}
+        self.wait_for_records([(domain, host, type, rr, "absent")], serials, timeout)
@@ -0,0 +1,70 @@
+#
+# Several Bawue.Net accounts used side by side
+#
+# This code is licensed for use and distribution under the GPLv3+
+#
+
+import configparser
+from concurrent.futures import ThreadPoolExecutor
+
+
+def read_accounts(filename):
+    """All accounts of a credentials file as {section: (username, password)}
+
+    Every section of the INI file is an account with the keys username and
+    password, in the order of the file.
+    """
+    config = configparser.ConfigParser()
+    if not config.read(filename):
+        raise RuntimeError(f"Cannot read credentials file {filename}")
+    accounts = {}
+    for section in config.sections():
+        try:
+            accounts[section] = (
+                config[section]["username"],
+                config[section]["password"],
+            )
+        except KeyError as exc:
+            raise RuntimeError(f"Account {section} in {filename} lacks {exc}")
+    return accounts
+
+
+class Accounts:
+    """A DomainsAPI, with its own session, per account
+
+    factory(username, password) creates the DomainsAPI objects. Calls
+    across accounts run in a pool of max_workers threads; to bound the
+    requests in flight overall, let the factory give all of them the same
+    Throttle.
+    """
+
+    def __init__(self, credentials, factory, max_workers=8):
+        self.apis = {
+            name: factory(username, password)
+            for name, (username, password) in credentials.items()
+        }
+        self.max_workers = max_workers
+
+    def map(self, fn):
+        """Call fn(api) for all accounts concurrently
+
+        Returns (name, result, exception) tuples in the order of the
+        accounts, exception being None unless fn raised a RuntimeError.
+        """
+
+        def call(name):
+            try:
+                return (name, fn(self.apis[name]), None)
+            except RuntimeError as exc:
+                return (name, None, exc)
+
+        workers = max(1, min(self.max_workers, len(self.apis)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(call, self.apis))
+
+    def find(self, domain):
+        """The name and DomainsAPI of the (first) account owning a domain"""
+        for name, domains, exc in self.map(lambda api: api.get_domains()):
+            if exc is None and domain in domains:
+                return name, self.apis[name]
+        return None, None
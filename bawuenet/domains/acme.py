@@ -0,0 +1,123 @@
+#
+# ACME DNS-01 challenges through the Bawue.Net web interface
+#
+# This code is licensed for use and distribution under the GPLv3+
+#
+
+CHALLENGE_LABEL = "_acme-challenge"
+# seconds after which queued certbot challenges are considered stale
+QUEUE_MAX_AGE = 3600
+
+
+def challenge_name(name):
+    """The owner of the TXT record for a domain name to be validated"""
+    name = name.rstrip(".")
+    if name.startswith("*."):
+        name = name[2:]  # wildcards are validated on the base name
+    if name == CHALLENGE_LABEL or name.startswith(CHALLENGE_LABEL + "."):
+        return name
+    return CHALLENGE_LABEL + "." + name
+
+
+def find_domain(name, domains):
+    """Split a name into the owned domain containing it and the host"""
+    matches = [x for x in domains if name == x or name.endswith("." + x)]
+    if not matches:
+        raise RuntimeError(f"{name} does not belong to any domain of user")
+    domain = max(matches, key=len)
+    return domain, "@" if name == domain else name[: -len(domain) - 1]
+
+
+def group_challenges(challenges, domains, state="present"):
+    """Turn (name, token) pairs into a list of changes per domain
+
+    The token is put in double quotes, as the web interface stores TXT
+    records, so that existing records are recognised and can be removed.
+    """
+    grouped = {}
+    for name, token in challenges:
+        domain, host = find_domain(challenge_name(name), domains)
+        rr = '"%s"' % token
+        change = {"host": host, "type": "TXT", "rr": rr, "state": state}
+        if change not in grouped.setdefault(domain, []):
+            grouped[domain].append(change)
+    return grouped
+
+
+def deploy_challenges(api, challenges, wait=True, timeout=None):
+    """Add the TXT records of many challenges and wait for them once
+
+    challenges is a list of (name, token) pairs, e.g. all of one
+    certificate. The records are added with one zone fetch per domain and
+    all of them are awaited together.
+    """
+    grouped = group_challenges(challenges, api.get_domains())
+    serials = {}
+    if wait:
+        # remember the zones' serials to notice the updates early
+        for domain in grouped:
+            serials[domain] = api.get_soa_serial(domain)
+    for domain, changes in grouped.items():
+        api.apply_changes(domain, changes)
+    if wait:
+        api.wait_for_records(
+            [
+                (domain, x["host"], x["type"], x["rr"], x["state"])
+                for domain, changes in grouped.items()
+                for x in changes
+            ],
+            serials,
+            timeout,
+        )
+    return grouped
+
+
+def clean_challenges(api, challenges):
+    """Remove the TXT records of many challenges, one zone fetch per domain"""
+    grouped = group_challenges(challenges, api.get_domains(), "absent")
+    for domain, changes in grouped.items():
+        api.apply_changes(domain, changes)
+    return grouped
+
+
+def collect_certbot_challenges(hook, environ, path):
+    """Collect the challenges certbot passes to its hooks one by one
+
+    certbot calls the auth and cleanup hooks once per challenge, all of
+    them before validating. They are queued in a file under path until
+    CERTBOT_REMAINING_CHALLENGES drops to 0, then all are returned at once
+    (an empty list before). Without that variable (older certbot) the
+    single challenge is returned right away.
+    """
+    import fcntl
+    import hashlib
+    import json
+    import os
+    import time
+
+    challenge = [environ["CERTBOT_DOMAIN"], environ["CERTBOT_VALIDATION"]]
+    remaining = environ.get("CERTBOT_REMAINING_CHALLENGES")
+    if remaining is None:
+        return [tuple(challenge)]
+    certificate = environ.get("CERTBOT_ALL_DOMAINS", environ["CERTBOT_DOMAIN"])
+    key = hashlib.sha256(certificate.encode()).hexdigest()[:16]
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    filename = os.path.join(path, f"certbot-{hook}-{key}.json")
+    with open(filename, "a+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0)
+        try:
+            queued = json.load(f)
+        except ValueError:
+            queued = []
+        if time.time() - os.fstat(f.fileno()).st_mtime > QUEUE_MAX_AGE:
+            queued = []  # left over from an aborted run
+        if challenge not in queued:
+            queued.append(challenge)
+        if int(remaining) > 0:
+            f.seek(0)
+            f.truncate()
+            json.dump(queued, f)
+            return []
+        os.unlink(filename)
+    return [tuple(x) for x in queued]
@@ -0,0 +1,477 @@
+#
+# asyncio client for the Bawue.Net web interface and name server
+#
+# This code is licensed for use and distribution under the GPLv3+
+#
+
+import asyncio
+import contextlib
+import socket
+
+from bawuenet.domains import DomainsAPI
+from bawuenet.domains.zone import Zone
+
+
+class _Response:
+    """Status and body of a request, read before the connection is reused"""
+
+    __slots__ = ("status_code", "reason", "headers", "text")
+
+    def __init__(self, status_code, reason, headers, text):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.text = text
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+
+class AsyncDomainsAPI(DomainsAPI):
+    """DomainsAPI for asyncio, based on aiohttp and dnspython's asyncresolver
+
+    The methods talking to the web interface or the name server are
+    coroutines; the parsing, the zone handling and the configuration are
+    those of DomainsAPI. Changes to a domain are serialized, but any number
+    of waits can be pending on one event loop. The cache, the journal and
+    the throttle, which may wait for file locks, are used from threads.
+    Use as an async context manager, or await close() when done. Needs
+    Python 3.7 or later.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # domain -> pending SOA query, shared by concurrent waits
+        self._soa_queries = {}
+
+    @property
+    def session(self):
+        """The aiohttp session, created on first use within the event loop"""
+        if self._session is None:
+            try:
+                import aiohttp
+            except ImportError:
+                raise RuntimeError(
+                    "AsyncDomainsAPI needs aiohttp "
+                    "(pip install bawuenet-domainctl[async])"
+                )
+
+            connect, read = self.request_timeout
+            self._session = aiohttp.ClientSession(
+                auth=aiohttp.BasicAuth(self.username, self.password),
+                connector=aiohttp.TCPConnector(limit=self.pool_size),
+                timeout=aiohttp.ClientTimeout(sock_connect=connect, sock_read=read),
+            )
+        return self._session
+
+    @session.setter
+    def session(self, session):
+        self._session = session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    @contextlib.asynccontextmanager
+    async def _slot(self):
+        """Hold a slot of the throttle
+
+        The limits may be shared with other processes through file locks,
+        so they are waited for in a thread.
+        """
+        slot = self.throttle.slot()
+        loop = asyncio.get_running_loop()
+        entering = asyncio.ensure_future(loop.run_in_executor(None, slot.__enter__))
+        try:
+            await asyncio.shield(entering)
+        except asyncio.CancelledError:
+            # give the slot back as soon as the thread got it
+            entering.add_done_callback(
+                lambda f: f.cancelled()
+                or f.exception()
+                or slot.__exit__(None, None, None)
+            )
+            raise
+        try:
+            yield
+        finally:
+            slot.__exit__(None, None, None)
+
+    async def _get(self, params=None, idempotent=True):
+        """Send a request to the web interface, see DomainsAPI._get"""
+        import aiohttp
+
+        # a failure to connect means that the request was never sent
+        not_sent = (aiohttp.ClientConnectorError,) + tuple(
+            getattr(aiohttp, x)
+            for x in ("ConnectionTimeoutError",)
+            if hasattr(aiohttp, x)
+        )
+        attempt = 0
+        while True:
+            try:
+                async with contextlib.AsyncExitStack() as stack:
+                    if self.throttle is not None:
+                        with self._span("throttle"):
+                            await stack.enter_async_context(self._slot())
+                    with self._span("http") as span:
+                        async with self.session.get(
+                            self.base_url, params=params
+                        ) as response:
+                            body = await response.read()
+                            span.bytes = len(body)
+                            r = _Response(
+                                response.status,
+                                response.reason,
+                                response.headers,
+                                body.decode(response.get_encoding(), "replace"),
+                            )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                retry = isinstance(exc, not_sent) or idempotent
+                if not retry or attempt >= self.retries:
+                    raise RuntimeError(f"Request failed due to {str(exc) or repr(exc)}")
+                delay = self._backoff(attempt)
+            else:
+                if (
+                    attempt >= self.retries
+                    or r.status_code not in self.retry_status
+                    or not (idempotent or r.status_code == 429)
+                ):
+                    return r
+                delay = max(self._backoff(attempt), self._retry_after(r))
+            with self._span("retry"):
+                await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _unblocked(self, func, *args):
+        """Call func, in a thread if it may wait for the cache or journal files"""
+        if self.cache is None and self.journal is None:
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    @contextlib.asynccontextmanager
+    async def _journaled(self, entry):
+        """Journal a mutation as done, or as failed if it raises"""
+        if self.journal is None:
+            yield
+            return
+        try:
+            yield
+        except RuntimeError as exc:
+            await self._unblocked(self.journal.fail, entry, str(exc))
+            raise
+        await self._unblocked(self.journal.complete, entry)
+
+    def _domain_lock(self, domain):
+        """The lock taken by apply_changes, one per domain"""
+        return self._domain_locks.setdefault(domain, asyncio.Lock())
+
+    async def _cached(self, key, fetch):
+        """Return a value from the cache, awaiting fetch() on a miss"""
+        if self.cache is None:
+            return await fetch()
+        value = await self._unblocked(self.cache.get, self.username, key)
+        if value is None:
+            value = await fetch()
+            await self._unblocked(self.cache.set, self.username, key, value)
+        return value
+
+    async def get_domain_data(self):
+        """Get user owned domains"""
+        return await self._cached("domains", self._fetch_domain_data)
+
+    async def _fetch_domain_data(self):
+        from bawuenet.domains.parser import extract_table
+
+        r = await self._get()
+        if not r.ok:
+            raise RuntimeError(f"Request failed due to {r.reason} ({r.status_code})")
+        with self._span("parse"):
+            headers, data = extract_table(r.text)
+        return (headers[:-1], [x[:-1] for x in data])
+
+    async def get_domains(self):
+        """Get a list of domains"""
+        return sorted([x[0] for x in (await self.get_domain_data())[1]])
+
+    async def get_domain_records(self, domain):
+        """Get RRs from a domain"""
+        return await self._cached(
+            "zone:" + domain, lambda: self._fetch_domain_records(domain)
+        )
+
+    async def _fetch_domain_records(self, domain):
+        params = {"domain": domain, "action": "edit"}
+        r = await self._get(params)
+        if not r.ok:
+            raise RuntimeError(f"Request failed due to {r.reason} ({r.status_code})")
+        return self._parse_zone_page(r.text)
+
+    async def iter_domain_records(self, domain):
+        """Yield the RRs of a domain as dicts, see get_domain_records"""
+        headers, table = await self.get_domain_records(domain)
+        for row in table:
+            yield dict(zip(headers, row))
+
+    async def get_all_domain_records(self, domains=None, max_workers=8):
+        """Get RRs from many domains (default: all) concurrently
+
+        Yields (domain, headers, records) tuples as soon as each zone has
+        been fetched, at most max_workers at a time.
+        """
+        if domains is None:
+            domains = await self.get_domains()
+        limit = asyncio.Semaphore(max_workers)
+
+        async def fetch(domain):
+            async with limit:
+                return (domain,) + tuple(await self.get_domain_records(domain))
+
+        tasks = [asyncio.ensure_future(fetch(domain)) for domain in domains]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _commit_record(self, domain, host, dnstype, rr):
+        """Send a single add request to the web interface"""
+        params = self._commit_params(domain, host, dnstype, rr)
+        # repeating it could add the record twice
+        r = await self._get(params, idempotent=False)
+        await self._unblocked(self._committed, domain, host, dnstype, rr, r)
+
+    async def _send_delete(self, domain, rr_id):
+        """Send a delete request, without looking at the returned zone"""
+        r = await self._get(self._delete_params(domain, rr_id))
+        await self._unblocked(self._check_answer, domain, r)
+        return r
+
+    async def _delete_record(self, domain, rr_id):
+        """Send a single delete request to the web interface"""
+        r = await self._send_delete(domain, rr_id)
+        await self._unblocked(self._deleted, domain, rr_id, r)
+
+    async def _refresh_zone(self, domain):
+        """Fetch a zone (unless cached) and keep it"""
+        zone = Zone.from_table(domain, *(await self.get_domain_records(domain)))
+        return self._keep_zone(domain, zone)
+
+    async def get_zone(self, domain):
+        """Get the records of a domain as an indexed Zone, see DomainsAPI"""
+        zone = self._known_zone(domain)
+        if zone is None:
+            zone = await self._refresh_zone(domain)
+        return zone
+
+    async def _as_zone(self, domain, records):
+        if records is None:
+            return await self.get_zone(domain)
+        return Zone.from_snapshot(domain, records)
+
+    async def add_record(self, domain, host, dnstype, rr):
+        """Add a record to the DNS"""
+        return (
+            await self.apply_changes(
+                domain, [{"host": host, "type": dnstype, "rr": rr, "state": "present"}]
+            )
+        )[0]
+
+    async def remove_record(self, domain, host, dnstype, rr):
+        """Remove a record from the DNS"""
+        return (
+            await self.apply_changes(
+                domain, [{"host": host, "type": dnstype, "rr": rr, "state": "absent"}]
+            )
+        )[0]
+
+    async def diff_records(self, domain, changes, exclusive=False, records=None):
+        """Compute the changes needed, see DomainsAPI.diff_records"""
+        zone = await self._as_zone(domain, records)
+        return self._diff_zone(domain, zone, changes, exclusive)
+
+    async def _apply_change(self, domain, change):
+        """Apply a single change, True if the zone was modified"""
+        host, dnstype, rr = change["host"], change["type"], change["rr"]
+        zone = await self.get_zone(domain)
+        step = self._change_step(domain, zone, change)
+        if step is None:
+            return None
+        if step == "add":
+            await self._commit_record(domain, host, dnstype, rr)
+            return True
+        if step == "refresh":
+            zone = await self._refresh_zone(domain)
+        for record in zone.find(self.fullhost(host, domain), rr):
+            await self._delete_record(domain, record.zoneentryid)
+        return True
+
+    async def apply_changes(self, domain, changes, records=None):
+        """Apply a list of changes to a domain, see DomainsAPI.apply_changes
+
+        Concurrent calls for the same domain take turns, so that each one
+        sees the zone as modified by the previous ones.
+        """
+        self.check_changes(changes)
+        async with self._domain_lock(domain):
+            results = []
+            entries = await self._unblocked(self._outstanding, domain, changes, records)
+            for change, entry in zip(changes, entries):
+                if entry is None:
+                    results.append(None)
+                    continue
+                async with self._journaled(entry):
+                    results.append(await self._apply_change(domain, change))
+            return results
+
+    async def delete_records(self, entries, max_workers=8):
+        """Delete many records by their known zoneentryid concurrently
+
+        See DomainsAPI.delete_records; at most max_workers requests are
+        in flight. apply_changes for the same domains waits until the
+        deletions are done.
+        """
+        limit = asyncio.Semaphore(max_workers)
+
+        async def delete(entry, todo):
+            if not todo:
+                return None
+            async with limit:
+                try:
+                    async with self._journaled(self._delete_entry(*entry)):
+                        await self._send_delete(*entry)
+                except RuntimeError as exc:
+                    return str(exc)
+                return None
+
+        outstanding = await self._unblocked(
+            self._plan, [self._delete_entry(*x) for x in entries]
+        )
+        domains = sorted(set(x[0] for x in entries))
+        async with contextlib.AsyncExitStack() as stack:
+            for domain in domains:
+                await stack.enter_async_context(self._domain_lock(domain))
+            results = await asyncio.gather(*map(delete, entries, outstanding))
+            for domain in domains:
+                await self._unblocked(self._forget_zone, domain)
+        return results
+
+    async def _get_resolver(self):
+        """Return an async resolver asking the authoritative name server"""
+        if self._resolver is None:
+            from dns.asyncresolver import Resolver
+
+            loop = asyncio.get_running_loop()
+            addresses = await loop.getaddrinfo(
+                self.auth_ns, None, family=socket.AF_INET, type=socket.SOCK_DGRAM
+            )
+            resolver = Resolver(configure=False)
+            resolver.nameservers = [addresses[0][4][0]]
+            resolver.port = self.auth_ns_port
+            resolver.timeout = 5
+            resolver.lifetime = 5
+            self._resolver = resolver
+        return self._resolver
+
+    async def query_dns_server(self, record, type):
+        from dns.resolver import NXDOMAIN, NoAnswer, LifetimeTimeout
+
+        resolver = await self._get_resolver()
+        try:
+            with self._span("dns"):
+                return await resolver.resolve(record, type)
+        except (NXDOMAIN, NoAnswer, LifetimeTimeout):
+            return False
+
+    async def get_soa_serial(self, domain):
+        """Get the SOA serial of a zone from the authoritative name server
+
+        Concurrent calls for the same domain share one query.
+        """
+        query = self._soa_queries.get(domain)
+        if query is None:
+            query = asyncio.ensure_future(self.query_dns_server(domain + ".", "SOA"))
+            self._soa_queries[domain] = query
+            query.add_done_callback(lambda _: self._soa_queries.pop(domain, None))
+        answer = await asyncio.shield(query)
+        try:
+            return answer[0].serial
+        except (IndexError, TypeError):
+            return None
+
+    async def record_visible(self, domain, host, type, rr):
+        """Check if the authoritative name server serves a record"""
+        answer = await self.query_dns_server(self.fullhost(host, domain) + ".", type)
+        try:
+            for i in answer.response.answer:
+                for j in i.items:
+                    if rr in j.to_text():
+                        return True
+        except (AttributeError, TypeError):
+            pass
+        return False
+
+    async def wait_for_records(self, records, serials=None, timeout=None):
+        """Poll until many records are (or are no longer) served
+
+        Works like DomainsAPI.wait_for_records, with all queries of a round
+        sent at once and the pauses not blocking the event loop.
+        """
+        from bawuenet.domains.poll import Poll
+
+        if timeout is None:
+            timeout = self.wait_timeout
+        poll = Poll(records, serials, timeout, self.poll_schedule)
+
+        async def check(indexes):
+            """Query records concurrently"""
+            visible = await asyncio.gather(
+                *(self.record_visible(*records[idx][:4]) for idx in indexes)
+            )
+            poll.settled(indexes, visible)
+
+        async def get_serials():
+            domains = poll.domains()
+            results = await asyncio.gather(*map(self.get_soa_serial, domains))
+            return dict(zip(domains, results))
+
+        await check(poll.pending)
+        poll.first_serials(await get_serials())
+        while True:
+            pause = poll.pause()
+            if pause is None:
+                break
+            with self._span("wait"):
+                with self._span("sleep"):
+                    await asyncio.sleep(pause)
+                recheck = poll.recheck(await get_serials())
+                if recheck:
+                    await check(recheck)
+        return poll.result()
+
+    async def wait_for_add_record(
+        self, domain, host, type, rr, serial=None, timeout=None
+    ):
+        """Wait until a record is served by the authoritative name server"""
+        serials = None if serial is None else {domain: serial}
+        await self.wait_for_records(
+            [(domain, host, type, rr, "present")], serials, timeout
+        )
+
+    async def wait_for_remove_record(
+        self, domain, host, type, rr, serial=None, timeout=None
+    ):
+        """Wait until a record is no longer served by the name server"""
+        serials = None if serial is None else {domain: serial}
+        await self.wait_for_records(
+            [(domain, host, type, rr, "absent")], serials, timeout
+        )
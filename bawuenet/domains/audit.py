@@ -0,0 +1,208 @@
+#
+# Compare the zones of the Bawue.Net web interface with the name servers
+#
+# This code is licensed for use and distribution under the GPLv3+
+#
+
+import functools
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+import dns.exception
+import dns.flags
+import dns.message
+import dns.name
+import dns.query
+import dns.rdatatype
+import dns.zone
+
+from bawuenet.domains import DomainsAPI, warn
+from bawuenet.domains.zone import Zone
+from bawuenet.domains.zonefile import normalize_rr
+
+HEADERS = ["Nameserver", "Owner", "Type", "Status", "Web", "DNS"]
+
+
+@functools.lru_cache(maxsize=None)
+def resolve_address(name):
+    """IPv4 address of a name server, looked up once"""
+    return socket.gethostbyname(name)
+
+
+def expected_rrsets(domain, records):
+    """The record sets of a zone snapshot as {(owner, type): {rr, ...}}
+
+    rr is normalized with names relative to the domain, as the name
+    servers' answers are below.
+    """
+    rrsets = {}
+    for record in Zone.from_snapshot(domain, records):
+        key = (record.owner.lower().rstrip("."), record.type)
+        rrsets.setdefault(key, set()).add(normalize_rr(record.type, record.rr, domain))
+    return rrsets
+
+
+def nameservers(api, domain):
+    """The authoritative name servers of a domain, as served by auth_ns"""
+    answer = api.query_dns_server(domain + ".", "NS")
+    if not answer:
+        return [api.auth_ns]
+    return sorted(set(x.target.to_text().rstrip(".") for x in answer))
+
+
+def transfer(address, port, domain, timeout=10):
+    """The record sets of a zone by AXFR, None if the transfer is refused"""
+    try:
+        zone = dns.zone.from_xfr(
+            dns.query.xfr(
+                address, domain, port=port, lifetime=timeout, relativize=False
+            ),
+            relativize=False,
+            check_origin=False,
+        )
+    except (dns.exception.DNSException, OSError, EOFError):
+        return None
+    rrsets = {}
+    for name, ttl, rdata in zone.iterate_rdatas():
+        dnstype = dns.rdatatype.to_text(rdata.rdtype)
+        owner = name.to_text().rstrip(".").lower()
+        if dnstype not in DomainsAPI.type_table:
+            continue  # SOA and types the web interface does not manage
+        if dnstype == "NS" and owner == domain:
+            continue
+        rrsets.setdefault((owner, dnstype), set()).add(
+            rdata.to_text(origin=zone.origin)
+        )
+    return rrsets
+
+
+def query_rrset(address, port, domain, owner, dnstype, timeout=5):
+    """The records of one set served by a name server, None on timeout"""
+    origin = dns.name.from_text(domain)
+    query = dns.message.make_query(owner + ".", dnstype)
+    query.flags &= ~dns.flags.RD
+    try:
+        response = dns.query.udp(query, address, timeout=timeout, port=port)
+        if response.flags & dns.flags.TC:
+            response = dns.query.tcp(query, address, timeout=timeout, port=port)
+    except (dns.exception.Timeout, OSError):
+        return None
+    served = set()
+    name = dns.name.from_text(owner)
+    for rrset in response.answer:
+        if rrset.name == name and dns.rdatatype.to_text(rrset.rdtype) == dnstype:
+            served.update(x.to_text(origin=origin) for x in rrset)
+    return served
+
+
+def compare(nameserver, expected, served, complete):
+    """Rows for the record sets which differ between web and DNS
+
+    With complete (a zone transfer), record sets served but not shown by
+    the web interface are reported as well.
+    """
+    rows = []
+    keys = set(expected)
+    if complete:
+        keys |= set(served)
+    for key in sorted(keys):
+        owner, dnstype = key
+        want = expected.get(key, set())
+        got = served.get(key, set())
+        if got is None:
+            rows.append(
+                [nameserver, owner, dnstype, "timeout", "; ".join(sorted(want)), ""]
+            )
+        elif want == got:
+            continue
+        elif not got:
+            rows.extend(
+                [nameserver, owner, dnstype, "missing", x, ""] for x in sorted(want)
+            )
+        elif not want:
+            rows.extend(
+                [nameserver, owner, dnstype, "extra", "", x] for x in sorted(got)
+            )
+        else:
+            rows.append(
+                [
+                    nameserver,
+                    owner,
+                    dnstype,
+                    "differs",
+                    "; ".join(sorted(want)),
+                    "; ".join(sorted(got)),
+                ]
+            )
+    return rows
+
+
+def nameserver_transfer(api, domain, nameserver):
+    """The address of a name server and its transfer of a zone
+
+    None if the name server cannot be resolved; the transfer is None if
+    it was refused.
+    """
+    try:
+        address = resolve_address(nameserver)
+    except OSError:
+        warn(f"Nameserver {nameserver} cannot be resolved")
+        return None
+    return address, transfer(address, api.auth_ns_port, domain)
+
+
+def audit_zones(api, zones, max_workers=32):
+    """Check zone snapshots against all their authoritative name servers
+
+    zones is an iterable of (domain, records). Every name server is asked
+    for a zone transfer first; if it refuses, the record sets of the zone
+    are queried one by one. The zones, their name servers and the queries
+    are all handled concurrently by max_workers threads. Returns a list of
+    (domain, rows) in the order of zones, the rows as described by HEADERS.
+    """
+    zones = list(zones)
+    port = api.auth_ns_port
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        servers = [executor.submit(nameservers, api, domain) for domain, _ in zones]
+        transfers = [
+            [
+                (x, executor.submit(nameserver_transfer, api, domain, x))
+                for x in future.result()
+            ]
+            for (domain, _), future in zip(zones, servers)
+        ]
+        # per zone: (name server, expected, served, complete) of each
+        checks = []
+        for (domain, records), pending in zip(zones, transfers):
+            expected = expected_rrsets(domain, records)
+            checks.append([])
+            for nameserver, future in pending:
+                result = future.result()
+                if result is None:
+                    continue
+                address, served = result
+                if served is None:
+                    served = {
+                        key: executor.submit(query_rrset, address, port, domain, *key)
+                        for key in expected
+                    }
+                    checks[-1].append((nameserver, expected, served, False))
+                else:
+                    checks[-1].append((nameserver, expected, served, True))
+        results = []
+        for (domain, _), zone_checks in zip(zones, checks):
+            rows = []
+            for nameserver, expected, served, complete in zone_checks:
+                if not complete:
+                    served = {x: y.result() for x, y in served.items()}
+                rows.extend(compare(nameserver, expected, served, complete))
+            results.append((domain, rows))
+    return results
+
+
+def audit_zone(api, domain, records, max_workers=32):
+    """Check a zone snapshot against all authoritative name servers
+
+    See audit_zones, returns the rows.
+    """
+    return audit_zones(api, [(domain, records)], max_workers)[0][1]
@@ -0,0 +1,130 @@
+#
+# Snapshot cache for pages fetched from the Bawue.Net web interface
+#
+# This code is licensed for use and distribution under the GPLv3+
+#
+
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+
+def default_cache_dir():
+    """Return the per-user cache directory"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "domainctl")
+
+
+class Cache:
+    """Cache parsed pages in memory and optionally on disk
+
+    Entries are keyed per account and per key (e.g. "domains" or
+    "zone:example.com") and expire after ttl seconds. If a path is given,
+    entries are also stored there as JSON files, guarded by file locks so
+    that concurrent processes can share them. Cached values are shared
+    between callers and must not be modified.
+    """
+
+    def __init__(self, ttl=60, path=None):
+        self.ttl = ttl
+        self.path = path
+        self._memory = {}
+        self._lock = threading.Lock()
+
+    def _filename(self, account, key):
+        account = hashlib.sha256(account.encode()).hexdigest()[:16]
+        key = key.replace(os.sep, "_")
+        return os.path.join(self.path, account, key + ".json")
+
+    @contextmanager
+    def _locked(self, filename, operation):
+        with open(filename + ".lock", "a") as lockfile:
+            fcntl.flock(lockfile, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lockfile, fcntl.LOCK_UN)
+
+    def _read(self, filename):
+        if not os.path.exists(filename):
+            return None
+        with self._locked(filename, fcntl.LOCK_SH):
+            try:
+                with open(filename) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                return None
+        value = entry["value"]
+        if entry.get("tuple"):
+            value = tuple(value)
+        return (entry["time"], value)
+
+    def _write(self, filename, entry):
+        dirname = os.path.dirname(filename)
+        os.makedirs(dirname, mode=0o700, exist_ok=True)
+        with self._locked(filename, fcntl.LOCK_EX):
+            fd, tmpname = tempfile.mkstemp(dir=dirname, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    # JSON has no tuples, a value is read back as it was set
+                    json.dump(
+                        {
+                            "time": entry[0],
+                            "value": entry[1],
+                            "tuple": isinstance(entry[1], tuple),
+                        },
+                        f,
+                    )
+                os.replace(tmpname, filename)
+            except BaseException:
+                try:
+                    os.unlink(tmpname)
+                except FileNotFoundError:
+                    pass
+                raise
+
+    def _remove(self, filename):
+        if not os.path.exists(filename):
+            return
+        with self._locked(filename, fcntl.LOCK_EX):
+            try:
+                os.unlink(filename)
+            except FileNotFoundError:
+                pass
+
+    def _expired(self, entry):
+        return time.time() - entry[0] > self.ttl
+
+    def get(self, account, key):
+        """Return a cached value or None if missing or expired"""
+        with self._lock:
+            entry = self._memory.get((account, key))
+        if self.path and (entry is None or self._expired(entry)):
+            # another process might have stored a fresher copy
+            entry = self._read(self._filename(account, key))
+            if entry is not None:
+                with self._lock:
+                    self._memory[(account, key)] = entry
+        if entry is None or self._expired(entry):
+            return None
+        return entry[1]
+
+    def set(self, account, key, value):
+        """Store a value"""
+        entry = (time.time(), value)
+        with self._lock:
+            self._memory[(account, key)] = entry
+        if self.path:
+            self._write(self._filename(account, key), entry)
+
+    def invalidate(self, account, key):
+        """Drop a value from all cache tiers"""
+        with self._lock:
+            self._memory.pop((account, key), None)
+        if self.path:
+            self._remove(self._filename(account, key))
@@ -0,0 +1,216 @@
+#
+# Serve a DomainsAPI over a local Unix socket
+#
+# This code is licensed for use and distribution under the GPLv3+
+#
+
+import functools
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+
+# methods of DomainsAPI which can be called through the socket
+METHODS = (
+    "get_domain_data",
+    "get_domains",
+    "get_domain_records",
+    "get_all_domain_records",
+    "iter_domain_records",
+    "apply_changes",
+    "delete_records",
+    "add_record",
+    "remove_record",
+    "get_soa_serial",
+    "record_visible",
+    "wait_for_records",
+    "wait_for_add_record",
+    "wait_for_remove_record",
+)
+# read-only methods, identical concurrent calls share one execution
+COALESCED = (
+    "get_domain_data",
+    "get_domains",
+    "get_domain_records",
+    "get_all_domain_records",
+    "iter_domain_records",
+    "get_soa_serial",
+    "record_visible",
+)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Coalescer:
+    """Let concurrent callers with the same key share one execution"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if leader:
+            try:
+                call.result = func()
+            except Exception as exc:
+                call.error = exc
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Answer newline separated JSON requests on a connection"""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                result = self.server.call(
+                    request["method"],
+                    request.get("args", []),
+                    request.get("kwargs", {}),
+                )
+                response = {"result": result}
+            except Exception as exc:
+                response = {"error": str(exc) or exc.__class__.__name__}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class DomainsServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Keep one DomainsAPI (session, caches, resolver) alive for clients"""
+
+    daemon_threads = True
+
+    def __init__(self, path, api):
+        self.api = api
+        self.coalescer = Coalescer()
+        if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(path)
+            except ConnectionRefusedError:
+                os.unlink(path)  # left over from an earlier run
+            else:
+                raise RuntimeError(f"A server is running on {path} already")
+            finally:
+                sock.close()
+        # the socket grants full access to the account, keep it private
+        umask = os.umask(0o077)
+        try:
+            super().__init__(path, _Handler)
+        finally:
+            os.umask(umask)
+
+    def _run(self, method, args, kwargs):
+        result = getattr(self.api, method)(*args, **kwargs)
+        if method in ("get_all_domain_records", "iter_domain_records"):
+            result = list(result)
+        return result
+
+    def call(self, method, args, kwargs):
+        if method not in METHODS:
+            raise RuntimeError(f"Unknown method {method}")
+        if method in COALESCED:
+            key = json.dumps([method, args, kwargs], sort_keys=True)
+            return self.coalescer.do(key, lambda: self._run(method, args, kwargs))
+        return self._run(method, args, kwargs)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+def serve(api, path):
+    """Serve api on the Unix socket path until interrupted"""
+    server = DomainsServer(path, api)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+class DaemonClient:
+    """Call the methods of a DomainsAPI served by domainctl serve
+
+    Supports the methods listed in METHODS with the same arguments;
+    failures on the server side are raised as RuntimeError. Every thread
+    uses a connection of its own, so that their calls run concurrently.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        # the connections of all threads, for close()
+        self._files = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError as exc:
+            sock.close()
+            raise RuntimeError(f"Cannot connect to {self.path}: {exc}")
+        f = self._local.file = sock.makefile("rwb")
+        sock.close()  # the file keeps the connection open
+        with self._lock:
+            self._files.append(f)
+        return f
+
+    def _disconnect(self):
+        f = self._local.file
+        self._local.file = None
+        with self._lock:
+            self._files.remove(f)
+        f.close()
+
+    def _call(self, method, *args, **kwargs):
+        request = {"method": method, "args": args, "kwargs": kwargs}
+        f = getattr(self._local, "file", None) or self._connect()
+        f.write(json.dumps(request).encode() + b"\n")
+        f.flush()
+        line = f.readline()
+        if not line:
+            self._disconnect()
+            raise RuntimeError(f"Connection to {self.path} closed")
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response["result"]
+
+    def __getattr__(self, name):
+        if name not in METHODS:
+            raise AttributeError(name)
+        return functools.partial(self._call, name)
+
+    def close(self):
+        with self._lock:
+            files, self._files = self._files, []
+        for f in files:
+            f.close()
+        self._local = threading.local()
@@ -0,0 +1,105 @@
+#
+# Append-only journal of the mutations of a bulk run
+#
+# This code is licensed for use and distribution under the GPLv3+
+#
+
+import json
+import threading
+import time
+
+
+class Journal:
+    """Record planned, done and failed mutations in a file, one JSON per line
+
+    An entry is a dict describing a mutation, e.g. a change of
+    apply_changes with its domain, or a zoneentryid to delete. Opening an
+    existing journal reads which entries are done: a DomainsAPI given the
+    journal skips them without looking at the zone again, so that an
+    interrupted run can be resumed and only tries what is outstanding.
+    Entries are identified by their content, so a journal is meant for
+    one run (and its resumptions), not for a long-lived daemon.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        # key -> entry of all entries planned, in the order of the file
+        self._planned = {}
+        self._done = set()
+        # entries skipped because they were done before
+        self.skipped = 0
+        try:
+            with open(path, "a+") as f:
+                f.seek(0)
+                content = f.read()
+                if content and not content.endswith("\n"):
+                    f.write("\n")  # a line cut off by an interruption
+        except OSError as exc:
+            raise RuntimeError(f"Cannot open journal {path}: {exc}")
+        for line in content.splitlines():
+            try:
+                event = json.loads(line)
+                key = self._key(event["entry"])
+            except (ValueError, KeyError, TypeError):
+                continue
+            if event.get("event") == "planned":
+                self._planned.setdefault(key, event["entry"])
+            elif event.get("event") == "done":
+                self._done.add(key)
+        self._file = open(path, "a")
+
+    @staticmethod
+    def _key(entry):
+        return json.dumps(entry, sort_keys=True)
+
+    def _write(self, event, entry, **extra):
+        line = dict(time=round(time.time(), 3), event=event, entry=entry, **extra)
+        self._file.write(json.dumps(line) + "\n")
+        self._file.flush()
+
+    def plan(self, entries):
+        """Record entries as planned
+
+        Returns per entry whether it is outstanding, False if it was done
+        before.
+        """
+        outstanding = []
+        with self._lock:
+            for entry in entries:
+                key = self._key(entry)
+                if key in self._done:
+                    self.skipped += 1
+                    outstanding.append(False)
+                    continue
+                if key not in self._planned:
+                    self._planned[key] = entry
+                    self._write("planned", entry)
+                outstanding.append(True)
+        return outstanding
+
+    def complete(self, entry):
+        """Record an entry as done"""
+        with self._lock:
+            self._done.add(self._key(entry))
+            self._write("done", entry)
+
+    def fail(self, entry, message):
+        """Record that an entry failed, it stays outstanding"""
+        with self._lock:
+            self._write("failed", entry, error=message)
+
+    def outstanding(self):
+        """The entries planned but not done"""
+        with self._lock:
+            return [y for x, y in self._planned.items() if x not in self._done]
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
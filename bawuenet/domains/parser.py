@@ -0,0 +1,263 @@
+#
+# Streaming extractor for the tables of the Bawue.Net web interface
+#
+# This code is licensed for use and distribution under the GPLv3+
+#
+
+import re
+from html.parser import HTMLParser
+
+CHUNK_SIZE = 65536
+# contents of these tags are not part of an element's text
+SKIP_TAGS = ("script", "style")
+
+_have_lxml = None
+_table_start = re.compile(r"<table[\s>]", re.IGNORECASE)
+
+
+class NoTableError(RuntimeError):
+    """The page has no table, e.g. a login or error page instead of the data"""
+
+
+class _TableDone(Exception):
+    pass
+
+
+class _TableBuilder:
+    """Collect headers, data and form metadata row by row
+
+    Mirrors DomainsAPI.parse_html_table: the first row provides the
+    headers (from its th cells), every further row the non-empty td cells
+    and, with formdata, the inputs of its first form.
+    """
+
+    def __init__(self, formdata):
+        self.formdata = formdata
+        self.headers = None
+        self.data = []
+        self.metadata = []
+
+    def add_row(self, cells, form):
+        if self.headers is None:
+            self.headers = [text for tag, text in cells if tag == "th"]
+            return
+        self.data.append([text.strip() for tag, text in cells if tag == "td" and text])
+        self.metadata.append(form if form is not None else {})
+
+    def result(self):
+        if self.headers is None:
+            raise NoTableError("No table found in the page")
+        headers = [x for x in self.headers or [] if len(x) > 0]
+        if self.formdata:
+            return (headers, self.data, self.metadata)
+        return (headers, self.data)
+
+
+class _TableParser(HTMLParser):
+    """Feed the rows of the first table of a page into a _TableBuilder"""
+
+    def __init__(self, builder):
+        super().__init__(convert_charrefs=True)
+        self.builder = builder
+        self.depth = 0
+        self.skip = 0
+        self.row = None
+        self.cell = None
+        self.form = None
+        self.in_form = False
+
+    def _end_cell(self):
+        if self.cell is not None:
+            self.row.append((self.cell_tag, "".join(self.cell)))
+            self.cell = None
+
+    def _end_row(self):
+        if self.row is not None:
+            self._end_cell()
+            self.builder.add_row(self.row, self.form)
+            self.row = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self.depth += 1
+        elif self.depth == 0:
+            return
+        elif tag in SKIP_TAGS:
+            self.skip += 1
+        elif tag == "tr":
+            self._end_row()
+            self.row = []
+            self.form = None
+            self.in_form = False
+        elif self.row is None:
+            return
+        elif tag in ("td", "th"):
+            self._end_cell()
+            self.cell = []
+            self.cell_tag = tag
+        elif tag == "form" and self.builder.formdata and self.form is None:
+            self.form = {}
+            self.in_form = True
+        elif tag == "input" and self.in_form:
+            attrs = dict((k, "" if v is None else v) for k, v in attrs)
+            self.form[attrs.get("name")] = attrs.get("value")
+
+    def handle_endtag(self, tag):
+        if self.depth == 0:
+            return
+        if tag == "table":
+            self.depth -= 1
+            if self.depth == 0:
+                self._end_row()
+                raise _TableDone()
+        elif tag in SKIP_TAGS:
+            self.skip = max(self.skip - 1, 0)
+        elif tag == "form":
+            self.in_form = False
+        elif tag in ("td", "th") and self.row is not None:
+            self._end_cell()
+        elif tag == "tr":
+            self._end_row()
+
+    def handle_data(self, data):
+        if self.cell is not None and not self.skip:
+            self.cell.append(data)
+
+
+def _lxml_text(element):
+    """Text content of an element, without comments, scripts and styles"""
+    parts = []
+    if element.text and element.tag not in SKIP_TAGS:
+        parts.append(element.text)
+    for child in element:
+        if isinstance(child.tag, str):
+            parts.append(_lxml_text(child))
+        if child.tail:
+            parts.append(child.tail)
+    return "".join(parts)
+
+
+def have_lxml():
+    """Check if the lxml backend is available"""
+    global _have_lxml
+    if _have_lxml is None:
+        try:
+            import lxml.etree  # noqa: F401
+
+            _have_lxml = True
+        except ImportError:
+            _have_lxml = False
+    return _have_lxml
+
+
+def _chunks(html):
+    for pos in range(0, len(html), CHUNK_SIZE):
+        yield html[pos : pos + CHUNK_SIZE]
+
+
+def _feed_lxml(chunks, builder):
+    """Feed chunks into lxml, yielding after each one"""
+    from lxml import etree
+
+    parser = etree.HTMLPullParser(events=("start", "end"))
+    depth = 0
+
+    def handle_events():
+        nonlocal depth
+        for event, element in parser.read_events():
+            if element.tag == "table":
+                depth += 1 if event == "start" else -1
+                if depth == 0:
+                    raise _TableDone()
+            elif event == "end" and element.tag == "tr" and depth > 0:
+                cells = [(x.tag, _lxml_text(x)) for x in element.iter("th", "td")]
+                form = None
+                if builder.formdata:
+                    form = next(element.iter("form"), None)
+                    if form is not None:
+                        form = dict(
+                            (x.get("name"), x.get("value")) for x in form.iter("input")
+                        )
+                builder.add_row(cells, form)
+                element.clear()
+
+    try:
+        for chunk in chunks:
+            parser.feed(chunk)
+            handle_events()
+            yield
+        parser.close()
+        handle_events()
+    except _TableDone:
+        pass
+
+
+def _feed_html_parser(chunks, builder):
+    """Feed chunks into html.parser, yielding after each one"""
+    parser = _TableParser(builder)
+    try:
+        for chunk in chunks:
+            parser.feed(chunk)
+            yield
+        parser.close()
+    except _TableDone:
+        pass
+    parser._end_row()
+
+
+def _feeder(backend):
+    if backend is None:
+        backend = "lxml" if have_lxml() else "html.parser"
+    if backend == "lxml":
+        return _feed_lxml
+    elif backend == "html.parser":
+        return _feed_html_parser
+    raise ValueError(f"Unknown backend {backend}")
+
+
+def extract_table(html, formdata=False, backend=None):
+    """Extract headers and data from the first table of a html page
+
+    Returns the same (headers, data) or, with formdata, (headers, data,
+    metadata) as DomainsAPI.parse_html_table. The page is parsed as a
+    stream which stops at the end of the first table. The backend is
+    "lxml" or "html.parser"; by default lxml is used if it is installed.
+    Raises NoTableError if the page has no table.
+    """
+    feed = _feeder(backend)
+    builder = _TableBuilder(formdata)
+    match = _table_start.search(html)
+    if match:
+        for _ in feed(_chunks(html[match.start() :]), builder):
+            pass
+    return builder.result()
+
+
+def iter_table(chunks, formdata=False, backend=None):
+    """Yield the rows of the first table of a html page as it is parsed
+
+    chunks is an iterable of text pieces of the page, e.g. from
+    requests' iter_content. Every row is yielded as (headers, data) or,
+    with formdata, (headers, data, metadata) like extract_table returns
+    them for the whole table, as soon as its chunk has been fed. Raises
+    NoTableError at the end if the page had no table.
+    """
+    builder = _TableBuilder(formdata)
+
+    def drain():
+        if not builder.data:
+            return
+        headers = builder.result()[0]
+        for idx in range(len(builder.data)):
+            if formdata:
+                yield (headers, builder.data[idx], builder.metadata[idx])
+            else:
+                yield (headers, builder.data[idx])
+        # the rows are passed on, not collected
+        builder.data.clear()
+        builder.metadata.clear()
+
+    for _ in _feeder(backend)(chunks, builder):
+        yield from drain()
+    yield from drain()
+    builder.result()  # raises if there was no table
@@ -0,0 +1,90 @@
+#
+# Schedule of the polls waiting for DNS changes
+#
+# This code is licensed for use and distribution under the GPLv3+
+#
+
+import time
+
+
+class Poll:
+    """The state of a wait for many records, without any queries
+
+    records is a list of (domain, host, type, rr, state) tuples as for
+    DomainsAPI.wait_for_records, schedule its poll_schedule. The caller
+    checks all records, passes the SOA serials of the domains() still
+    pending to first_serials() and then, as long as pause() returns a
+    number of seconds, sleeps that long and checks the records recheck()
+    returns for the current serials. result() returns the timings or
+    raises if the timeout was exceeded.
+    """
+
+    def __init__(self, records, serials, timeout, schedule):
+        self.records = records
+        self.start, self.factor, self.longest = schedule
+        self.began = time.monotonic()
+        self.deadline = self.began + timeout
+        self.serials = dict(serials or {})
+        self.timings = [None] * len(records)
+        self.pending = list(range(len(records)))
+        self.delay = self.start
+        self.last_full = self.began
+        # the last pause ends at the deadline
+        self.final = False
+
+    def domains(self):
+        """The domains with pending records"""
+        return sorted(set(self.records[idx][0] for idx in self.pending))
+
+    def settled(self, indexes, visible):
+        """Take the results of a check, per record whether it was served"""
+        now = time.monotonic()
+        still = set()
+        for idx, served in zip(indexes, visible):
+            if served == (self.records[idx][4] == "present"):
+                self.timings[idx] = now - self.began
+            else:
+                still.add(idx)
+        indexes = set(indexes)
+        self.pending = [x for x in self.pending if x not in indexes or x in still]
+
+    def first_serials(self, serials):
+        """Take the serials of the zones from before the change, if not given"""
+        for domain, serial in serials.items():
+            self.serials.setdefault(domain, serial)
+        self.last_full = time.monotonic()
+
+    def pause(self):
+        """Seconds to sleep before the next round, None when done"""
+        if not self.pending or self.final:
+            return None
+        remaining = self.deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        self.final = remaining <= self.delay
+        pause = min(self.delay, remaining)
+        self.delay = min(self.delay * self.factor, self.longest)
+        return pause
+
+    def recheck(self, serials):
+        """The pending records to check again, given the current serials
+
+        Those of zones whose serial changed, all of them at the latest
+        after the longest poll interval and at the deadline.
+        """
+        full = self.final or time.monotonic() - self.last_full >= self.longest
+        if full:
+            self.last_full = time.monotonic()
+        changed = set(
+            domain
+            for domain, serial in serials.items()
+            if full or serial is None or serial != self.serials.get(domain)
+        )
+        self.serials.update(serials)
+        return [idx for idx in self.pending if self.records[idx][0] in changed]
+
+    def result(self):
+        """The seconds each record took to settle"""
+        if self.pending:
+            raise RuntimeError("Timeout exceeded waiting for DNS change...")
+        return self.timings
@@ -0,0 +1,90 @@
+#
+# Apply the same changes to many domains
+#
+# This code is licensed for use and distribution under the GPLv3+
+#
+
+import fnmatch
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from bawuenet.domains import DomainsAPI
+
+
+def expand(template, domain):
+    """The changes of a template for one domain
+
+    A template is a list of changes as for DomainsAPI.apply_changes;
+    {domain} in host and rr is replaced with the name of the domain.
+    """
+    changes = []
+    for change in template:
+        change = dict(change)
+        for key in ("host", "rr"):
+            change[key] = str(change[key]).replace("{domain}", domain)
+        changes.append(change)
+    return changes
+
+
+def select_domains(domains, pattern):
+    """The domains matching a shell pattern, all of them for ALL"""
+    if pattern == "ALL":
+        return list(domains)
+    return [x for x in domains if fnmatch.fnmatchcase(x, pattern)]
+
+
+def apply_domain(api, differ, template, domain, dry_run=False):
+    """Bring one domain in line with a template
+
+    The zone is fetched once; the changes still needed are computed
+    against its indexed records and committed one by one, so that a
+    failing request does not hide the others. Returns the changes and
+    per change None or the message of the RuntimeError it failed with.
+    """
+    records = api.get_domain_records(domain)
+    delta = differ.diff_records(domain, expand(template, domain), records=records)
+    if dry_run:
+        return delta, [None] * len(delta)
+    results = []
+    for idx, change in enumerate(delta):
+        try:
+            # the snapshot just fetched is kept and updated with each change
+            api.apply_changes(domain, [change], records if idx == 0 else None)
+        except RuntimeError as exc:
+            results.append(str(exc))
+            continue
+        results.append(None)
+    return delta, results
+
+
+def apply_template(api, template, domains, max_workers=8, dry_run=False):
+    """Apply a template to many domains concurrently
+
+    Each domain is fetched, compared and changed in one of max_workers
+    threads. Yields (domain, changes, results, error) tuples as soon as a
+    domain is done, see apply_domain; error is the message if the zone
+    could not be fetched, the changes and results are empty then. With a
+    journal, domains it lists as done are skipped without fetching them;
+    their changes and results are None.
+    """
+    # the changes are computed here, also when api is a DaemonClient
+    differ = api if isinstance(api, DomainsAPI) else DomainsAPI(None, None)
+    journal = None if dry_run else getattr(api, "journal", None)
+
+    def run(domain):
+        entry = {"domain": domain, "template": expand(template, domain)}
+        if journal is not None and not journal.plan([entry])[0]:
+            return domain, None, None, None
+        try:
+            changes, results = apply_domain(api, differ, template, domain, dry_run)
+        except RuntimeError as exc:
+            if journal is not None:
+                journal.fail(entry, str(exc))
+            return domain, [], [], str(exc)
+        if journal is not None and not any(results):
+            journal.complete(entry)
+        return domain, changes, results, None
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = [executor.submit(run, x) for x in domains]
+        for future in as_completed(futures):
+            yield future.result()
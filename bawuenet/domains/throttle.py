@@ -0,0 +1,126 @@
+#
+# Rate and concurrency limits for requests to the Bawue.Net web interface
+#
+# This code is licensed for use and distribution under the GPLv3+
+#
+
+import fcntl
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+
+def default_throttle_dir():
+    """Return the directory in which all processes of the user share limits"""
+    from bawuenet.domains.cache import default_cache_dir
+
+    return os.path.join(default_cache_dir(), "throttle")
+
+
+class Throttle:
+    """A token bucket and a limit of concurrent requests
+
+    rate requests per second are allowed on average, with bursts of up to
+    burst requests, and at most max_concurrent requests are in flight at
+    the same time; None or 0 disables a limit. Without a path the limits
+    apply to the threads of this process, with a path they are shared
+    through lock and state files by all processes using that directory,
+    e.g. the forks of an Ansible run.
+    """
+
+    def __init__(self, rate=None, burst=None, max_concurrent=None, path=None):
+        self.rate = rate or None
+        self.burst = burst or max(1, int(rate or 1))
+        self.max_concurrent = max_concurrent or None
+        self.path = path
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.time()
+        self._slots = None
+        if path is not None:
+            os.makedirs(path, mode=0o700, exist_ok=True)
+        elif self.max_concurrent:
+            self._slots = threading.BoundedSemaphore(self.max_concurrent)
+
+    def _refill(self, tokens, updated, now):
+        return min(self.burst, tokens + (now - updated) * self.rate)
+
+    def _take_token(self):
+        """Take a token if there is one, else return the seconds to wait"""
+        now = time.time()
+        with self._lock:
+            if self.path is None:
+                return self._spend(self._refill(self._tokens, self._updated, now), now)
+            fd = os.open(
+                os.path.join(self.path, "bucket"), os.O_RDWR | os.O_CREAT, 0o600
+            )
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    tokens, updated = (
+                        float(x) for x in os.read(fd, 64).decode().split()
+                    )
+                    tokens = self._refill(tokens, updated, now)
+                except ValueError:
+                    tokens = float(self.burst)  # new or damaged state
+                wait = self._spend(tokens, now)
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, f"{self._tokens} {self._updated}".encode())
+                return wait
+            finally:
+                os.close(fd)
+
+    def _spend(self, tokens, now):
+        self._updated = now
+        if tokens >= 1:
+            self._tokens = tokens - 1
+            return 0
+        self._tokens = tokens
+        return (1 - tokens) / self.rate
+
+    def _open_slot(self, idx):
+        return os.open(
+            os.path.join(self.path, f"slot-{idx}.lock"), os.O_RDWR | os.O_CREAT, 0o600
+        )
+
+    def _acquire_slot(self):
+        """Lock one of the max_concurrent slot files, return its descriptor"""
+        for idx in random.sample(range(self.max_concurrent), self.max_concurrent):
+            fd = self._open_slot(idx)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                os.close(fd)
+        # all busy, queue up for one of them
+        fd = self._open_slot(random.randrange(self.max_concurrent))
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        except BaseException:
+            os.close(fd)
+            raise
+        return fd
+
+    @contextmanager
+    def slot(self):
+        """Wait until a request may be sent and hold a slot while it runs"""
+        if self.rate:
+            while True:
+                wait = self._take_token()
+                if not wait:
+                    break
+                time.sleep(wait)
+        if not self.max_concurrent:
+            yield
+        elif self._slots is not None:
+            with self._slots:
+                yield
+        else:
+            fd = self._acquire_slot()
+            try:
+                yield
+            finally:
+                os.close(fd)  # releases the lock
@@ -0,0 +1,168 @@
+#
+# Per-phase timing of DomainsAPI calls
+#
+# This code is licensed for use and distribution under the GPLv3+
+#
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+# upper bounds of the latency histogram buckets in seconds
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class _Phase:
+    __slots__ = ("count", "seconds", "max_seconds", "bytes", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.bytes = 0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+
+class Span:
+    """Time a block of code; bytes can be added while it runs"""
+
+    __slots__ = ("timings", "phase", "bytes", "start")
+
+    def __init__(self, timings, phase):
+        self.timings = timings
+        self.phase = phase
+        self.bytes = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings.observe(self.phase, time.perf_counter() - self.start, self.bytes)
+
+
+class _NullSpan:
+    """Stand-in for Span when no timings are collected"""
+
+    bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Timings:
+    """Count, duration, bytes and a latency histogram per phase
+
+    DomainsAPI records the phases "http" (requests to the web interface),
+    "throttle" and "retry" (pauses before them), "parse" (extracting the
+    tables), "dns" (queries to the name server), "wait" (rounds of the wait
+    loop) and "sleep" (the pauses within).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._phases = {}
+
+    def span(self, phase):
+        return Span(self, phase)
+
+    def observe(self, phase, seconds, nbytes=0):
+        with self._lock:
+            stats = self._phases.get(phase)
+            if stats is None:
+                stats = self._phases[phase] = _Phase()
+            stats.count += 1
+            stats.seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.bytes += nbytes
+            for idx, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    break
+            else:
+                idx = len(BUCKETS)
+            stats.buckets[idx] += 1
+
+    def as_dict(self):
+        """The statistics of all phases, the buckets counted cumulatively"""
+        result = {}
+        with self._lock:
+            for phase, stats in sorted(self._phases.items()):
+                buckets = {}
+                total = 0
+                for bound, count in zip(BUCKETS + ("+Inf",), stats.buckets):
+                    total += count
+                    buckets[str(bound)] = total
+                result[phase] = {
+                    "count": stats.count,
+                    "seconds": stats.seconds,
+                    "max_seconds": stats.max_seconds,
+                    "bytes": stats.bytes,
+                    "buckets": buckets,
+                }
+        return result
+
+    def summary(self):
+        """Headers and rows of a table with one line per phase"""
+        headers = ["phase", "count", "total s", "mean ms", "max ms", "bytes"]
+        rows = []
+        for phase, stats in self.as_dict().items():
+            rows.append(
+                [
+                    phase,
+                    stats["count"],
+                    round(stats["seconds"], 3),
+                    round(stats["seconds"] / stats["count"] * 1000, 1),
+                    round(stats["max_seconds"] * 1000, 1),
+                    stats["bytes"],
+                ]
+            )
+        return headers, rows
+
+    def prometheus(self, prefix="domainctl"):
+        """The statistics in the Prometheus text exposition format"""
+        lines = [
+            f"# HELP {prefix}_phase_seconds Time spent per phase.",
+            f"# TYPE {prefix}_phase_seconds histogram",
+        ]
+        phases = self.as_dict()
+        for phase, stats in phases.items():
+            name = f"{prefix}_phase_seconds"
+            for bound, count in stats["buckets"].items():
+                lines.append(f'{name}_bucket{{phase="{phase}",le="{bound}"}} {count}')
+            lines.append(f'{name}_sum{{phase="{phase}"}} {stats["seconds"]}')
+            lines.append(f'{name}_count{{phase="{phase}"}} {stats["count"]}')
+        lines.append(f"# HELP {prefix}_phase_bytes_total Bytes received per phase.")
+        lines.append(f"# TYPE {prefix}_phase_bytes_total counter")
+        for phase, stats in phases.items():
+            lines.append(
+                f'{prefix}_phase_bytes_total{{phase="{phase}"}} {stats["bytes"]}'
+            )
+        return "\n".join(lines) + "\n"
+
+    def _write(self, path, text):
+        """Replace a file atomically, as the node exporter's textfile collector
+        expects"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=".timings-")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(text)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def write_json(self, path):
+        self._write(path, json.dumps(self.as_dict(), indent=2) + "\n")
+
+    def write_prometheus(self, path):
+        self._write(path, self.prometheus())
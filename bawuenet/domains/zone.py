@@ -0,0 +1,202 @@
+#
+# Indexed model of a zone as shown by the Bawue.Net web interface
+#
+# This code is licensed for use and distribution under the GPLv3+
+#
+
+import fnmatch
+
+
+class Record:
+    """A single entry of a zone"""
+
+    __slots__ = ("owner", "rclass", "type", "rr", "zoneentryid", "metadata")
+
+    def __init__(self, owner, rclass, type, rr, zoneentryid=None, metadata=None):
+        self.owner = owner
+        self.rclass = rclass
+        self.type = type
+        self.rr = rr
+        self.zoneentryid = zoneentryid
+        # only kept if the delete form differs from the zone's usual one
+        self.metadata = metadata
+
+    def __repr__(self):
+        return "Record(%r, %r, %r, %r, %r)" % (
+            self.owner,
+            self.rclass,
+            self.type,
+            self.rr,
+            self.zoneentryid,
+        )
+
+    def as_dict(self):
+        return {
+            "Owner": self.owner,
+            "Class": self.rclass,
+            "Type": self.type,
+            "Ressource Record": self.rr,
+            "zoneentryid": self.zoneentryid,
+        }
+
+
+class Zone:
+    """The records of a domain with hash indexes
+
+    Records can be looked up by (owner, type), by (owner, rr) and by
+    zoneentryid in constant time. from_table and as_table convert from and
+    to the (headers, table) tuple returned by get_domain_records.
+    """
+
+    columns = {
+        "Owner": "owner",
+        "Class": "rclass",
+        "Type": "type",
+        "Ressource Record": "rr",
+    }
+
+    def __init__(self, domain, headers=None, form=None):
+        self.domain = domain
+        self.headers = headers or list(self.columns)
+        # keys and values of the delete form, the zoneentryid left as None
+        self.form = form
+        # patched locally with records whose zoneentryid is not known yet
+        self.provisional = False
+        # used as an ordered set, for removals in constant time
+        self._records = {}
+        self._by_owner_type = {}
+        self._by_owner_rr = {}
+        self._by_id = {}
+
+    @classmethod
+    def from_table(cls, domain, headers, table):
+        """Build a zone from the (headers, table) of get_domain_records"""
+        headers = headers[:-1]  # the metadata column
+        attrs = [cls.columns.get(x) for x in headers]
+        zone = cls(domain, headers)
+        for row in table:
+            values = dict(zip(attrs, row[:-1]))
+            values.pop(None, None)
+            metadata = row[-1] if row else {}
+            zoneentryid = metadata.get("zoneentryid")
+            form = [(k, None if k == "zoneentryid" else v) for k, v in metadata.items()]
+            if zone.form is None and zoneentryid is not None:
+                zone.form = form
+            record = Record(
+                values.get("owner", ""),
+                values.get("rclass", ""),
+                values.get("type", ""),
+                values.get("rr", ""),
+                zoneentryid,
+                None if form == zone.form else metadata,
+            )
+            zone.add(record)
+        return zone
+
+    @classmethod
+    def from_snapshot(cls, domain, records):
+        """Accept either a Zone or the (headers, table) of get_domain_records"""
+        if isinstance(records, cls):
+            return records
+        return cls.from_table(domain, *records)
+
+    def as_table(self):
+        """Return the zone as (headers, table) like get_domain_records"""
+        attrs = [self.columns.get(x) for x in self.headers]
+        table = []
+        for record in self._records:
+            row = [getattr(record, x) if x else "" for x in attrs]
+            if record.metadata is not None:
+                metadata = dict(record.metadata)
+            elif self.form is not None and record.zoneentryid is not None:
+                metadata = dict(
+                    (k, record.zoneentryid if k == "zoneentryid" else v)
+                    for k, v in self.form
+                )
+            else:
+                metadata = {}
+            table.append(row + [metadata])
+        return (self.headers + ["metadata"], table)
+
+    def update(self, other):
+        """Take over the records of a newer Zone of the same domain"""
+        self.headers = other.headers
+        self.form = other.form
+        self.provisional = other.provisional
+        self._records = other._records
+        self._by_owner_type = other._by_owner_type
+        self._by_owner_rr = other._by_owner_rr
+        self._by_id = other._by_id
+
+    @property
+    def records(self):
+        return list(self._records)
+
+    def add(self, record):
+        self._records[record] = None
+        self._by_owner_type.setdefault((record.owner, record.type), []).append(record)
+        self._by_owner_rr.setdefault((record.owner, record.rr), []).append(record)
+        if record.zoneentryid is not None:
+            self._by_id[record.zoneentryid] = record
+
+    def remove(self, record):
+        del self._records[record]
+        for index, key in (
+            (self._by_owner_type, (record.owner, record.type)),
+            (self._by_owner_rr, (record.owner, record.rr)),
+        ):
+            index[key].remove(record)
+            if not index[key]:
+                del index[key]
+        if record.zoneentryid is not None:
+            self._by_id.pop(record.zoneentryid, None)
+
+    def lookup(self, owner, type):
+        """Records with the given owner and type"""
+        return list(self._by_owner_type.get((owner, type), []))
+
+    def find(self, owner, rr):
+        """Records with the given owner and resource record"""
+        return list(self._by_owner_rr.get((owner, rr), []))
+
+    def get(self, zoneentryid):
+        """The record with the given id or None"""
+        return self._by_id.get(zoneentryid)
+
+    def match(self, pattern="*", type=None, keep=0):
+        """Records matching a glob pattern and optionally a type
+
+        The pattern is matched against the host relative to the domain
+        (@ for the domain itself). Of every owner and type, the keep records
+        added last (with the highest zoneentryid) are left out, as are
+        records without a known zoneentryid.
+        """
+        groups = {}
+        for record in self._records:
+            if record.zoneentryid is None or type not in (None, record.type):
+                continue
+            if record.owner == self.domain:
+                host = "@"
+            elif record.owner.endswith("." + self.domain):
+                host = record.owner[: -len(self.domain) - 1]
+            else:
+                host = record.owner
+            if fnmatch.fnmatchcase(host, pattern):
+                groups.setdefault((record.owner, record.type), []).append(record)
+        matches = []
+        for records in groups.values():
+            if keep > 0:
+                records.sort(key=lambda x: int(x.zoneentryid or 0))
+                records = records[:-keep]
+            matches.extend(records)
+        return matches
+
+    def __contains__(self, key):
+        """Check for an (owner, rr) combination"""
+        return key in self._by_owner_rr
+
+    def __iter__(self):
+        return iter(list(self._records))
+
+    def __len__(self):
+        return len(self._records)
@@ -0,0 +1,109 @@
+#
+# Synchronise RFC 1035 zone files with the Bawue.Net web interface
+#
+# This code is licensed for use and distribution under the GPLv3+
+#
+
+import dns.name
+import dns.rdata
+import dns.rdataclass
+import dns.rdatatype
+import dns.zone
+
+from bawuenet.domains import DomainsAPI, warn
+from bawuenet.domains.zone import Zone
+
+
+def normalize_rr(dnstype, rr, domain):
+    """Canonical text of a resource record, to compare records reliably"""
+    try:
+        rdata = dns.rdata.from_text(
+            dns.rdataclass.IN, dnstype, rr, origin=dns.name.from_text(domain)
+        )
+    except Exception:
+        return rr  # not parseable, compare the text as it is
+    return rdata.to_text()
+
+
+def read_zonefile(f, domain):
+    """Read the records of a zone file as a list of changes
+
+    SOA records and the NS records of the domain itself are left out, as
+    the web interface does not manage them, as are types it does not
+    support. rr is written the way the web interface shows it, with
+    absolute names.
+    """
+    origin = dns.name.from_text(domain)
+    zone = dns.zone.from_file(f, origin=origin, relativize=False, check_origin=False)
+    changes = []
+    for name, ttl, rdata in zone.iterate_rdatas():
+        dnstype = dns.rdatatype.to_text(rdata.rdtype)
+        if dnstype == "SOA" or (dnstype == "NS" and name == origin):
+            continue
+        host = name.relativize(origin).to_text()
+        if dnstype not in DomainsAPI.type_table:
+            warn(f"Record {name} of type {dnstype} is not supported, skipped")
+            continue
+        changes.append(
+            {"host": host, "type": dnstype, "rr": rdata.to_text(), "state": "present"}
+        )
+    return changes
+
+
+def sync_changes(domain, wanted, records, prune=False):
+    """Compute the changes to turn a zone into the records of a zone file
+
+    wanted is a list as returned by read_zonefile, records a zone snapshot
+    from get_zone or get_domain_records. Records of the zone which are
+    missing from the file are only removed with prune. SOA records and the
+    NS records of the domain itself are ignored, as by read_zonefile.
+    """
+    apex = domain.lower().rstrip(".")
+    live = {}
+    for record in Zone.from_snapshot(domain, records):
+        owner = record.owner.lower().rstrip(".")
+        if record.type == "SOA" or (record.type == "NS" and owner == apex):
+            continue
+        key = (
+            owner,
+            record.type,
+            normalize_rr(record.type, record.rr, domain),
+        )
+        live[key] = record
+    desired = {}
+    for change in wanted:
+        key = (
+            DomainsAPI.fullhost(change["host"], domain).lower(),
+            change["type"],
+            normalize_rr(change["type"], change["rr"], domain),
+        )
+        desired[key] = change
+    delta = [desired[key] for key in desired.keys() - live.keys()]
+    if prune:
+        for key in live.keys() - desired.keys():
+            record = live[key]
+            host = DomainsAPI.hostname(record.owner, domain)
+            if host is None:
+                warn(f"Record {record.owner} cannot be removed")
+                continue
+            delta.append(
+                {
+                    "host": host,
+                    "type": record.type,
+                    "rr": record.rr,
+                    "state": "absent",
+                }
+            )
+    # removals first, so that changed records are not doubled meanwhile
+    return sorted(delta, key=lambda x: (x["state"] == "present", x["host"], x["type"]))
+
+
+def write_zonefile(f, domain, records, ttl=3600):
+    """Write a zone snapshot from get_zone or get_domain_records as a zone file"""
+    f.write(f"$ORIGIN {domain}.\n")
+    f.write(f"$TTL {ttl}\n")
+    for record in Zone.from_snapshot(domain, records):
+        f.write(
+            "%s. %s %s %s\n"
+            % (record.owner.rstrip("."), record.rclass, record.type, record.rr)
+        )
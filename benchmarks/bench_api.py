@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+#
+# End-to-end benchmarks of DomainsAPI against the local stand-in servers
+#
+# This code is licensed for use and distribution under the GPLv3+
+#
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bawuenet.domains import DomainsAPI  # noqa: E402
+from bawuenet.domains.throttle import Throttle  # noqa: E402
+from standin import Standin  # noqa: E402
+
+
+def make_api(standin, poll_schedule):
+    api = standin.configure(DomainsAPI("bench", "bench"))
+    api.poll_schedule = poll_schedule
+    return api
+
+
+def summary(times):
+    """Median, 95th percentile and maximum of a list of seconds, in ms"""
+    times = sorted(times)
+    return {
+        "count": len(times),
+        "median_ms": statistics.median(times) * 1000,
+        "p95_ms": times[min(len(times) - 1, int(len(times) * 0.95))] * 1000,
+        "max_ms": times[-1] * 1000,
+    }
+
+
+def timed(func, repeat):
+    func()  # warm up the connection
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def bench_list_domains(args):
+    with Standin(args.domains, 0, args.latency) as standin:
+        api = make_api(standin, args.poll_schedule)
+        return summary(timed(api.get_domains, args.repeat))
+
+
+def bench_list_records(args):
+    results = []
+    for size in args.sizes:
+        with Standin(1, size, args.latency) as standin:
+            api = make_api(standin, args.poll_schedule)
+            times = timed(lambda: api.get_domain_records("example0.de"), args.repeat)
+            results.append(dict(records=size, **summary(times)))
+    return results
+
+
+def bench_changes(args):
+    """Records added and removed per second, one by one and as a batch"""
+    count = args.changes
+    with Standin(1, args.sizes[0], args.latency) as standin:
+        api = make_api(standin, args.poll_schedule)
+        hosts = [f"bench{idx}" for idx in range(count)]
+        start = time.perf_counter()
+        for host in hosts:
+            api.add_record("example0.de", host, "A", "192.0.2.1")
+        add = time.perf_counter() - start
+        start = time.perf_counter()
+        for host in hosts:
+            api.remove_record("example0.de", host, "A", "192.0.2.1")
+        remove = time.perf_counter() - start
+        changes = [{"host": x, "type": "A", "rr": "192.0.2.2"} for x in hosts]
+        start = time.perf_counter()
+        api.apply_changes("example0.de", changes)
+        for change in changes:
+            change["state"] = "absent"
+        api.apply_changes("example0.de", changes)
+        batch = time.perf_counter() - start
+    return {
+        "changes": count,
+        "add_per_s": count / add,
+        "remove_per_s": count / remove,
+        "apply_per_s": 2 * count / batch,
+    }
+
+
+def bench_acme_burst(args):
+    """Clients adding, awaiting and removing a challenge at the same time"""
+    with Standin(args.burst, args.sizes[0], args.latency, args.propagation) as s:
+        times = [None] * args.burst
+        errors = []
+
+        def client(idx):
+            api = make_api(s, args.poll_schedule)
+            domain = f"example{idx}.de"
+            record = ("_acme-challenge", "TXT", f'"token-{idx}"')
+            start = time.perf_counter()
+            try:
+                serial = api.get_soa_serial(domain)
+                api.add_record(domain, *record)
+                api.wait_for_add_record(domain, *record, serial, args.timeout)
+                api.remove_record(domain, *record)
+                times[idx] = time.perf_counter() - start
+            except Exception as exc:
+                errors.append(str(exc))
+
+        threads = [
+            threading.Thread(target=client, args=(idx,)) for idx in range(args.burst)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        total = time.perf_counter() - start
+    result = {"clients": args.burst, "total_s": total, "errors": errors}
+    result.update(summary([x for x in times if x is not None] or [0]))
+    return result
+
+
+def bench_wait_latency(args):
+    """How long after the name server has the change the wait returns"""
+    with Standin(1, args.sizes[0], args.latency, args.propagation) as standin:
+        api = make_api(standin, args.poll_schedule)
+        overshoot = []
+        for idx in range(args.repeat):
+            host = f"wait{idx}"
+            serial = api.get_soa_serial("example0.de")
+            api.add_record("example0.de", host, "A", "192.0.2.3")
+            start = time.perf_counter()
+            api.wait_for_add_record(
+                "example0.de", host, "A", "192.0.2.3", serial, args.timeout
+            )
+            overshoot.append(max(time.perf_counter() - start - args.propagation, 0))
+    return dict(propagation_s=args.propagation, **summary(overshoot))
+
+
+def _contention_worker(base_url, args, path, queue):
+    throttle = None
+    if args.rate or args.max_concurrent:
+        throttle = Throttle(args.rate, None, args.max_concurrent, path)
+    api = DomainsAPI("bench", "bench", throttle=throttle)
+    api.base_url = base_url
+    done = failed = 0
+    for idx in range(args.requests):
+        try:
+            api.get_domain_records(f"example{idx % args.domains}.de")
+            done += 1
+        except RuntimeError:
+            failed += 1
+    queue.put((done, failed))
+
+
+def bench_contention(args):
+    """Processes reading zones at once through a flaky web interface"""
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    with tempfile.TemporaryDirectory() as path, Standin(
+        args.domains, args.sizes[0], args.latency, errors=args.errors
+    ) as standin:
+        workers = [
+            context.Process(
+                target=_contention_worker,
+                args=(standin.base_url, args, path, queue),
+            )
+            for _ in range(args.processes)
+        ]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        results = [queue.get() for _ in workers]
+        total = time.perf_counter() - start
+        for worker in workers:
+            worker.join()
+    done = sum(x[0] for x in results)
+    return {
+        "processes": args.processes,
+        "errors": args.errors,
+        "rate": args.rate,
+        "max_concurrent": args.max_concurrent,
+        "done": done,
+        "failed": sum(x[1] for x in results),
+        "per_s": done / total,
+    }
+
+
+BENCHMARKS = {
+    "list_domains": bench_list_domains,
+    "list_records": bench_list_records,
+    "changes": bench_changes,
+    "acme_burst": bench_acme_burst,
+    "wait_latency": bench_wait_latency,
+    "contention": bench_contention,
+}
+
+
+def main():
+    argparser = argparse.ArgumentParser(
+        description="Benchmark DomainsAPI against local stand-in servers"
+    )
+    argparser.add_argument(
+        "benchmarks", nargs="*", help="any of %s (default: all)" % ", ".join(BENCHMARKS)
+    )
+    argparser.add_argument("--domains", type=int, default=100)
+    argparser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    argparser.add_argument("--changes", type=int, default=20)
+    argparser.add_argument("--burst", type=int, default=10)
+    argparser.add_argument("--repeat", type=int, default=5)
+    argparser.add_argument(
+        "--latency", type=float, default=0.02, help="seconds per web request"
+    )
+    argparser.add_argument(
+        "--propagation", type=float, default=1.0, help="seconds until DNS is updated"
+    )
+    argparser.add_argument(
+        "--errors", type=float, default=0.05, help="fraction of failing requests"
+    )
+    argparser.add_argument("--processes", type=int, default=8)
+    argparser.add_argument("--requests", type=int, default=20, help="per process")
+    argparser.add_argument(
+        "--rate", type=float, default=0, help="shared requests per second"
+    )
+    argparser.add_argument(
+        "--max-concurrent", type=int, default=0, help="shared requests in flight"
+    )
+    argparser.add_argument("--timeout", type=int, default=30, help="wait timeout")
+    argparser.add_argument(
+        "--poll-schedule",
+        type=str,
+        default="0.1,2,1",
+        help="first poll interval, growth factor and longest interval",
+    )
+    argparser.add_argument("--json", action="store_true", help="machine readable")
+    args = argparser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            argparser.error(f"unknown benchmark {name}")
+    args.poll_schedule = tuple(float(x) for x in args.poll_schedule.split(","))
+
+    results = {
+        "settings": {
+            "latency_s": args.latency,
+            "propagation_s": args.propagation,
+            "poll_schedule": args.poll_schedule,
+        }
+    }
+    # keep the progress dots of the waits out of the results
+    with contextlib.redirect_stdout(sys.stderr):
+        for name in args.benchmarks or BENCHMARKS:
+            results[name] = BENCHMARKS[name](args)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, result in results.items():
+        print(f"{name}:")
+        for item in result if isinstance(result, list) else [result]:
+            print(
+                "  "
+                + ", ".join(
+                    f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}"
+                    for k, v in item.items()
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+#
+# Micro-benchmark of the table extraction from the web interface pages
+#
+# This code is licensed for use and distribution under the GPLv3+
+#
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+from bawuenet.domains import DomainsAPI  # noqa: E402
+from bawuenet.domains import parser  # noqa: E402
+from pages import render_domains, render_zone, sample_records  # noqa: E402
+
+
+def parse_bs4(page, formdata):
+    """The way DomainsAPI parsed pages before the streaming extractor"""
+    table = BeautifulSoup(page, "html.parser").find("table")
+    return DomainsAPI.parse_html_table(None, table, formdata)
+
+
+def check(page, formdata, backends):
+    expected = parse_bs4(page, formdata)
+    for backend in backends:
+        if parser.extract_table(page, formdata, backend) != expected:
+            raise AssertionError(f"{backend} output differs from BeautifulSoup")
+
+
+def measure(func, repeat):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def main():
+    argparser = argparse.ArgumentParser(
+        description="Compare the table extraction backends"
+    )
+    argparser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    argparser.add_argument("--repeat", type=int, default=3)
+    argparser.add_argument("--json", action="store_true", help="machine readable")
+    args = argparser.parse_args()
+
+    backends = ["html.parser"]
+    if parser.have_lxml():
+        backends.append("lxml")
+
+    check(render_domains([f"example{i}.de" for i in range(50)]), False, backends)
+    results = []
+    for size in args.sizes:
+        page = render_zone("example.com", sample_records("example.com", size))
+        check(page, True, backends)
+        result = {
+            "records": size,
+            "bytes": len(page),
+            "bs4": measure(lambda: parse_bs4(page, True), args.repeat),
+        }
+        for backend in backends:
+            result[backend] = measure(
+                lambda: parser.extract_table(page, True, backend), args.repeat
+            )
+        results.append(result)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'records':>8} {'bs4 ms':>10}", end="")
+    for backend in backends:
+        print(f" {backend + ' ms':>15} {'speed-up':>8}", end="")
+    print()
+    for result in results:
+        print(f"{result['records']:>8} {result['bs4'] * 1000:>10.2f}", end="")
+        for backend in backends:
+            speedup = result["bs4"] / result[backend]
+            print(f" {result[backend] * 1000:>15.2f} {speedup:>7.1f}x", end="")
+        print()
+
+
+if __name__ == "__main__":
+    main()
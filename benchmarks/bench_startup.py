@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+#
+# Start-up time of domainctl.py and bawuenet.domains
+#
+# This code is licensed for use and distribution under the GPLv3+
+#
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, "domainctl.py")
+# dependencies which must only be imported by the actions needing them
+HEAVY = ("requests", "urllib3", "bs4", "lxml", "dns", "concurrent")
+
+# run domainctl.py --help in-process and report the loaded top-level modules
+CHECK_HELP = """
+import json, runpy, sys
+sys.path.insert(0, %r)
+sys.argv = [%r, "--help"]
+sys.stdout = open("/dev/null", "w")
+try:
+    runpy.run_path(%r, run_name="__main__")
+except SystemExit:
+    pass
+sys.stderr.write(json.dumps(sorted(set(x.split(".")[0] for x in sys.modules))))
+""" % (
+    ROOT,
+    SCRIPT,
+    SCRIPT,
+)
+
+
+def import_time(module):
+    """Cumulative import time of a module in microseconds (-X importtime)"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in proc.stderr.splitlines():
+        fields = [x.strip() for x in line.split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1])
+    raise RuntimeError(f"No import time found for {module}")
+
+
+def wall_clock(command, runs):
+    """Median wall clock time of a command in seconds"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def heavy_modules():
+    """Heavy dependencies loaded by domainctl.py --help"""
+    proc = subprocess.run(
+        [sys.executable, "-c", CHECK_HELP], capture_output=True, text=True, check=True
+    )
+    return [x for x in json.loads(proc.stderr) if x in HEAVY]
+
+
+def main():
+    argparser = argparse.ArgumentParser(
+        description="Measure the start-up time of domainctl.py"
+    )
+    argparser.add_argument("--runs", type=int, default=20)
+    argparser.add_argument(
+        "--max-import-ms",
+        type=float,
+        default=50,
+        help="fail if importing bawuenet.domains takes longer",
+    )
+    argparser.add_argument(
+        "--max-overhead-ms",
+        type=float,
+        default=100,
+        help="fail if domainctl.py --help takes longer than a bare interpreter",
+    )
+    argparser.add_argument("--json", action="store_true", help="machine readable")
+    args = argparser.parse_args()
+
+    # warm up the bytecode caches
+    wall_clock([sys.executable, SCRIPT, "--help"], 1)
+    result = {
+        "import_bawuenet_domains_ms": import_time("bawuenet.domains") / 1000,
+        "import_domainctl_ms": import_time("domainctl") / 1000,
+        "interpreter_ms": wall_clock([sys.executable, "-c", "pass"], args.runs) * 1000,
+        "help_ms": wall_clock([sys.executable, SCRIPT, "--help"], args.runs) * 1000,
+        "heavy_modules_on_help": heavy_modules(),
+    }
+    result["help_overhead_ms"] = result["help_ms"] - result["interpreter_ms"]
+
+    failures = []
+    if result["import_bawuenet_domains_ms"] > args.max_import_ms:
+        failures.append("importing bawuenet.domains is too slow")
+    if result["help_overhead_ms"] > args.max_overhead_ms:
+        failures.append("domainctl.py --help is too slow")
+    if result["heavy_modules_on_help"]:
+        failures.append("domainctl.py --help imports heavy dependencies")
+    result["failures"] = failures
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        for key, value in result.items():
+            if isinstance(value, float):
+                value = f"{value:.1f}"
+            print(f"{key:>30}: {value}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#
+# Render pages resembling the Bawue.Net web interface from the fixtures
+#
+# This code is licensed for use and distribution under the GPLv3+
+#
+
+import html
+import os
+import re
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+_placeholder = re.compile(r"\{(\w+)\}")
+_templates = {}
+
+
+def render(name, **values):
+    """Fill the {placeholders} of a fixture page"""
+    if name not in _templates:
+        with open(os.path.join(FIXTURES, name + ".html")) as f:
+            _templates[name] = f.read()
+    return _placeholder.sub(lambda m: str(values[m.group(1)]), _templates[name])
+
+
+def render_domains(domains):
+    """The domains.php overview listing the given domains"""
+    rows = "".join(
+        render(
+            "domains_row",
+            parity=("odd", "even")[idx % 2],
+            domain=domain,
+            tld=domain.rsplit(".", 1)[-1],
+        )
+        for idx, domain in enumerate(domains)
+    )
+    return render("domains", rows=rows)
+
+
+def render_zone(domain, records):
+    """The domains.php edit page of a zone
+
+    records is a list of (zoneentryid, owner, type, rr) tuples.
+    """
+    rows = "".join(
+        render(
+            "zone_row",
+            parity=("odd", "even")[idx % 2],
+            domain=domain,
+            zoneentryid=zoneentryid,
+            owner=owner,
+            type=dnstype,
+            rr=html.escape(rr),
+        )
+        for idx, (zoneentryid, owner, dnstype, rr) in enumerate(records)
+    )
+    return render("zone", domain=domain, rows=rows)
+
+
+def sample_records(domain, count, start=1):
+    """A zone with count records of mixed types"""
+    records = []
+    for idx in range(count):
+        zoneentryid = str(start + idx)
+        kind = idx % 4
+        if kind == 0:
+            records.append(
+                (zoneentryid, f"host{idx}.{domain}", "A", f"192.0.2.{idx % 256}")
+            )
+        elif kind == 1:
+            records.append(
+                (zoneentryid, f"host{idx}.{domain}", "AAAA", f"2001:db8::{idx:x}")
+            )
+        elif kind == 2:
+            records.append(
+                (
+                    zoneentryid,
+                    f"_acme-challenge.host{idx}.{domain}",
+                    "TXT",
+                    f'"token-{idx}"',
+                )
+            )
+        else:
+            records.append(
+                (
+                    zoneentryid,
+                    f"alias{idx}.{domain}",
+                    "CNAME",
+                    f"host{idx - 3}.{domain}.",
+                )
+            )
+    return records
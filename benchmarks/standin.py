@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+#
+# Local stand-in for my.bawue.net and its authoritative name server
+#
+# This code is licensed for use and distribution under the GPLv3+
+#
+
+import argparse
+import http.server
+import os
+import random
+import socketserver
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import dns.flags
+import dns.message
+import dns.name
+import dns.query
+import dns.rcode
+import dns.rdatatype
+import dns.rrset
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bawuenet.domains import DomainsAPI  # noqa: E402
+from pages import render_domains, render_zone, sample_records  # noqa: E402
+
+TYPE_NAMES = dict((v, k) for k, v in DomainsAPI.type_table.items())
+
+
+class StandinState:
+    """Domains and zones shared by the web interface and the name server
+
+    Every change is published on the name server propagation seconds
+    after it was made, at which point the SOA serial of its zone grows.
+    """
+
+    def __init__(self, domains=10, records=10, propagation=0.0):
+        self.lock = threading.Lock()
+        self.propagation = propagation
+        self.next_id = 1
+        self.zones = {}
+        # per zone: (time, zoneentryid, record or None for a removal)
+        self.events = {}
+        # entries removed but possibly still published
+        self.removed = {}
+        for idx in range(domains):
+            self.add_domain(f"example{idx}.de", records)
+
+    def add_domain(self, domain, records=0):
+        with self.lock:
+            zone = self.zones[domain] = {}
+            self.events[domain] = []
+            self.removed[domain] = {}
+            for zoneentryid, owner, dnstype, rr in sample_records(
+                domain, records, self.next_id
+            ):
+                zone[zoneentryid] = (owner, dnstype, rr)
+            self.next_id += records
+
+    def add_record(self, domain, owner, dnstype, rr):
+        with self.lock:
+            zoneentryid = str(self.next_id)
+            self.next_id += 1
+            self.zones[domain][zoneentryid] = (owner, dnstype, rr)
+            self.events[domain].append(
+                (time.monotonic() + self.propagation, zoneentryid)
+            )
+
+    def remove_record(self, domain, zoneentryid):
+        with self.lock:
+            record = self.zones[domain].pop(zoneentryid, None)
+            if record is None:
+                return
+            published = time.monotonic() + self.propagation
+            self.removed[domain][zoneentryid] = (published, record)
+            self.events[domain].append((published, zoneentryid))
+
+    def zone_page(self, domain):
+        with self.lock:
+            records = [(k,) + v for k, v in self.zones[domain].items()]
+        return render_zone(domain, records)
+
+    def domains_page(self):
+        with self.lock:
+            domains = sorted(self.zones)
+        return render_domains(domains)
+
+    def published(self, domain):
+        """The SOA serial and the records the name server serves now"""
+        now = time.monotonic()
+        with self.lock:
+            pending = set(x for t, x in self.events[domain] if t > now)
+            serial = 1 + len(self.events[domain]) - len(pending)
+            records = [v for k, v in self.zones[domain].items() if k not in pending]
+            for zoneentryid, (published, record) in list(self.removed[domain].items()):
+                if published > now:
+                    records.append(record)
+                else:
+                    del self.removed[domain][zoneentryid]
+        return serial, records
+
+
+class _HTTPHandler(http.server.BaseHTTPRequestHandler):
+    """Answer the requests DomainsAPI sends to domains.php"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=""):
+        body = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        if server.errors and random.random() < server.errors:
+            return self._send(502)
+        url = urlsplit(self.path)
+        if url.path != "/domains.php":
+            return self._send(404)
+        if "Authorization" not in self.headers:
+            return self._send(401)
+        params = dict((k, v[-1]) for k, v in parse_qs(url.query, True).items())
+        state = server.state
+        action = params.get("action")
+        domain = params.get("domain") or params.get("Domainname")
+        if action is None:
+            return self._send(200, state.domains_page())
+        if domain not in state.zones:
+            return self._send(403)
+        if action == "domain-dns-admin-commit-zone-entry":
+            owner = params.get("owner", "")
+            state.add_record(
+                domain,
+                owner + "." + domain if owner else domain,
+                TYPE_NAMES[int(params["type"])],
+                params["RRecord"],
+            )
+        elif action == "domain-dns-admin-del-zone-entry":
+            state.remove_record(domain, params["zoneentryid"])
+        elif action != "edit":
+            return self._send(400)
+        self._send(200, state.zone_page(domain))
+
+
+class StandinHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """domains.php of the web interface
+
+    Every request takes latency seconds, the given fraction of them fails
+    with 502 Bad Gateway.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, state, address=("127.0.0.1", 0), latency=0.0, errors=0.0):
+        self.state = state
+        self.latency = latency
+        self.errors = errors
+        super().__init__(address, _HTTPHandler)
+
+
+class _DNSHandler(socketserver.BaseRequestHandler):
+    """Answer queries authoritatively from the published records"""
+
+    def handle(self):
+        data, sock = self.request
+        try:
+            query = dns.message.from_wire(data)
+        except Exception:
+            return
+        response = dns.message.make_response(query)
+        response.flags |= dns.flags.AA
+        self.server.answer(query, response)
+        sock.sendto(response.to_wire(), self.client_address)
+
+
+class StandinDNSServer(socketserver.ThreadingMixIn, socketserver.UDPServer):
+    """The authoritative name server of the stand-in zones"""
+
+    daemon_threads = True
+
+    def __init__(self, state, address=("127.0.0.1", 0)):
+        self.state = state
+        super().__init__(address, _DNSHandler)
+
+    def answer(self, query, response):
+        question = query.question[0]
+        qname = question.name.to_text().rstrip(".")
+        qtype = dns.rdatatype.to_text(question.rdtype)
+        domain = next(
+            (x for x in self.state.zones if qname == x or qname.endswith("." + x)),
+            None,
+        )
+        if domain is None:
+            response.set_rcode(dns.rcode.REFUSED)
+            return
+        serial, records = self.state.published(domain)
+        if qtype == "SOA" and qname == domain:
+            response.answer.append(
+                dns.rrset.from_text(
+                    question.name,
+                    60,
+                    "IN",
+                    "SOA",
+                    f"ns1.{domain}. hostmaster.{domain}. {serial} 3600 600 86400 60",
+                )
+            )
+            return
+        origin = dns.name.from_text(domain)
+        matches = [rr for owner, t, rr in records if owner == qname and t == qtype]
+        if matches:
+            rrset = dns.rrset.from_text_list(
+                question.name, 60, "IN", qtype, matches, origin, relativize=False
+            )
+            response.answer.append(rrset)
+        elif not any(owner == qname for owner, t, rr in records) and qname != domain:
+            response.set_rcode(dns.rcode.NXDOMAIN)
+
+
+class _XFRHandler(socketserver.BaseRequestHandler):
+    """Answer a zone transfer over TCP"""
+
+    def handle(self):
+        try:
+            query = dns.query.receive_tcp(self.request, time.time() + 10)[0]
+        except Exception:
+            return
+        for response in self.server.transfer(query):
+            dns.query.send_tcp(self.request, response)
+
+
+class StandinXFRServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """Zone transfers of the published records, on the port of the name server"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, state, address):
+        self.state = state
+        super().__init__(address, _XFRHandler)
+
+    def transfer(self, query):
+        response = dns.message.make_response(query)
+        response.flags |= dns.flags.AA
+        question = query.question[0]
+        domain = question.name.to_text().rstrip(".")
+        if question.rdtype != dns.rdatatype.AXFR or domain not in self.state.zones:
+            response.set_rcode(dns.rcode.REFUSED)
+            return [response]
+        serial, records = self.state.published(domain)
+        origin = dns.name.from_text(domain)
+        soa = dns.rrset.from_text(
+            origin,
+            60,
+            "IN",
+            "SOA",
+            f"ns1.{domain}. hostmaster.{domain}. {serial} 3600 600 86400 60",
+        )
+        rrsets = {}
+        for owner, dnstype, rr in records:
+            rrsets.setdefault((owner, dnstype), []).append(rr)
+        response.answer.append(soa)
+        for (owner, dnstype), rrs in sorted(rrsets.items()):
+            response.answer.append(
+                dns.rrset.from_text_list(
+                    owner + ".", 60, "IN", dnstype, rrs, origin, relativize=False
+                )
+            )
+        response.answer.append(soa)
+        return [response]
+
+
+class Standin:
+    """Run both stand-in servers in background threads
+
+    Use as a context manager; configure() points a DomainsAPI at them.
+    With axfr, the name server allows zone transfers over TCP.
+    """
+
+    def __init__(
+        self,
+        domains=10,
+        records=10,
+        latency=0.0,
+        propagation=0.0,
+        errors=0.0,
+        axfr=False,
+    ):
+        self.state = StandinState(domains, records, propagation)
+        self.http = StandinHTTPServer(self.state, latency=latency, errors=errors)
+        self.dns = StandinDNSServer(self.state)
+        self.xfr = None
+        if axfr:
+            self.xfr = StandinXFRServer(self.state, self.dns.server_address)
+        self._threads = []
+
+    @property
+    def base_url(self):
+        host, port = self.http.server_address
+        return f"http://{host}:{port}/domains.php"
+
+    def configure(self, api):
+        api.base_url = self.base_url
+        api.auth_ns, api.auth_ns_port = self.dns.server_address
+        return api
+
+    @property
+    def _servers(self):
+        return [x for x in (self.http, self.dns, self.xfr) if x is not None]
+
+    def start(self):
+        for server in self._servers:
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    argparser = argparse.ArgumentParser(
+        description="Serve a local stand-in for my.bawue.net and its name server"
+    )
+    argparser.add_argument("--domains", type=int, default=10)
+    argparser.add_argument("--records", type=int, default=10)
+    argparser.add_argument("--latency", type=float, default=0.0, help="per request")
+    argparser.add_argument(
+        "--propagation", type=float, default=0.0, help="seconds until DNS is updated"
+    )
+    argparser.add_argument(
+        "--errors", type=float, default=0.0, help="fraction of failing requests"
+    )
+    args = argparser.parse_args()
+
+    with Standin(
+        args.domains, args.records, args.latency, args.propagation, args.errors
+    ) as s:
+        print(f"base_url: {s.base_url}")
+        print("auth_ns: %s port %d" % s.dns.server_address)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env sh
+
+# acme.sh dnsapi plugin for Bawue.Net, copy it to ~/.acme.sh/dnsapi/
+#
+#   export BWNET_Credentials=/path/to/bawue.ini
+#   acme.sh --issue --dns dns_bawuenet -d example.com -d '*.example.com'
+#
+# acme.sh adds all TXT records first and then waits once for all of them.
+#
+# This code is licensed for use and distribution under the GPLv3+
+
+BWNET_Hook="${BWNET_Hook:-domainctl_acme.py}"
+
+# Usage: dns_bawuenet_add _acme-challenge.www.example.com "XKrxpRBosdIKFzxW_CT3KLZNf6q0HG9i01zxXp5CPBs"
+dns_bawuenet_add() {
+  fulldomain=$1
+  txtvalue=$2
+  _dns_bawuenet_credentials || return 1
+  _info "Adding TXT record for $fulldomain"
+  "$BWNET_Hook" --credentials "$BWNET_Credentials" acme.sh add "$fulldomain" "$txtvalue"
+}
+
+# Usage: dns_bawuenet_rm _acme-challenge.www.example.com "XKrxpRBosdIKFzxW_CT3KLZNf6q0HG9i01zxXp5CPBs"
+dns_bawuenet_rm() {
+  fulldomain=$1
+  txtvalue=$2
+  _dns_bawuenet_credentials || return 1
+  _info "Removing TXT record for $fulldomain"
+  "$BWNET_Hook" --credentials "$BWNET_Credentials" acme.sh rm "$fulldomain" "$txtvalue"
+}
+
+_dns_bawuenet_credentials() {
+  BWNET_Credentials="${BWNET_Credentials:-$(_readaccountconf_mutable BWNET_Credentials)}"
+  if [ -z "$BWNET_Credentials" ]; then
+    _err "BWNET_Credentials must point to the credentials file of domainctl.py"
+    return 1
+  fi
+  _saveaccountconf_mutable BWNET_Credentials "$BWNET_Credentials"
+}
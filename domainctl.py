@@ -9,7 +9,6 @@
 #
 
 import argparse
-import configparser
 import sys
 from bawuenet.domains import DomainsAPI
 
@@ -34,6 +33,315 @@ def print_domain_records(domain, output, client):
     print(output([x[:-1] for x in data], headers=headers[:-1]))
 
 
+def print_all_domain_records(domains, output, client, workers):
+    """Pretty print a table of the contents of many domains"""
+    headers, data = None, []
+    for domain, headers, records in client.get_all_domain_records(domains, workers):
+        data.extend([domain] + x[:-1] for x in records)
+    if headers is None:
+        return
+    data.sort(key=lambda x: x[0])
+    print(output(data, headers=["Domain"] + headers[:-1]))
+
+
+def prefetch_domain_records(client, domains, workers):
+    """Yield (domain, records) in the order of domains
+
+    With more than one worker, up to workers zones are read ahead
+    concurrently and kept as lists; otherwise the records of each zone
+    are streamed while it is parsed.
+    """
+    if workers <= 1 or len(domains) <= 1:
+        for domain in domains:
+            yield domain, client.iter_domain_records(domain)
+        return
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+    from itertools import islice
+
+    def fetch(domain):
+        return list(client.iter_domain_records(domain))
+
+    ahead = iter(domains)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            for domain in islice(ahead, workers):
+                pending.append((domain, executor.submit(fetch, domain)))
+            while pending:
+                domain, future = pending.popleft()
+                following = next(ahead, None)
+                if following is not None:
+                    pending.append((following, executor.submit(fetch, following)))
+                yield domain, future.result()
+        finally:
+            # the caller might stop early or a zone might fail
+            for domain, future in pending:
+                future.cancel()
+
+
+def stream_domain_records(
+    domains, output_format, client, domain_column=True, workers=1
+):
+    """Write the records of domains one per line while they are parsed"""
+    if output_format == "csv":
+        import csv
+
+        writer = csv.writer(sys.stdout, lineterminator="\n")
+    else:
+        import json
+    headers = None
+    for domain, records in prefetch_domain_records(client, domains, workers):
+        for record in records:
+            record.pop("metadata", None)
+            if domain_column:
+                record = dict(Domain=domain, **record)
+            first = headers is None
+            if first:
+                headers = list(record)
+                if output_format == "csv":
+                    writer.writerow(headers)
+            if output_format == "ndjson":
+                sys.stdout.write(json.dumps(record) + "\n")
+            else:
+                writer.writerow(record.get(x, "") for x in headers)
+            if first:
+                sys.stdout.flush()  # let the first line out immediately
+        sys.stdout.flush()
+
+
+def prune_records(client, domain, args):
+    """Delete the records matching --owner-glob and --type of one or ALL domains
+
+    Returns the headers and rows of a report, one row per record.
+    """
+    from bawuenet.domains.zone import Zone
+
+    if domain == "ALL":
+        zones = client.get_all_domain_records(None, args.workers)
+    else:
+        zones = [(domain,) + tuple(client.get_domain_records(domain))]
+    selected = []
+    for name, headers, records in zones:
+        zone = Zone.from_table(name, headers, records)
+        selected.extend(
+            (name, x) for x in zone.match(args.owner_glob, args.type, args.keep)
+        )
+    selected.sort(key=lambda x: (x[0], x[1].owner, int(x[1].zoneentryid or 0)))
+    if args.dry_run:
+        results = ["would delete"] * len(selected)
+    else:
+        results = client.delete_records(
+            [(name, x.zoneentryid) for name, x in selected], args.workers
+        )
+        results = [x or "deleted" for x in results]
+    headers = ["Domain", "Owner", "Type", "Ressource Record", "Result"]
+    data = [
+        [name, x.owner, x.type, x.rr, result]
+        for (name, x), result in zip(selected, results)
+    ]
+    return headers, data
+
+
+def run_template(client, template, domains, args):
+    """Apply a template to domains concurrently
+
+    The progress is written to stderr. Returns the headers and rows of a
+    report, one row per change and per domain which could not be read.
+    """
+    from bawuenet.domains.template import apply_template
+
+    done = "would change" if args.dry_run else "changed"
+    data = []
+    changed = current = skipped = failed = 0
+    for count, (domain, changes, results, exc) in enumerate(
+        apply_template(client, template, domains, args.workers, args.dry_run), 1
+    ):
+        if exc is not None:
+            data.append([domain, "", "", "", "", exc])
+            status = "FEHLER: " + exc
+            failed += 1
+        elif changes is None:
+            # done before, according to the journal
+            status = "übersprungen"
+            skipped += 1
+        else:
+            data.extend(
+                [domain, x["host"], x["type"], x["rr"], x["state"], y or done]
+                for x, y in zip(changes, results)
+            )
+            status = "%d Änderungen" % len(changes) if changes else "aktuell"
+            if any(results):
+                status += ", %d fehlgeschlagen" % sum(1 for x in results if x)
+                failed += 1
+            elif changes:
+                changed += 1
+            else:
+                current += 1
+        sys.stderr.write("[%d/%d] %s: %s\n" % (count, len(domains), domain, status))
+    sys.stderr.write(
+        "%d Domains: %d %s, %d aktuell, %d übersprungen, %d mit Fehlern\n"
+        % (
+            len(domains),
+            changed,
+            "zu ändern" if args.dry_run else "geändert",
+            current,
+            skipped,
+            failed,
+        )
+    )
+    data.sort(key=lambda x: x[:3])
+    return ["Domain", "host", "type", "rr", "state", "Result"], data
+
+
+def check_changes(changes):
+    """Check all changes before anything is sent, exit on errors"""
+    if not isinstance(changes, list):
+        error("Die Änderungen müssen eine Liste sein")
+        sys.exit(1)
+    try:
+        DomainsAPI.check_changes(changes)
+    except RuntimeError as exc:
+        error("Ungültige Änderung: %s" % exc)
+        sys.exit(1)
+
+
+def read_template(filename):
+    """Read and check the changes of a template file, exit on errors"""
+    template = read_changes(filename)
+    check_changes(template)
+    return template
+
+
+def report_failed(data):
+    """Whether a report of prune or apply_template lists a failure"""
+    done = ("deleted", "would delete", "changed", "would change")
+    return any(x[-1] not in done for x in data)
+
+
+def sweep_accounts(action, accounts, output, args, template=None):
+    """Run an overview action for all accounts concurrently
+
+    The rows are tagged with the account. Returns the exit code.
+    """
+
+    def list_domains(api):
+        return api.get_domain_data()
+
+    def list_records(api):
+        headers, data = None, []
+        for domain, headers, records in api.get_all_domain_records(None, args.workers):
+            data.extend([domain] + x[:-1] for x in records)
+        return (headers and ["Domain"] + headers[:-1]), data
+
+    def audit(api):
+        from bawuenet.domains.audit import HEADERS, audit_zones
+
+        zones = (
+            (domain, (headers, records))
+            for domain, headers, records in api.get_all_domain_records(
+                None, args.workers
+            )
+        )
+        data = []
+        for domain, rows in audit_zones(api, zones):
+            data.extend([domain] + x for x in rows)
+        return ["Domain"] + HEADERS, data
+
+    def prune(api):
+        return prune_records(api, "ALL", args)
+
+    def apply_template(api):
+        from bawuenet.domains.template import select_domains
+
+        domains = select_domains(api.get_domains(), args.domain)
+        return run_template(api, template, domains, args)
+
+    fetch = {
+        "list_domains": list_domains,
+        "list_records": list_records,
+        "audit": audit,
+        "prune": prune,
+        "apply_template": apply_template,
+    }
+    headers, data, failed = None, [], False
+    for account, result, exc in accounts.map(fetch[action]):
+        if exc is not None:
+            error("%s: %s" % (account, exc))
+            failed = True
+            continue
+        headers = result[0] or headers
+        data.extend([account] + x for x in result[1])
+    data.sort(key=lambda x: x[:2])
+    if headers is not None:
+        print(output(data, headers=["Account"] + headers))
+    if failed:
+        return 1
+    if action == "audit" and data:
+        return 3
+    if action in ("prune", "apply_template") and report_failed(data):
+        return 1
+    return 0
+
+
+def report_timings(timings, args):
+    """Print and write the timings collected during the run"""
+    if args.timings:
+        import tabulate
+
+        headers, rows = timings.summary()
+        sys.stderr.write(tabulate.tabulate(rows, headers=headers) + "\n")
+    if args.timings_json:
+        timings.write_json(args.timings_json)
+    if args.timings_prom:
+        timings.write_prometheus(args.timings_prom)
+
+
+def report_journal(journal):
+    """Tell what a resumed run skipped and what is still outstanding"""
+    journal.close()
+    if journal.skipped:
+        warn(
+            "%d bereits erledigte Änderungen aus %s übersprungen"
+            % (journal.skipped, journal.path)
+        )
+    outstanding = journal.outstanding()
+    if outstanding:
+        warn(
+            "%d geplante Änderungen sind offen, fortsetzen mit --resume %s"
+            % (len(outstanding), journal.path)
+        )
+
+
+def read_changes(filename):
+    """Read a list of changes from a YAML (or JSON) file, - for stdin
+
+    Numbers given as host or rr (e.g. host: 2024) are taken as strings.
+    """
+    import yaml
+
+    if filename == "-":
+        changes = yaml.safe_load(sys.stdin) or []
+    else:
+        with open(filename) as f:
+            changes = yaml.safe_load(f) or []
+    for change in changes if isinstance(changes, list) else []:
+        for key in ("host", "rr"):
+            if isinstance(change, dict) and type(change.get(key)) in (int, float):
+                change[key] = str(change[key])
+    return changes
+
+
+def print_changes(changes, results, output):
+    """Pretty print the result of a batch of changes"""
+    headers = ["host", "type", "rr", "state", "changed"]
+    data = [
+        [x["host"], x["type"], x["rr"], x.get("state", "present"), bool(y)]
+        for x, y in zip(changes, results)
+    ]
+    print(output(data, headers=headers))
+
+
 def output_table(data, headers):
     import tabulate
 
@@ -52,6 +360,23 @@ def output_yaml(data, headers):
     return yaml.dump([dict(zip(headers, x)) for x in data], indent=2)
 
 
+def output_ndjson(data, headers):
+    import json
+
+    return "\n".join(json.dumps(dict(zip(headers, x))) for x in data)
+
+
+def output_csv(data, headers):
+    import csv
+    import io
+
+    f = io.StringIO()
+    writer = csv.writer(f, lineterminator="\n")
+    writer.writerow(headers)
+    writer.writerows(data)
+    return f.getvalue().rstrip("\n")
+
+
 def main():
     description = """Bawue.Net DNS client
 
@@ -63,23 +388,159 @@ hinzuzufügen oder zu entfernen"""
         "action",
         type=str,
         help="one possible DNS action",
-        choices=["list_domains", "list_records", "add_record", "remove_record"],
+        choices=[
+            "list_domains",
+            "list_records",
+            "add_record",
+            "remove_record",
+            "apply",
+            "wait",
+            "serve",
+            "sync",
+            "export",
+            "audit",
+            "prune",
+            "apply_template",
+        ],
     )
     parser.add_argument(
         "--credentials", type=str, help="credentials file", required=False
     )
+    parser.add_argument(
+        "--account",
+        type=str,
+        help="section of the credentials file (default: the first), ALL for all",
+    )
     parser.add_argument("--username", type=str, help="username", required=False)
     parser.add_argument("--password", type=str, help="password", required=False)
     parser.add_argument("--host", type=str, help="host name (without domain)")
-    parser.add_argument("--domain", type=str, help="domain")
+    parser.add_argument(
+        "--domain",
+        type=str,
+        help="domain (ALL for several actions, a glob for apply_template)",
+    )
     parser.add_argument("--type", type=str, help="type")
+    parser.add_argument(
+        "--owner-glob",
+        type=str,
+        help="prune: shell pattern of the hosts (without domain), e.g. '_acme-*'",
+    )
+    parser.add_argument(
+        "--keep",
+        type=int,
+        help="prune: newest records to keep per owner and type",
+        default=0,
+    )
     parser.add_argument("--rr", type=str, help="rr")
     parser.add_argument("--wait", action="store_true", help="wait")
+    parser.add_argument(
+        "--wait-timeout",
+        type=int,
+        help="seconds to wait for a DNS change",
+        default=DomainsAPI.wait_timeout,
+    )
+    parser.add_argument(
+        "--poll-schedule",
+        type=str,
+        help="first poll interval, growth factor and longest interval (e.g. 1,2,30)",
+        default=",".join(str(x) for x in DomainsAPI.poll_schedule),
+    )
+    parser.add_argument(
+        "--changes", type=str, help="YAML file with a list of changes (- for stdin)"
+    )
+    parser.add_argument(
+        "--template",
+        type=str,
+        help="YAML file with changes for apply_template, {domain} is replaced",
+    )
+    parser.add_argument(
+        "--zonefile",
+        type=str,
+        help="zone file for sync and export (- for stdin or stdout)",
+    )
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="sync: remove records which are not in the zone file",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="only show what would be changed"
+    )
+    parser.add_argument(
+        "--journal",
+        type=str,
+        help="record the planned and completed changes in this new file",
+    )
+    parser.add_argument(
+        "--resume",
+        type=str,
+        help="continue the run of a journal, skipping the completed changes",
+    )
+    parser.add_argument(
+        "--daemon",
+        type=str,
+        help="Unix socket of domainctl serve (to listen on with serve)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="number of zones fetched in parallel",
+        default=8,
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=int,
+        help="seconds to reuse fetched domain and zone pages",
+        default=60,
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="always fetch fresh pages"
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        help="requests per second to the web interface, shared by all processes",
+        default=0,
+    )
+    parser.add_argument(
+        "--burst", type=int, help="requests allowed at once above --rate", default=0
+    )
+    parser.add_argument(
+        "--max-concurrent",
+        type=int,
+        help="requests in flight at the same time, shared by all processes",
+        default=0,
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        help="repetitions of a failed request",
+        default=DomainsAPI.retries,
+    )
+    parser.add_argument(
+        "--http-timeout",
+        type=str,
+        help="connect and read timeout of requests in seconds (e.g. 5,30)",
+        default=",".join(str(x) for x in DomainsAPI.request_timeout),
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="print the time spent on HTTP, parsing, DNS and waiting to stderr",
+    )
+    parser.add_argument(
+        "--timings-json", type=str, help="write the timings as JSON to this file"
+    )
+    parser.add_argument(
+        "--timings-prom",
+        type=str,
+        help="write the timings to this file for Prometheus' textfile collector",
+    )
     parser.add_argument(
         "--format",
         type=str,
         help="output format",
-        choices=["table", "yaml", "json"],
+        choices=["table", "yaml", "json", "ndjson", "csv"],
         default="table",
     )
 
@@ -87,32 +548,201 @@ hinzuzufügen oder zu entfernen"""
     args = parser.parse_args()
     # choose the right output format function
     output = globals()["output_" + args.format]
+    try:
+        poll_schedule = tuple(float(x) for x in args.poll_schedule.split(","))
+        if len(poll_schedule) != 3:
+            raise ValueError()
+    except ValueError:
+        error("--poll-schedule erwartet drei Zahlen, z.B. 1,2,30")
+        sys.exit(1)
+    try:
+        http_timeout = tuple(float(x) for x in args.http_timeout.split(","))
+        if len(http_timeout) != 2:
+            raise ValueError()
+    except ValueError:
+        error("--http-timeout erwartet zwei Zahlen, z.B. 5,30")
+        sys.exit(1)
+    template = None
+    if args.action == "apply_template":
+        for var in ("domain", "template"):
+            if not getattr(args, var):
+                error("--%s muss definiert sein" % var)
+                sys.exit(1)
+        template = read_template(args.template)
 
-    if not (args.credentials or (args.username and args.password)):
-        error(
-            "Entweder --credentials oder --username und --passwort müssen definiert sein."
-        )
-        sys.exit(255)
-    elif args.credentials:
-        config = configparser.ConfigParser()
-        config.read(args.credentials)
-        section = config.sections()[0]
-        args.username = config[section]["username"]
-        args.password = config[section]["password"]
+    if args.daemon and args.action != "serve":
+        # let a running domainctl serve do the work
+        from bawuenet.domains.daemon import DaemonClient
 
-    domain_api = DomainsAPI(args.username, args.password)
+        domain_api = DaemonClient(args.daemon)
+        if args.account == "ALL":
+            error("--account ALL ist mit --daemon nicht möglich")
+            sys.exit(1)
+        if args.timings or args.timings_json or args.timings_prom:
+            warn("Mit --daemon werden die Zeiten im Daemon (serve) erfasst")
+        if args.journal or args.resume:
+            error("--journal und --resume sind mit --daemon nicht möglich")
+            sys.exit(1)
+    else:
+        credentials = None
+        if not (args.credentials or (args.username and args.password)):
+            error(
+                "Entweder --credentials oder --username und --passwort müssen "
+                "definiert sein."
+            )
+            sys.exit(255)
+        elif args.credentials:
+            from bawuenet.domains.accounts import read_accounts
+
+            try:
+                credentials = read_accounts(args.credentials)
+            except RuntimeError as exc:
+                error(str(exc))
+                sys.exit(255)
+            if not credentials:
+                error("Keine Zugangsdaten in %s gefunden" % args.credentials)
+                sys.exit(255)
+            if args.account != "ALL":
+                account = args.account or next(iter(credentials))
+                if account not in credentials:
+                    error(
+                        "Account %s nicht in %s gefunden" % (account, args.credentials)
+                    )
+                    sys.exit(255)
+                args.username, args.password = credentials[account]
+        elif args.account:
+            error("--account braucht --credentials")
+            sys.exit(255)
+        all_accounts = args.account == "ALL"
+
+        cache = None
+        if not args.no_cache and args.cache_ttl > 0:
+            from bawuenet.domains.cache import Cache, default_cache_dir
+
+            cache = Cache(args.cache_ttl, default_cache_dir())
+        timings = None
+        if args.timings or args.timings_json or args.timings_prom:
+            import atexit
+            from bawuenet.domains.timings import Timings
+
+            timings = Timings()
+            atexit.register(report_timings, timings, args)
+        throttle = None
+        if args.rate > 0 or args.max_concurrent > 0:
+            from bawuenet.domains.throttle import Throttle, default_throttle_dir
+
+            throttle = Throttle(
+                args.rate, args.burst, args.max_concurrent, default_throttle_dir()
+            )
+        elif all_accounts:
+            from bawuenet.domains.throttle import Throttle
+
+            # bound the requests of all accounts together
+            throttle = Throttle(max_concurrent=args.workers)
+        journal = None
+        if args.journal or args.resume:
+            import atexit
+            import os
+            from bawuenet.domains.journal import Journal
+
+            if args.journal and args.resume:
+                error("--journal und --resume schließen sich aus")
+                sys.exit(1)
+            if args.action == "serve":
+                error("serve führt kein Journal")
+                sys.exit(1)
+            if args.journal and os.path.exists(args.journal):
+                error(
+                    "Journal %s existiert bereits, zum Fortsetzen --resume verwenden"
+                    % args.journal
+                )
+                sys.exit(1)
+            if args.resume and not os.path.exists(args.resume):
+                error("Journal %s nicht gefunden" % args.resume)
+                sys.exit(1)
+            try:
+                journal = Journal(args.journal or args.resume)
+            except RuntimeError as exc:
+                error(str(exc))
+                sys.exit(1)
+            atexit.register(report_journal, journal)
+
+        def make_api(username, password):
+            api = DomainsAPI(
+                username,
+                password,
+                cache=cache,
+                pool_size=args.workers,
+                timings=timings,
+                throttle=throttle,
+                journal=journal,
+            )
+            api.wait_timeout = args.wait_timeout
+            api.poll_schedule = poll_schedule
+            api.retries = args.retries
+            api.request_timeout = http_timeout
+            return api
+
+        if all_accounts:
+            from bawuenet.domains.accounts import Accounts
+
+            accounts = Accounts(credentials, make_api, args.workers)
+            if args.action == "serve":
+                error("serve bedient nur einen Account, --account muss ihn nennen")
+                sys.exit(1)
+            if args.action in ("list_domains", "apply_template") or (
+                args.action in ("list_records", "audit", "prune")
+                and args.domain == "ALL"
+            ):
+                sys.exit(sweep_accounts(args.action, accounts, output, args, template))
+            if args.domain:
+                account, domain_api = accounts.find(args.domain)
+                if domain_api is None:
+                    error("%s gehört keinem der Accounts" % args.domain)
+                    sys.exit(2)
+            else:
+                # e.g. wait, which only asks the name server
+                domain_api = next(iter(accounts.apis.values()))
+        else:
+            domain_api = make_api(args.username, args.password)
 
     # execute the selected action
-    if args.action == "list_domains":
+    if args.action == "serve":
+        if not args.daemon:
+            error("--daemon muss definiert sein")
+            sys.exit(1)
+        from bawuenet.domains.daemon import serve
+
+        try:
+            serve(domain_api, args.daemon)
+        except RuntimeError as exc:
+            error(str(exc))
+            sys.exit(1)
+    elif args.action == "list_domains":
         print_domains(output, domain_api)
     elif args.action == "list_records":
         if not args.domain:
             error("--domain muss definiert sein")
             sys.exit(1)
+        streaming = args.format in ("ndjson", "csv")
+        if args.domain == "ALL":
+            if streaming:
+                stream_domain_records(
+                    domain_api.get_domains(),
+                    args.format,
+                    domain_api,
+                    workers=args.workers,
+                )
+            else:
+                print_all_domain_records(None, output, domain_api, args.workers)
+            sys.exit(0)
         if args.domain not in domain_api.get_domains():
             error("%s gehört dem Nutzer nicht" % args.domain)
             sys.exit(2)
-        print_domain_records(args.domain, output, domain_api)
+        if streaming:
+            stream_domain_records([args.domain], args.format, domain_api, False)
+        else:
+            print_domain_records(args.domain, output, domain_api)
     elif args.action == "add_record" or args.action == "remove_record":
         for var in ("domain", "host", "type", "rr"):
             if not getattr(args, var):
@@ -121,6 +751,10 @@ hinzuzufügen oder zu entfernen"""
         if args.domain not in domain_api.get_domains():
             error("%s gehört dem Nutzer nicht" % args.domain)
             sys.exit(2)
+        serial = None
+        if args.wait:
+            # remember the zone's serial to notice the update early
+            serial = domain_api.get_soa_serial(args.domain)
         # call the action function by its name
         ret = getattr(domain_api, args.action)(
             args.domain, args.host, args.type, args.rr
@@ -128,12 +762,177 @@ hinzuzufügen oder zu entfernen"""
         if ret is None:  # nothing modified
             sys.exit(-1)
         if args.wait:
-            print(
-                "Waiting for DNS change...",
-            )
+            print("Waiting for DNS change...", file=sys.stderr)
             getattr(domain_api, "wait_for_" + args.action)(
-                args.domain, args.host, args.type, args.rr
+                args.domain, args.host, args.type, args.rr, serial, args.wait_timeout
             )
+    elif args.action == "apply":
+        for var in ("domain", "changes"):
+            if not getattr(args, var):
+                error("--%s muss definiert sein" % var)
+                sys.exit(1)
+        changes = read_changes(args.changes)
+        check_changes(changes)
+        if args.domain not in domain_api.get_domains():
+            error("%s gehört dem Nutzer nicht" % args.domain)
+            sys.exit(2)
+        serials = None
+        if args.wait:
+            serials = {args.domain: domain_api.get_soa_serial(args.domain)}
+        results = domain_api.apply_changes(args.domain, changes)
+        print_changes(changes, results, output)
+        if args.wait:
+            print("Waiting for DNS change...", file=sys.stderr)
+            domain_api.wait_for_records(
+                [
+                    (
+                        args.domain,
+                        change["host"],
+                        change["type"],
+                        change["rr"],
+                        change.get("state", "present"),
+                    )
+                    for change, ret in zip(changes, results)
+                    if ret is not None
+                ],
+                serials,
+                args.wait_timeout,
+            )
+    elif args.action == "sync":
+        from bawuenet.domains.zonefile import read_zonefile, sync_changes
+
+        for var in ("domain", "zonefile"):
+            if not getattr(args, var):
+                error("--%s muss definiert sein" % var)
+                sys.exit(1)
+        if args.domain not in domain_api.get_domains():
+            error("%s gehört dem Nutzer nicht" % args.domain)
+            sys.exit(2)
+        if args.zonefile == "-":
+            wanted = read_zonefile(sys.stdin, args.domain)
+        else:
+            with open(args.zonefile) as f:
+                wanted = read_zonefile(f, args.domain)
+        zone = domain_api.get_domain_records(args.domain)
+        changes = sync_changes(args.domain, wanted, zone, args.prune)
+        if args.dry_run or not changes:
+            print_changes(changes, [True] * len(changes), output)
+            sys.exit(0)
+        serials = None
+        if args.wait:
+            serials = {args.domain: domain_api.get_soa_serial(args.domain)}
+        results = domain_api.apply_changes(args.domain, changes, zone)
+        print_changes(changes, results, output)
+        if args.wait:
+            print("Waiting for DNS change...", file=sys.stderr)
+            domain_api.wait_for_records(
+                [
+                    (args.domain, x["host"], x["type"], x["rr"], x["state"])
+                    for x, y in zip(changes, results)
+                    if y
+                ],
+                serials,
+                args.wait_timeout,
+            )
+    elif args.action == "export":
+        from bawuenet.domains.zonefile import write_zonefile
+
+        if not args.domain:
+            error("--domain muss definiert sein")
+            sys.exit(1)
+        if args.domain not in domain_api.get_domains():
+            error("%s gehört dem Nutzer nicht" % args.domain)
+            sys.exit(2)
+        zone = domain_api.get_domain_records(args.domain)
+        if args.zonefile and args.zonefile != "-":
+            with open(args.zonefile, "w") as f:
+                write_zonefile(f, args.domain, zone)
+        else:
+            write_zonefile(sys.stdout, args.domain, zone)
+    elif args.action == "audit":
+        from bawuenet.domains.audit import HEADERS, audit_zones
+
+        if not args.domain:
+            error("--domain muss definiert sein")
+            sys.exit(1)
+        if args.domain == "ALL":
+            zones = (
+                (domain, (headers, records))
+                for domain, headers, records in domain_api.get_all_domain_records(
+                    None, args.workers
+                )
+            )
+        elif args.domain not in domain_api.get_domains():
+            error("%s gehört dem Nutzer nicht" % args.domain)
+            sys.exit(2)
+        else:
+            zones = [(args.domain, domain_api.get_domain_records(args.domain))]
+        # the name servers are queried from here, also with --daemon
+        dns_api = domain_api
+        if not isinstance(dns_api, DomainsAPI):
+            dns_api = DomainsAPI(None, None)
+        data = []
+        for domain, rows in audit_zones(dns_api, zones):
+            data.extend([domain] + x for x in rows)
+        data.sort(key=lambda x: x[:3])
+        print(output(data, headers=["Domain"] + HEADERS))
+        if data:
+            sys.exit(3)
+    elif args.action == "prune":
+        for var in ("domain", "owner_glob"):
+            if not getattr(args, var):
+                error("--%s muss definiert sein" % var.replace("_", "-"))
+                sys.exit(1)
+        if args.domain != "ALL" and args.domain not in domain_api.get_domains():
+            error("%s gehört dem Nutzer nicht" % args.domain)
+            sys.exit(2)
+        headers, data = prune_records(domain_api, args.domain, args)
+        print(output(data, headers=headers))
+        if report_failed(data):
+            sys.exit(1)
+    elif args.action == "apply_template":
+        from bawuenet.domains.template import select_domains
+
+        domains = select_domains(domain_api.get_domains(), args.domain)
+        if not domains:
+            error("Keine Domain des Nutzers passt zu %s" % args.domain)
+            sys.exit(2)
+        headers, data = run_template(domain_api, template, domains, args)
+        print(output(data, headers=headers))
+        if report_failed(data):
+            sys.exit(1)
+    elif args.action == "wait":
+        if args.changes:
+            changes = read_changes(args.changes)
+            check_changes(changes)
+        else:
+            changes = [{"host": args.host, "type": args.type, "rr": args.rr}]
+        records = []
+        for change in changes:
+            change.setdefault("domain", args.domain)
+            for var in ("domain", "host", "type", "rr"):
+                if not change.get(var):
+                    error("--%s muss definiert sein" % var)
+                    sys.exit(1)
+            records.append(
+                (
+                    change["domain"],
+                    change["host"],
+                    change["type"],
+                    change["rr"],
+                    change.get("state", "present"),
+                )
+            )
+        check_changes(changes)
+        print("Waiting for DNS change...", file=sys.stderr)
+        timings = domain_api.wait_for_records(records, None, args.wait_timeout)
+        headers = ["domain", "host", "type", "rr", "state", "seconds"]
+        print(
+            output(
+                [list(x) + [round(y, 1)] for x, y in zip(records, timings)],
+                headers=headers,
+            )
+        )
 
 
 if __name__ == "__main__":
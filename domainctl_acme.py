@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+#
+# ACME DNS-01 hooks for Bawue.Net (dehydrated, certbot, acme.sh)
+#
+# This code is licensed for use and distribution under the GPLv3+
+#
+
+import argparse
+import configparser
+import os
+import sys
+from bawuenet.domains import DomainsAPI, error
+
+
+def read_credentials(filename):
+    """Username and password from the first section of a credentials file"""
+    config = configparser.ConfigParser()
+    if not config.read(filename) or not config.sections():
+        error("Zugangsdaten in %s nicht gefunden" % filename)
+        sys.exit(255)
+    section = config.sections()[0]
+    return config[section]["username"], config[section]["password"]
+
+
+def dehydrated(api, args, wait, timeout):
+    """dehydrated hook, with HOOK_CHAIN=yes for all challenges at once"""
+    from bawuenet.domains.acme import clean_challenges, deploy_challenges
+
+    if not args:
+        return
+    hook, args = args[0], args[1:]
+    if hook not in ("deploy_challenge", "clean_challenge"):
+        return  # other hooks are of no interest
+    # triples of domain, token file name and token value
+    challenges = [(args[idx], args[idx + 2]) for idx in range(0, len(args) - 2, 3)]
+    if hook == "deploy_challenge":
+        deploy_challenges(api, challenges, wait, timeout)
+    else:
+        clean_challenges(api, challenges)
+
+
+def certbot(api, hook, wait, timeout):
+    """certbot --manual-auth-hook and --manual-cleanup-hook"""
+    from bawuenet.domains.acme import (
+        clean_challenges,
+        collect_certbot_challenges,
+        deploy_challenges,
+    )
+    from bawuenet.domains.cache import default_cache_dir
+
+    challenges = collect_certbot_challenges(
+        hook, os.environ, os.path.join(default_cache_dir(), "acme")
+    )
+    if not challenges:
+        return  # more to come
+    if hook == "auth":
+        deploy_challenges(api, challenges, wait, timeout)
+    else:
+        clean_challenges(api, challenges)
+
+
+def acme_sh(api, args):
+    """Back end of the acme.sh dnsapi plugin dns_bawuenet.sh"""
+    from bawuenet.domains.acme import clean_challenges, deploy_challenges
+
+    if len(args) != 3 or args[0] not in ("add", "rm"):
+        error("acme.sh erwartet add|rm <fulldomain> <txtvalue>")
+        sys.exit(1)
+    if args[0] == "add":
+        # acme.sh waits for all records itself
+        deploy_challenges(api, [(args[1], args[2])], wait=False)
+    else:
+        clean_challenges(api, [(args[1], args[2])])
+
+
+def main():
+    description = """ACME DNS-01 Hooks für Bawue.Net
+
+Legt die Challenges eines Zertifikates gesammelt pro Domain an, wartet
+einmal auf alle und entfernt sie wieder gesammelt."""
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "client",
+        type=str,
+        help="ACME client calling the hook",
+        choices=["dehydrated", "certbot-auth", "certbot-cleanup", "acme.sh"],
+    )
+    parser.add_argument(
+        "args", nargs=argparse.REMAINDER, help="arguments passed by the client"
+    )
+    parser.add_argument(
+        "--credentials",
+        type=str,
+        help="credentials file (default: $BWNET_CREDENTIALS)",
+        default=os.environ.get("BWNET_CREDENTIALS"),
+    )
+    parser.add_argument(
+        "--no-wait",
+        action="store_true",
+        help="do not wait for the records on the name server",
+    )
+    parser.add_argument(
+        "--wait-timeout",
+        type=int,
+        help="seconds to wait for the records",
+        default=DomainsAPI.wait_timeout,
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=int,
+        help="seconds to reuse fetched domain and zone pages",
+        default=60,
+    )
+    args = parser.parse_args()
+
+    if not args.credentials:
+        error("Entweder --credentials oder BWNET_CREDENTIALS muss definiert sein.")
+        sys.exit(255)
+    username, password = read_credentials(args.credentials)
+    cache = None
+    if args.cache_ttl > 0:
+        from bawuenet.domains.cache import Cache, default_cache_dir
+
+        cache = Cache(args.cache_ttl, default_cache_dir())
+    domain_api = DomainsAPI(username, password, cache=cache)
+    wait = not args.no_wait
+
+    try:
+        if args.client == "dehydrated":
+            dehydrated(domain_api, args.args, wait, args.wait_timeout)
+        elif args.client == "acme.sh":
+            acme_sh(domain_api, args.args)
+        else:
+            certbot(domain_api, args.client[8:], wait, args.wait_timeout)
+    except RuntimeError as exc:
+        error(str(exc))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# Copyright: (c) 2020, Eric Lavarde <ewl+bawue@lavar.de>
+# License: MIT
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+
+class ModuleDocFragment(object):
+    # account and request options of the modules and plugins
+    DOCUMENTATION = r"""
+options:
+    username:
+        description: name of the user
+        required: true
+        type: str
+    password:
+        description: password of the user
+        required: true
+        type: str
+    rate_limit:
+        description:
+          - requests per second to the web interface, shared by all forks
+            and processes of the user
+          - 0 disables the limit
+        required: false
+        type: float
+        default: 0
+    max_concurrent:
+        description:
+          - requests to the web interface in flight at the same time, shared
+            by all forks and processes of the user
+          - 0 disables the limit
+        required: false
+        type: int
+        default: 0
+"""
+
+    # the cache of the plugins running on the controller
+    PLUGIN = r"""
+options:
+    cache_ttl:
+        description:
+          - seconds to reuse domain and zone pages cached on disk by earlier runs
+          - 0 keeps them in memory only, as long as the process evaluating
+            the plugin lives; Ansible uses one per task, including its loop
+        required: false
+        type: int
+        default: 0
+"""
+
+    # the cache of the modules, which run in a new process for every task
+    MODULE = r"""
+options:
+    cache_ttl:
+        description:
+          - seconds to reuse domain and zone pages cached on disk by earlier runs
+          - 0 disables the cache
+        required: false
+        type: int
+        default: 0
+notes:
+  - >-
+    The modules return C(timings), per phase the count, seconds,
+    max_seconds, bytes and cumulative latency histogram buckets, e.g.
+    C({"http": {"count": 2, "seconds": 0.41, "max_seconds": 0.23,
+    "bytes": 18211, "buckets": {"0.25": 2, "+Inf": 2}}}).
+  - >-
+    The phases are requests to the web interface (http), the pauses
+    before them (throttle, retry), parsing the pages (parse), DNS queries
+    (dns) and waiting for changes (wait, sleep).
+"""
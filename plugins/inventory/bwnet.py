@@ -0,0 +1,166 @@
+# Copyright: (c) 2020, Eric Lavarde <ewl+bawue@lavar.de>
+# License: MIT
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+import re
+
+from ansible_collections.bawuenet.domainctl.plugins.plugin_utils import bwnet
+
+DOCUMENTATION = r"""
+---
+name: bwnet
+
+short_description: hosts from the address records of Bawue.Net zones
+
+version_added: "1.1.0"
+
+description:
+  - every owner of an A or AAAA record in the zones of the user becomes a
+    host, grouped by domain and by record type
+  - all zones are fetched concurrently; with O(cache) enabled the result
+    is kept in the inventory cache and repeated runs do not ask
+    my.bawue.net at all
+  - the configuration file name must end with bwnet.yml or bwnet.yaml
+
+options:
+    plugin:
+        description: token that ensures this is a source file for the plugin
+        required: true
+        choices: ["bawuenet.domainctl.bwnet"]
+    domains:
+        description: domains to read, all domains of the user if empty
+        required: false
+        type: list
+        elements: str
+        default: []
+    record_types:
+        description: record types whose owners become hosts
+        required: false
+        type: list
+        elements: str
+        choices: ["A", "AAAA"]
+        default: ["A", "AAAA"]
+    max_workers:
+        description: zones fetched at the same time
+        required: false
+        type: int
+        default: 8
+extends_documentation_fragment:
+    - bawuenet.domainctl.bwnet
+    - bawuenet.domainctl.bwnet.plugin
+    - constructed
+    - inventory_cache
+author:
+    - Eric Lavarde (@ericzolf)
+"""
+
+EXAMPLES = r"""
+# bawue.bwnet.yml
+plugin: bawuenet.domainctl.bwnet
+username: johndoe
+password: secret
+cache: true
+cache_plugin: ansible.builtin.jsonfile
+cache_connection: ~/.cache/ansible-inventory
+cache_timeout: 3600
+# hosts: www.example.com in the groups example_com and a (and aaaa),
+# with ansible_host set to the first address, bwnet_domain and
+# bwnet_addresses as variables
+keyed_groups:
+  - key: bwnet_domain.split('.')[-1]
+    prefix: tld
+"""
+
+from ansible.errors import AnsibleParserError  # noqa: E402
+from ansible.plugins.inventory import (  # noqa: E402
+    BaseInventoryPlugin,
+    Cacheable,
+    Constructable,
+)
+
+
+def group_name(name):
+    """An Ansible group name for a domain or record type"""
+    return re.sub(r"\W", "_", name.lower())
+
+
+class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
+    NAME = "bawuenet.domainctl.bwnet"
+
+    def verify_file(self, path):
+        return super(InventoryModule, self).verify_file(path) and path.endswith(
+            ("bwnet.yml", "bwnet.yaml")
+        )
+
+    def _fetch(self):
+        """The address records as {domain: [[owner, type, rr], ...]}"""
+        domainctl = bwnet.api_from_options(self)
+        types = self.get_option("record_types")
+        zones = {}
+        try:
+            domains = self.get_option("domains") or domainctl.get_domains()
+            for domain, headers, data in domainctl.get_all_domain_records(
+                domains, self.get_option("max_workers")
+            ):
+                columns = [
+                    headers.index(x) for x in ("Owner", "Type", "Ressource Record")
+                ]
+                zones[domain] = [
+                    [x[idx] for idx in columns] for x in data if x[columns[1]] in types
+                ]
+        except (RuntimeError, ValueError) as exc:
+            raise AnsibleParserError(f"Cannot read the zones: {exc}")
+        return zones
+
+    def _populate(self, zones):
+        strict = self.get_option("strict")
+        hosts = []
+        for domain in sorted(zones):
+            domain_group = self.inventory.add_group(group_name(domain))
+            for owner, dnstype, rr in zones[domain]:
+                if owner.startswith("*"):
+                    continue  # wildcards are no hosts
+                host = self.inventory.add_host(owner, group=domain_group)
+                if host not in hosts:
+                    hosts.append(host)
+                self.inventory.add_child(
+                    self.inventory.add_group(group_name(dnstype)), host
+                )
+                hostvars = self.inventory.get_host(host).get_vars()
+                addresses = hostvars.get("bwnet_addresses", {"A": [], "AAAA": []})
+                addresses[dnstype].append(rr)
+                self.inventory.set_variable(host, "bwnet_domain", domain)
+                self.inventory.set_variable(host, "bwnet_addresses", addresses)
+                self.inventory.set_variable(
+                    host, "ansible_host", (addresses["A"] or addresses["AAAA"])[0]
+                )
+        for host in hosts:
+            hostvars = self.inventory.get_host(host).get_vars()
+            self._set_composite_vars(self.get_option("compose"), hostvars, host, strict)
+            self._add_host_to_composed_groups(
+                self.get_option("groups"), hostvars, host, strict
+            )
+            self._add_host_to_keyed_groups(
+                self.get_option("keyed_groups"), hostvars, host, strict
+            )
+
+    def parse(self, inventory, loader, path, cache=True):
+        super(InventoryModule, self).parse(inventory, loader, path, cache)
+        self._read_config_data(path)
+
+        cache_key = self.get_cache_key(path)
+        # cache is False when the inventory is to be refreshed (--flush-cache)
+        use_cache = self.get_option("cache") and cache
+        update_cache = self.get_option("cache") and not cache
+        zones = None
+        if use_cache:
+            try:
+                zones = self._cache[cache_key]
+            except KeyError:
+                update_cache = True
+        if zones is None:
+            zones = self._fetch()
+        if update_cache:
+            self._cache[cache_key] = zones
+        self._populate(zones)
@@ -0,0 +1,64 @@
+# Copyright: (c) 2020, Eric Lavarde <ewl+bawue@lavar.de>
+# License: MIT
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+from ansible_collections.bawuenet.domainctl.plugins.plugin_utils import bwnet
+
+DOCUMENTATION = r"""
+---
+name: bwnet_domains
+
+short_description: get the domains owned by a user on the controller
+
+version_added: "1.1.0"
+
+description:
+  - returns the names of the DNS domains owned by the user, as
+    bwnet_domains_info does
+  - runs on the controller and fetches the list only once per task (and
+    its loop), shared with the bwnet_records lookup
+  - takes no terms
+
+options:
+    data:
+        description: return a dict with more data per domain instead of the name
+        required: false
+        type: bool
+        default: false
+extends_documentation_fragment:
+    - bawuenet.domainctl.bwnet
+    - bawuenet.domainctl.bwnet.plugin
+author:
+    - Eric Lavarde (@ericzolf)
+"""
+
+EXAMPLES = r"""
+- name: list John Doe's domains
+  ansible.builtin.debug:
+    msg: "{{ query('bawuenet.domainctl.bwnet_domains',
+                   username='johndoe', password='secret') }}"
+"""
+
+RETURN = r"""
+_list:
+    description: names of the domains, or dicts with data about them
+    type: list
+    sample: ["example.com", "example.org"]
+"""
+
+from ansible.errors import AnsibleLookupError  # noqa: E402
+from ansible.plugins.lookup import LookupBase  # noqa: E402
+
+
+class LookupModule(LookupBase):
+    def run(self, terms, variables=None, **kwargs):
+        self.set_options(var_options=variables, direct=kwargs)
+        domainctl = bwnet.api_from_options(self)
+        try:
+            if self.get_option("data"):
+                headers, data = domainctl.get_domain_data()
+                return [dict(zip(headers, x)) for x in data]
+            return domainctl.get_domains()
+        except RuntimeError as exc:
+            raise AnsibleLookupError(exc.args[0])
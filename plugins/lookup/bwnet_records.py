@@ -0,0 +1,103 @@
+# Copyright: (c) 2020, Eric Lavarde <ewl+bawue@lavar.de>
+# License: MIT
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+from ansible_collections.bawuenet.domainctl.plugins.plugin_utils import bwnet
+
+DOCUMENTATION = r"""
+---
+name: bwnet_records
+
+short_description: get the records of domains on the controller
+
+version_added: "1.1.0"
+
+description:
+  - returns for every domain the list of its DNS records, as
+    bwnet_records_info does
+  - runs on the controller and keeps one connection per account; within
+    a task (and its loop) each zone is fetched only once, many domains
+    concurrently
+  - use O(cache_ttl) to share the zones with later tasks
+
+options:
+    _terms:
+        description: names of the domains
+        required: true
+        type: list
+        elements: str
+    max_workers:
+        description: zones fetched at the same time
+        required: false
+        type: int
+        default: 8
+    refresh:
+        description: fetch the zones again, e.g. after changing them
+        required: false
+        type: bool
+        default: false
+extends_documentation_fragment:
+    - bawuenet.domainctl.bwnet
+    - bawuenet.domainctl.bwnet.plugin
+author:
+    - Eric Lavarde (@ericzolf)
+"""
+
+EXAMPLES = r"""
+- name: get the records of all domains of John Doe
+  vars:
+    domains: "{{ lookup('bawuenet.domainctl.bwnet_domains',
+                        username='johndoe', password='secret') }}"
+  ansible.builtin.set_fact:
+    __records: "{{ dict(domains | zip(query('bawuenet.domainctl.bwnet_records',
+                   *domains, username='johndoe', password='secret'))) }}"
+"""
+
+RETURN = r"""
+_list:
+    description: per domain a list of DNS records
+    type: list
+    elements: list
+    sample: [
+            [
+                {
+                    "Class": "IN",
+                    "Owner": "test.example.com",
+                    "Ressource Record": "192.2.0.1",
+                    "Type": "A",
+                    "metadata": {
+                        "Domainname": "example.com",
+                        "action": "domain-dns-admin-del-zone-entry",
+                        "null": "Eintrag löschen",
+                        "zoneentryid": "1234"
+                    }
+                }
+            ]
+        ]
+"""
+
+from ansible.errors import AnsibleLookupError  # noqa: E402
+from ansible.plugins.lookup import LookupBase  # noqa: E402
+
+
+class LookupModule(LookupBase):
+    def run(self, terms, variables=None, **kwargs):
+        self.set_options(var_options=variables, direct=kwargs)
+        domainctl = bwnet.api_from_options(self)
+        wanted = list(dict.fromkeys(terms))
+        try:
+            domains = domainctl.get_domains()
+            for domain in wanted:
+                if domain not in domains:
+                    raise AnsibleLookupError(f"Domain {domain} does not belong to user")
+                if self.get_option("refresh"):
+                    domainctl._forget_zone(domain)
+            zones = {}
+            for domain, headers, data in domainctl.get_all_domain_records(
+                wanted, self.get_option("max_workers")
+            ):
+                zones[domain] = [dict(zip(headers, x)) for x in data]
+        except RuntimeError as exc:
+            raise AnsibleLookupError(exc.args[0])
+        return [zones[domain] for domain in terms]
@@ -0,0 +1,48 @@
+# Copyright: (c) 2020, Eric Lavarde <ewl+bawue@lavar.de>
+# License: MIT
+#
+# Shared by the modules: the options of the bawuenet.domainctl.bwnet doc
+# fragment and the DomainsAPI they configure.
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+from bawuenet.domains import DomainsAPI
+from bawuenet.domains.cache import Cache, default_cache_dir
+from bawuenet.domains.throttle import Throttle, default_throttle_dir
+
+
+def argument_spec():
+    """The argument spec of the account and request options"""
+    return dict(
+        username=dict(type="str", required=True),
+        password=dict(type="str", required=True, no_log=True),
+        cache_ttl=dict(type="int", required=False, default=0),
+        rate_limit=dict(type="float", required=False, default=0),
+        max_concurrent=dict(type="int", required=False, default=0),
+    )
+
+
+def api_from_params(params, timings=None):
+    """A DomainsAPI for the account and request options of a module
+
+    The cache and the limits are kept on disk and shared with the other
+    forks and runs, as a module runs in a new process for every task.
+    """
+    cache = None
+    if params["cache_ttl"] > 0:
+        cache = Cache(params["cache_ttl"], default_cache_dir())
+    throttle = None
+    if params["rate_limit"] > 0 or params["max_concurrent"] > 0:
+        throttle = Throttle(
+            params["rate_limit"],
+            max_concurrent=params["max_concurrent"],
+            path=default_throttle_dir(),
+        )
+    return DomainsAPI(
+        params["username"],
+        params["password"],
+        cache=cache,
+        timings=timings,
+        throttle=throttle,
+    )
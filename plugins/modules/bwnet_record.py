@@ -5,7 +5,8 @@
 from __future__ import absolute_import, division, print_function
 
 __metaclass__ = type
-from bawuenet.domains import DomainsAPI
+from ansible_collections.bawuenet.domainctl.plugins.module_utils import bwnet
+from bawuenet.domains.timings import Timings
 
 DOCUMENTATION = r"""
 ---
@@ -18,14 +19,6 @@ version_added: "1.0.0"
 description: remove or add a given DNS record from a given domain
 
 options:
-    username:
-        description: name of the user
-        required: true
-        type: str
-    password:
-        description: password of the user
-        required: true
-        type: str
     domain:
         description: name of the domain for which records are to be shown
         required: true
@@ -55,7 +48,14 @@ options:
         required: false
         type: bool
         default: false
-
+    wait_timeout:
+        description: seconds to wait for the action to have taken effect
+        required: false
+        type: int
+        default: 660
+extends_documentation_fragment:
+    - bawuenet.domainctl.bwnet
+    - bawuenet.domainctl.bwnet.module
 author:
     - Eric Lavarde (@ericzolf)
 """
@@ -75,6 +75,10 @@ EXAMPLES = r"""
 """
 
 RETURN = r"""
+timings:
+    description: time spent per phase, see the notes
+    type: dict
+    returned: always
 """
 
 from ansible.module_utils.basic import AnsibleModule  # noqa: E402
@@ -82,9 +86,8 @@ from ansible.module_utils.basic import AnsibleModule  # noqa: E402
 
 def run_module():
     # define available arguments/parameters a user can pass to the module
-    module_args = dict(
-        username=dict(type="str", required=True),
-        password=dict(type="str", required=True, no_log=True),
+    module_args = bwnet.argument_spec()
+    module_args.update(
         domain=dict(type="str", required=True),
         host=dict(type="str", required=True),
         rr=dict(type="str", required=True),
@@ -93,6 +96,7 @@ def run_module():
             type="str", required=False, default="present", choices=["absent", "present"]
         ),
         wait=dict(type="bool", required=False, default=False),
+        wait_timeout=dict(type="int", required=False, default=660),
     )
 
     # seed the result dict in the object
@@ -109,15 +113,21 @@ def run_module():
     # args/params passed to the execution, as well as if the module
     # supports check mode
     module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+    # time spent per phase, returned as timings
+    timings = Timings()
 
     # manipulate or modify the state as needed (this is going to be the
     # part where your module will do what it needs to do)
     try:
-        domainctl = DomainsAPI(module.params["username"], module.params["password"])
+        domainctl = bwnet.api_from_params(module.params, timings)
         domains = domainctl.get_domains()
         domain = module.params["domain"]
         if domain not in domains:
             module.fail_json(f"Domain {domain} does not belong to user")
+        serial = None
+        if module.params["wait"]:
+            # remember the zone's serial to notice the update early
+            serial = domainctl.get_soa_serial(domain)
         if module.params["state"] == "present":
             ret = domainctl.add_record(
                 domain,
@@ -137,6 +147,7 @@ def run_module():
 
     if ret is None:
         # nothing changed
+        result["timings"] = timings.as_dict()
         module.exit_json(**result)
     result["changed"] = True
     if module.params["wait"]:
@@ -146,6 +157,8 @@ def run_module():
                 module.params["host"],
                 module.params["type"],
                 module.params["rr"],
+                serial,
+                module.params["wait_timeout"],
             )
         else:
             domainctl.wait_for_remove_record(
@@ -153,9 +166,12 @@ def run_module():
                 module.params["host"],
                 module.params["type"],
                 module.params["rr"],
+                serial,
+                module.params["wait_timeout"],
             )
     # in the event of a successful module execution, you will want to
     # simple AnsibleModule.exit_json(), passing the key/value results
+    result["timings"] = timings.as_dict()
     module.exit_json(**result)
 
 
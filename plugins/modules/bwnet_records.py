@@ -0,0 +1,239 @@
+#!/usr/bin/python
+
+# License: MIT
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+from ansible_collections.bawuenet.domainctl.plugins.module_utils import bwnet
+from bawuenet.domains import DomainsAPI
+from bawuenet.domains.timings import Timings
+
+DOCUMENTATION = r"""
+---
+module: bwnet_records
+
+short_description: make sure that a list of DNS records exists (or not) in a domain
+
+version_added: "1.1.0"
+
+description:
+  - add and remove a list of DNS records in a given domain in one run
+  - the zone is fetched only once and only the missing or superfluous
+    records are changed
+
+options:
+    domain:
+        description: name of the domain whose records are managed
+        required: true
+        type: str
+    records:
+        description: list of records
+        required: true
+        type: list
+        elements: dict
+        suboptions:
+            host:
+                description: short name of the host
+                required: true
+                type: str
+            type:
+                description: type of the record
+                required: true
+                type: str
+                choices:
+                  - A
+                  - CNAME
+                  - MX
+                  - TXT
+                  - AAAA
+                  - NS
+                  - SRV
+            rr:
+                description: resource record content
+                required: true
+                type: str
+            state:
+                description: shall the record be present or absent?
+                required: false
+                type: str
+                default: "present"
+                choices:
+                  - present
+                  - absent
+    exclusive:
+        description: remove all records of the domain which are not listed as present
+        required: false
+        type: bool
+        default: false
+    wait:
+        description: wait for the changes to have taken effect?
+        required: false
+        type: bool
+        default: false
+    wait_timeout:
+        description: seconds to wait for the changes to have taken effect
+        required: false
+        type: int
+        default: 660
+extends_documentation_fragment:
+    - bawuenet.domainctl.bwnet
+    - bawuenet.domainctl.bwnet.module
+author:
+    - Eric Lavarde (@ericzolf)
+"""
+
+EXAMPLES = r"""
+# manage the mail records of a domain
+- name: set John Doe's mail records
+  bawunet.domainctl.bwnet_records:
+    username: johndoe
+    password: secret
+    domain: example.com
+    records:
+      - host: mail
+        type: A
+        rr: 192.0.2.25
+      - host: mail
+        type: TXT
+        rr: '"v=spf1 mx -all"'
+      - host: oldmail
+        type: A
+        rr: 192.0.2.26
+        state: absent
+"""
+
+RETURN = r"""
+changes:
+    description: list of records which were (or in check mode would be) added or removed
+    type: list
+    returned: always
+    sample: [
+            {
+                "host": "oldmail",
+                "rr": "192.0.2.26",
+                "state": "absent",
+                "type": "A"
+            }
+        ]
+timings:
+    description: time spent per phase, see the notes
+    type: dict
+    returned: always
+"""
+
+from ansible.module_utils.basic import AnsibleModule  # noqa: E402
+
+
+def zone_lines(zone):
+    """Render a zone as sorted text lines for the diff"""
+    return sorted(f"{x.owner} {x.type} {x.rr}" for x in zone)
+
+
+def run_module():
+    # define available arguments/parameters a user can pass to the module
+    module_args = bwnet.argument_spec()
+    module_args.update(
+        domain=dict(type="str", required=True),
+        records=dict(
+            type="list",
+            required=True,
+            elements="dict",
+            options=dict(
+                host=dict(type="str", required=True),
+                type=dict(
+                    type="str", required=True, choices=list(DomainsAPI.type_table)
+                ),
+                rr=dict(type="str", required=True),
+                state=dict(
+                    type="str",
+                    required=False,
+                    default="present",
+                    choices=["absent", "present"],
+                ),
+            ),
+        ),
+        exclusive=dict(type="bool", required=False, default=False),
+        wait=dict(type="bool", required=False, default=False),
+        wait_timeout=dict(type="int", required=False, default=660),
+    )
+
+    # seed the result dict in the object
+    # we primarily care about changed and state
+    # changed is if this module effectively modified the target
+    # state will include any data that you want your module to pass back
+    # for consumption, for example, in a subsequent task
+    result = dict(
+        changed=False,
+        changes=[],
+    )
+
+    # the AnsibleModule object will be our abstraction working with Ansible
+    # this includes instantiation, a couple of common attr would be the
+    # args/params passed to the execution, as well as if the module
+    # supports check mode
+    module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+    # time spent per phase, returned as timings
+    timings = Timings()
+
+    # manipulate or modify the state as needed (this is going to be the
+    # part where your module will do what it needs to do)
+    try:
+        domainctl = bwnet.api_from_params(module.params, timings)
+        domains = domainctl.get_domains()
+        domain = module.params["domain"]
+        if domain not in domains:
+            module.fail_json(f"Domain {domain} does not belong to user")
+        # fetch the zone only once for the diff and the changes
+        zone = domainctl.get_zone(domain)
+        changes = domainctl.diff_records(
+            domain, module.params["records"], module.params["exclusive"], zone
+        )
+        result["changes"] = changes
+        result["changed"] = bool(changes)
+        if module._diff:
+            before = zone_lines(zone)
+            after = set(before)
+            for change in changes:
+                line = "%s %s %s" % (
+                    domainctl.fullhost(change["host"], domain),
+                    change["type"],
+                    change["rr"],
+                )
+                if change["state"] == "present":
+                    after.add(line)
+                else:
+                    after.discard(line)
+            result["diff"] = dict(
+                before="\n".join(before) + "\n",
+                after="\n".join(sorted(after)) + "\n",
+            )
+        if changes and not module.check_mode:
+            serial = None
+            if module.params["wait"]:
+                # remember the zone's serial to notice the update early
+                serial = domainctl.get_soa_serial(domain)
+            domainctl.apply_changes(domain, changes, zone)
+            if module.params["wait"]:
+                domainctl.wait_for_records(
+                    [
+                        (domain, x["host"], x["type"], x["rr"], x["state"])
+                        for x in changes
+                    ],
+                    {domain: serial},
+                    module.params["wait_timeout"],
+                )
+    except RuntimeError as exc:
+        module.fail_json(exc.args[0])
+
+    # in the event of a successful module execution, you will want to
+    # simple AnsibleModule.exit_json(), passing the key/value results
+    result["timings"] = timings.as_dict()
+    module.exit_json(**result)
+
+
+def main():
+    run_module()
+
+
+if __name__ == "__main__":
+    main()
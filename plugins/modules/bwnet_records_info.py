@@ -5,7 +5,8 @@
 from __future__ import absolute_import, division, print_function
 
 __metaclass__ = type
-from bawuenet.domains import DomainsAPI
+from ansible_collections.bawuenet.domainctl.plugins.module_utils import bwnet
+from bawuenet.domains.timings import Timings
 
 DOCUMENTATION = r"""
 ---
@@ -18,18 +19,13 @@ version_added: "1.0.0"
 description: returns a list of DNS records pertaining to a domain
 
 options:
-    username:
-        description: name of the user
-        required: true
-        type: str
-    password:
-        description: password of the user
-        required: true
-        type: str
     domain:
         description: name of the domain for which records are to be shown
         required: true
         type: str
+extends_documentation_fragment:
+    - bawuenet.domainctl.bwnet
+    - bawuenet.domainctl.bwnet.module
 author:
     - Eric Lavarde (@ericzolf)
 """
@@ -63,6 +59,10 @@ records:
                 }
             }
         ]
+timings:
+    description: time spent per phase, see the notes
+    type: dict
+    returned: always
 """
 
 from ansible.module_utils.basic import AnsibleModule  # noqa: E402
@@ -70,9 +70,8 @@ from ansible.module_utils.basic import AnsibleModule  # noqa: E402
 
 def run_module():
     # define available arguments/parameters a user can pass to the module
-    module_args = dict(
-        username=dict(type="str", required=True),
-        password=dict(type="str", required=True, no_log=True),
+    module_args = bwnet.argument_spec()
+    module_args.update(
         domain=dict(type="str", required=True),
     )
 
@@ -91,11 +90,13 @@ def run_module():
     # args/params passed to the execution, as well as if the module
     # supports check mode
     module = AnsibleModule(argument_spec=module_args, supports_check_mode=True)
+    # time spent per phase, returned as timings
+    timings = Timings()
 
     # manipulate or modify the state as needed (this is going to be the
     # part where your module will do what it needs to do)
     try:
-        domainctl = DomainsAPI(module.params["username"], module.params["password"])
+        domainctl = bwnet.api_from_params(module.params, timings)
         domains = domainctl.get_domains()
         domain = module.params["domain"]
         if domain not in domains:
@@ -107,6 +108,7 @@ def run_module():
 
     # in the event of a successful module execution, you will want to
     # simple AnsibleModule.exit_json(), passing the key/value results
+    result["timings"] = timings.as_dict()
     module.exit_json(**result)
 
 
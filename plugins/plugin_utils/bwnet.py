@@ -0,0 +1,57 @@
+# Copyright: (c) 2020, Eric Lavarde <ewl+bawue@lavar.de>
+# License: MIT
+#
+# Shared by the plugins running on the controller: they keep one DomainsAPI
+# per account in the process instead of logging in and fetching the pages
+# again for every term and loop item.
+from __future__ import absolute_import, division, print_function
+
+__metaclass__ = type
+
+import threading
+
+from bawuenet.domains import DomainsAPI
+from bawuenet.domains.cache import Cache, default_cache_dir
+from bawuenet.domains.throttle import Throttle, default_throttle_dir
+
+_apis = {}
+_lock = threading.Lock()
+
+
+def get_api(username, password, cache_ttl=0, rate_limit=0, max_concurrent=0):
+    """The DomainsAPI of an account, created once per controller process
+
+    Its cache keeps every page fetched as long as the process lives, or for
+    cache_ttl seconds on disk, shared with other processes, the modules
+    and domainctl.py.
+    """
+    key = (username, password, cache_ttl, rate_limit, max_concurrent)
+    with _lock:
+        api = _apis.get(key)
+        if api is None:
+            if cache_ttl > 0:
+                cache = Cache(cache_ttl, default_cache_dir())
+            else:
+                cache = Cache(float("inf"))
+            throttle = None
+            if rate_limit > 0 or max_concurrent > 0:
+                throttle = Throttle(
+                    rate_limit,
+                    max_concurrent=max_concurrent,
+                    path=default_throttle_dir(),
+                )
+            api = _apis[key] = DomainsAPI(
+                username, password, cache=cache, throttle=throttle
+            )
+        return api
+
+
+def api_from_options(plugin):
+    """get_api() with the options of the bawuenet.domainctl.bwnet fragment"""
+    return get_api(
+        plugin.get_option("username"),
+        plugin.get_option("password"),
+        plugin.get_option("cache_ttl"),
+        plugin.get_option("rate_limit"),
+        plugin.get_option("max_concurrent"),
+    )
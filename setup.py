@@ -38,7 +38,8 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     install_requires=install_requires,
+    extras_require={"lxml": ["lxml"], "async": ["aiohttp"]},
 #    packages=["bawuenet"],
-    scripts=["domainctl.py"],
+    scripts=["domainctl.py", "domainctl_acme.py"],
     #    test_suite="certbot_dns_bawuenet",
 )
@@ -0,0 +1,71 @@
+#
+# Shared fixtures: the local stand-in for my.bawue.net from benchmarks
+#
+# This code is licensed for use and distribution under the GPLv3+
+#
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from bawuenet.domains import DomainsAPI  # noqa: E402
+from standin import Standin  # noqa: E402
+
+
+@pytest.fixture
+def standin():
+    """A stand-in web interface and name server without any domain"""
+    with Standin(0, 0) as s:
+        yield s
+
+
+@pytest.fixture
+def api(standin):
+    """A DomainsAPI talking to the stand-in, without cache"""
+    api = standin.configure(DomainsAPI("user", "secret"))
+    api.poll_schedule = (0.01, 2, 0.1)
+    yield api
+    if api._session is not None:
+        api._session.close()
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """The actions of all requests sent to the web interface"""
+    actions = []
+    get = DomainsAPI._get
+
+    def _get(self, params=None, *args, **kwargs):
+        actions.append((params or {}).get("action", "list"))
+        return get(self, params, *args, **kwargs)
+
+    monkeypatch.setattr(DomainsAPI, "_get", _get)
+    return actions
+
+
+@pytest.fixture
+def domainctl(standin, monkeypatch, capsys):
+    """Run domainctl.py against the stand-in, returns exit code, stdout, stderr"""
+    import domainctl
+
+    monkeypatch.setattr(DomainsAPI, "base_url", standin.base_url)
+    monkeypatch.setattr(DomainsAPI, "auth_ns", standin.dns.server_address[0])
+    monkeypatch.setattr(DomainsAPI, "auth_ns_port", standin.dns.server_address[1])
+
+    def run(*args):
+        argv = ["domainctl.py", "--username=user", "--password=secret", "--no-cache"]
+        monkeypatch.setattr(sys, "argv", argv + list(args))
+        try:
+            domainctl.main()
+            code = 0
+        except SystemExit as exc:
+            code = exc.code
+        captured = capsys.readouterr()
+        return code, captured.out, captured.err
+
+    return run
@@ -0,0 +1,109 @@
+import pytest
+from standin import Standin
+
+from bawuenet.domains import DomainsAPI
+from bawuenet.domains.accounts import Accounts, read_accounts
+from bawuenet.domains.cache import Cache
+
+
+@pytest.fixture
+def standins():
+    """A stand-in per account, the one of "broken" fails every request"""
+    with Standin(0, 0) as alice, Standin(0, 0) as bob:
+        with Standin(0, 0, errors=1.0) as broken:
+            alice.state.add_domain("alice.example")
+            alice.state.add_record("alice.example", "www.alice.example", "A", "1.1.1.1")
+            bob.state.add_domain("bob.example")
+            bob.state.add_record("bob.example", "www.bob.example", "A", "2.2.2.2")
+            broken.state.add_domain("broken.example")
+            yield {"alice": alice, "bob": bob, "broken": broken}
+
+
+@pytest.fixture
+def credentials(tmp_path):
+    filename = tmp_path / "credentials.ini"
+    filename.write_text(
+        "".join(
+            f"[{x}]\nusername = {x}\npassword = secret\n"
+            for x in ("alice", "bob", "broken")
+        )
+    )
+    return str(filename)
+
+
+def factory(standins, cache=None):
+    def make_api(username, password):
+        api = standins[username].configure(DomainsAPI(username, password, cache=cache))
+        api.retries = 0
+        return api
+
+    return make_api
+
+
+def test_read_accounts(credentials, tmp_path):
+    assert read_accounts(credentials) == {
+        "alice": ("alice", "secret"),
+        "bob": ("bob", "secret"),
+        "broken": ("broken", "secret"),
+    }
+    with pytest.raises(RuntimeError):
+        read_accounts(str(tmp_path / "missing.ini"))
+    (tmp_path / "bad.ini").write_text("[x]\nusername = x\n")
+    with pytest.raises(RuntimeError):
+        read_accounts(str(tmp_path / "bad.ini"))
+
+
+def test_map_isolates_the_accounts(standins, credentials):
+    accounts = Accounts(read_accounts(credentials), factory(standins))
+    results = accounts.map(lambda api: api.get_domains())
+    assert [x[:2] for x in results] == [
+        ("alice", ["alice.example"]),
+        ("bob", ["bob.example"]),
+        ("broken", None),
+    ]
+    assert isinstance(results[2][2], RuntimeError)
+    assert accounts.find("bob.example") == ("bob", accounts.apis["bob"])
+    assert accounts.find("other.example") == (None, None)
+
+
+def test_cache_is_kept_per_account(standins, tmp_path):
+    # both accounts have a domain of the same name
+    for standin in (standins["alice"], standins["bob"]):
+        standin.state.add_domain("shared.example")
+    standins["bob"].state.add_record(
+        "shared.example", "bob.shared.example", "A", "2.2.2.2"
+    )
+    cache = Cache(60, str(tmp_path / "cache"))
+    make_api = factory(standins, cache)
+    alice, bob = make_api("alice", "secret"), make_api("bob", "secret")
+    assert alice.get_domain_records("shared.example")[1] == []
+    assert len(bob.get_domain_records("shared.example")[1]) == 1
+    assert cache.get("alice", "zone:shared.example")[1] == []
+    assert len(cache.get("bob", "zone:shared.example")[1]) == 1
+    assert alice.get_domain_records("shared.example")[1] == []
+
+
+def test_sweep_accounts(standins, credentials, domainctl, monkeypatch):
+    class Routed(DomainsAPI):
+        """A DomainsAPI for the stand-in of its account"""
+
+        def __init__(self, username, *args, **kwargs):
+            super().__init__(username, *args, **kwargs)
+            standins[username].configure(self)
+
+    monkeypatch.setattr("domainctl.DomainsAPI", Routed)
+    code, out, err = domainctl(
+        f"--credentials={credentials}",
+        "--account=ALL",
+        "--domain=ALL",
+        "--retries=0",
+        "list_records",
+    )
+    # the failing account is reported, the others are listed all the same
+    assert code == 1
+    assert "broken" in err
+    rows = [x.split() for x in out.splitlines()[2:]]
+    assert [x[:2] + x[-1:] for x in rows] == [
+        ["alice", "alice.example", "1.1.1.1"],
+        ["bob", "bob.example", "2.2.2.2"],
+    ]
@@ -0,0 +1,58 @@
+import domainctl_acme
+from bawuenet.domains.acme import group_challenges
+
+
+def acme_records(standin, domain):
+    return sorted(
+        (owner, rr)
+        for owner, dnstype, rr in standin.state.zones[domain].values()
+        if owner.startswith("_acme-challenge")
+    )
+
+
+def test_group_challenges_quotes_the_token():
+    grouped = group_challenges([("www.example.com", "abc")], ["example.com"])
+    assert grouped == {
+        "example.com": [
+            {
+                "host": "_acme-challenge.www",
+                "type": "TXT",
+                "rr": '"abc"',
+                "state": "present",
+            }
+        ]
+    }
+
+
+def test_dehydrated_round_trip(standin, api):
+    standin.state.add_domain("example.com")
+    args = ["example.com", "f1", "tok1", "*.example.com", "f2", "tok2"]
+    domainctl_acme.dehydrated(api, ["deploy_challenge"] + args, True, 5)
+    assert acme_records(standin, "example.com") == [
+        ("_acme-challenge.example.com", '"tok1"'),
+        ("_acme-challenge.example.com", '"tok2"'),
+    ]
+    # a repeated deploy recognises the records as existing
+    domainctl_acme.dehydrated(api, ["deploy_challenge"] + args, True, 5)
+    assert len(acme_records(standin, "example.com")) == 2
+    domainctl_acme.dehydrated(api, ["clean_challenge"] + args, True, 5)
+    assert acme_records(standin, "example.com") == []
+
+
+def test_certbot_round_trip(standin, api, monkeypatch, tmp_path):
+    standin.state.add_domain("example.org")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setenv("CERTBOT_ALL_DOMAINS", "example.org,www.example.org")
+    challenges = [("example.org", "tokA"), ("www.example.org", "tokB")]
+    for hook in ("auth", "cleanup"):
+        for remaining, (name, token) in zip((1, 0), challenges):
+            monkeypatch.setenv("CERTBOT_DOMAIN", name)
+            monkeypatch.setenv("CERTBOT_VALIDATION", token)
+            monkeypatch.setenv("CERTBOT_REMAINING_CHALLENGES", str(remaining))
+            domainctl_acme.certbot(api, hook, True, 5)
+        if hook == "auth":
+            assert acme_records(standin, "example.org") == [
+                ("_acme-challenge.example.org", '"tokA"'),
+                ("_acme-challenge.www.example.org", '"tokB"'),
+            ]
+    assert acme_records(standin, "example.org") == []
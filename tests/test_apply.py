@@ -0,0 +1,121 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import yaml
+
+
+def records(standin, domain):
+    return sorted(standin.state.zones[domain].values())
+
+
+def test_apply_changes_fetches_the_zone_once(standin, api, sent):
+    standin.state.add_domain("example.com")
+    standin.state.add_record("example.com", "old.example.com", "A", "192.0.2.9")
+    changes = [
+        {"host": "www", "type": "A", "rr": "192.0.2.1"},
+        {"host": "www", "type": "A", "rr": "192.0.2.1"},
+        {"host": "@", "type": "TXT", "rr": '"v=spf1 -all"', "state": "present"},
+        {"host": "old", "type": "A", "rr": "192.0.2.9", "state": "absent"},
+        {"host": "gone", "type": "A", "rr": "192.0.2.8", "state": "absent"},
+    ]
+    assert api.apply_changes("example.com", changes) == [True, None, True, True, None]
+    assert records(standin, "example.com") == [
+        ("example.com", "TXT", '"v=spf1 -all"'),
+        ("www.example.com", "A", "192.0.2.1"),
+    ]
+    assert sent.count("edit") == 1
+
+
+@pytest.mark.parametrize(
+    "bad",
+    [
+        {"host": "x", "type": "BOGUS", "rr": "1"},
+        {"host": "x", "type": "A", "rr": "192.0.2.3", "state": "gone"},
+        {"host": "x", "type": "A"},
+        {"host": 2024, "type": "A", "rr": "192.0.2.3"},
+        {"host": "x", "type": "TXT", "rr": 12345},
+        "x A 192.0.2.3",
+    ],
+)
+def test_apply_changes_checks_all_changes_first(standin, api, sent, bad):
+    standin.state.add_domain("example.com")
+    changes = [{"host": "www", "type": "A", "rr": "192.0.2.1"}, bad]
+    with pytest.raises(RuntimeError):
+        api.apply_changes("example.com", changes)
+    assert sent == []
+    assert records(standin, "example.com") == []
+
+
+def test_apply_action(standin, domainctl, tmp_path):
+    standin.state.add_domain("example.com")
+    filename = tmp_path / "changes.yaml"
+    filename.write_text(yaml.safe_dump([{"host": "www", "type": "A", "rr": "1.2.3.4"}]))
+    code, out, err = domainctl("--domain=example.com", f"--changes={filename}", "apply")
+    assert code == 0
+    assert "True" in out
+    assert records(standin, "example.com") == [("www.example.com", "A", "1.2.3.4")]
+
+
+def test_apply_action_takes_numbers_as_strings(standin, domainctl, tmp_path):
+    standin.state.add_domain("example.com")
+    filename = tmp_path / "changes.yaml"
+    filename.write_text(
+        "- {host: 2024, type: A, rr: 1.2.3.4}\n- {host: x, type: TXT, rr: 12345}\n"
+    )
+    code, out, err = domainctl("--domain=example.com", f"--changes={filename}", "apply")
+    assert code == 0
+    assert records(standin, "example.com") == [
+        ("2024.example.com", "A", "1.2.3.4"),
+        ("x.example.com", "TXT", "12345"),
+    ]
+
+
+def test_apply_action_rejects_bad_changes(standin, domainctl, tmp_path):
+    standin.state.add_domain("example.com")
+    filename = tmp_path / "changes.yaml"
+    filename.write_text(
+        yaml.safe_dump(
+            [
+                {"host": "www", "type": "A", "rr": "1.2.3.4"},
+                {"host": "www", "type": "BOGUS", "rr": "x"},
+            ]
+        )
+    )
+    code, out, err = domainctl("--domain=example.com", f"--changes={filename}", "apply")
+    assert code == 1
+    assert "BOGUS" in err
+    assert records(standin, "example.com") == []
+
+
+@pytest.mark.parametrize("state", ["present", "absent"])
+def test_concurrent_changes_take_turns(standin, api, state):
+    standin.state.add_domain("example.com")
+    if state == "absent":
+        standin.state.add_record("example.com", "www.example.com", "A", "192.0.2.1")
+    api.get_zone("example.com")
+    standin.http.latency = 0.05
+    change = {"host": "www", "type": "A", "rr": "192.0.2.1", "state": state}
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [
+            executor.submit(api.apply_changes, "example.com", [change])
+            for x in range(4)
+        ]
+        results = [x.result() for x in futures]
+    assert sorted(results, key=str) == [[None], [None], [None], [True]]
+    assert len(records(standin, "example.com")) == (state == "present")
+
+
+def test_prune_action(standin, domainctl):
+    standin.state.add_domain("example.com")
+    for rr in ("192.0.2.1", "192.0.2.2", "192.0.2.3"):
+        standin.state.add_record("example.com", "tmp.example.com", "A", rr)
+    standin.state.add_record("example.com", "www.example.com", "A", "192.0.2.9")
+    code, out, err = domainctl(
+        "--domain=example.com", "--owner-glob=tmp", "--keep=1", "prune"
+    )
+    assert code == 0
+    assert out.count("deleted") == 2
+    assert records(standin, "example.com") == [
+        ("tmp.example.com", "A", "192.0.2.3"),
+        ("www.example.com", "A", "192.0.2.9"),
+    ]
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from bawuenet.domains.asyncapi import AsyncDomainsAPI
+from bawuenet.domains.cache import Cache
+from bawuenet.domains.journal import Journal
+from bawuenet.domains.throttle import Throttle
+
+
+@pytest.fixture
+def run(standin):
+    """Run a coroutine function with an AsyncDomainsAPI for the stand-in"""
+
+    def run(func, **kwargs):
+        async def main():
+            api = standin.configure(AsyncDomainsAPI("user", "secret", **kwargs))
+            api.poll_schedule = (0.01, 2, 0.1)
+            async with api:
+                return await func(api)
+
+        return asyncio.run(main())
+
+    return run
+
+
+def test_throttle(standin, run):
+    standin.state.add_domain("example.com")
+
+    async def fetch(api):
+        return await asyncio.gather(*(api.get_domains() for x in range(5)))
+
+    began = time.monotonic()
+    results = run(fetch, throttle=Throttle(rate=20, burst=1, max_concurrent=2))
+    assert results == [["example.com"]] * 5
+    assert time.monotonic() - began >= 0.15
+
+
+def test_apply_changes(standin, run):
+    standin.state.add_domain("example.com")
+    standin.state.add_record("example.com", "old.example.com", "A", "192.0.2.9")
+    changes = [
+        {"host": "www", "type": "A", "rr": "192.0.2.1"},
+        {"host": "www", "type": "A", "rr": "192.0.2.1"},
+        {"host": "old", "type": "A", "rr": "192.0.2.9", "state": "absent"},
+        {"host": "gone", "type": "A", "rr": "192.0.2.8", "state": "absent"},
+    ]
+
+    async def apply(api):
+        return await api.apply_changes("example.com", changes)
+
+    assert run(apply) == [True, None, True, None]
+    assert list(standin.state.zones["example.com"].values()) == [
+        ("www.example.com", "A", "192.0.2.1")
+    ]
+
+
+def test_concurrent_changes_take_turns(standin, run):
+    standin.state.add_domain("example.com")
+    change = {"host": "www", "type": "A", "rr": "192.0.2.1"}
+
+    async def apply(api):
+        return await asyncio.gather(
+            *(api.apply_changes("example.com", [change]) for x in range(3))
+        )
+
+    assert sorted(run(apply), key=str) == [[None], [None], [True]]
+    assert len(standin.state.zones["example.com"]) == 1
+
+
+def test_apply_and_wait(standin, run):
+    standin.state.add_domain("example.com")
+
+    async def apply(api):
+        await api.add_record("example.com", "www", "A", "192.0.2.1")
+        await api.wait_for_add_record("example.com", "www", "A", "192.0.2.1")
+        await api.remove_record("example.com", "www", "A", "192.0.2.1")
+        await api.wait_for_remove_record("example.com", "www", "A", "192.0.2.1")
+
+    run(apply)
+    assert standin.state.zones["example.com"] == {}
+
+
+def test_cache_is_used_from_threads(standin, run, tmp_path, monkeypatch):
+    standin.state.add_domain("example.com")
+    threads = set()
+    for name in ("get", "set", "invalidate"):
+        method = getattr(Cache, name)
+
+        def record(self, *args, method=method):
+            threads.add(threading.current_thread())
+            return method(self, *args)
+
+        monkeypatch.setattr(Cache, name, record)
+
+    async def apply(api):
+        await api.get_domains()
+        await api.add_record("example.com", "www", "A", "192.0.2.1")
+        await api.remove_record("example.com", "www", "A", "192.0.2.1")
+        return threading.current_thread()
+
+    loop_thread = run(apply, cache=Cache(60, str(tmp_path)))
+    assert threads and loop_thread not in threads
+
+
+def test_journal_is_used_from_threads(standin, run, tmp_path, monkeypatch):
+    standin.state.add_domain("example.com")
+    standin.state.add_record("example.com", "old.example.com", "A", "192.0.2.9")
+    threads = set()
+    for name in ("plan", "complete", "fail"):
+        method = getattr(Journal, name)
+
+        def record(self, *args, method=method):
+            threads.add(threading.current_thread())
+            return method(self, *args)
+
+        monkeypatch.setattr(Journal, name, record)
+
+    async def apply(api):
+        await api.apply_changes(
+            "example.com", [{"host": "www", "type": "A", "rr": "192.0.2.1"}]
+        )
+        zone = await api.get_zone("example.com")
+        (old,) = zone.find("old.example.com", "192.0.2.9")
+        assert await api.delete_records([("example.com", old.zoneentryid)]) == [None]
+        return threading.current_thread()
+
+    with Journal(str(tmp_path / "journal")) as journal:
+        loop_thread = run(apply, journal=journal)
+        assert len(journal.outstanding()) == 0
+    assert threads and loop_thread not in threads
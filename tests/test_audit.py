@@ -0,0 +1,66 @@
+import pytest
+from standin import Standin
+
+from bawuenet.domains.audit import audit_zone, audit_zones, transfer
+
+
+@pytest.fixture(params=[False, True], ids=["queries", "axfr"])
+def standin(request):
+    """The stand-in refusing zone transfers, or allowing them"""
+    with Standin(0, 0, axfr=request.param) as s:
+        s.state.add_domain("example.com")
+        s.state.add_record("example.com", "www.example.com", "A", "192.0.2.1")
+        s.state.add_record("example.com", "example.com", "MX", "10 mx.example.com.")
+        yield s
+
+
+def test_transfer(standin, api):
+    served = transfer(api.auth_ns, api.auth_ns_port, "example.com")
+    if standin.xfr is None:
+        assert served is None
+    else:
+        assert served == {
+            ("www.example.com", "A"): {"192.0.2.1"},
+            ("example.com", "MX"): {"10 mx"},
+        }
+
+
+def test_audit_zone_in_sync(standin, api):
+    assert audit_zone(api, "example.com", api.get_domain_records("example.com")) == []
+
+
+def test_audit_zone_differences(standin, api):
+    records = api.get_domain_records("example.com")
+    standin.state.add_record("example.com", "new.example.com", "A", "192.0.2.2")
+    zone = standin.state.zones["example.com"]
+    www = next(x for x, y in zone.items() if y[0] == "www.example.com")
+    standin.state.remove_record("example.com", www)
+    rows = audit_zone(api, "example.com", records)
+    missing = [api.auth_ns, "www.example.com", "A", "missing", "192.0.2.1", ""]
+    extra = [api.auth_ns, "new.example.com", "A", "extra", "", "192.0.2.2"]
+    # only a zone transfer shows records unknown to the web interface
+    assert rows == ([extra, missing] if standin.xfr else [missing])
+
+
+def test_audit_zones_keeps_the_order(standin, api):
+    for domain in ("b.example", "a.example"):
+        standin.state.add_domain(domain)
+        standin.state.add_record(domain, "www." + domain, "A", "192.0.2.9")
+    zones = [(x, api.get_domain_records(x)) for x in ("b.example", "a.example")]
+    standin.state.propagation = 60
+    standin.state.add_record("a.example", "new.a.example", "A", "192.0.2.1")
+    zones.append(("a.example", api.get_domain_records("a.example")))
+    results = audit_zones(api, zones)
+    assert [x for x, y in results] == ["b.example", "a.example", "a.example"]
+    assert [len(y) for x, y in results] == [0, 0, 1]
+
+
+def test_audit_action(standin, domainctl):
+    code, out, err = domainctl("--domain=ALL", "audit")
+    assert code == 0
+    # the web interface shows the change before the name server serves it
+    standin.state.propagation = 60
+    standin.state.add_record("example.com", "new.example.com", "A", "192.0.2.2")
+    code, out, err = domainctl("--domain=example.com", "audit")
+    assert code == 3
+    assert "new.example.com" in out and "missing" in out
@@ -0,0 +1,65 @@
+import pytest
+
+from bawuenet.domains.cache import Cache
+
+
+def test_get_set_invalidate(tmp_path):
+    cache = Cache(60, str(tmp_path))
+    assert cache.get("user", "domains") is None
+    cache.set("user", "domains", ["example.com"])
+    assert cache.get("user", "domains") == ["example.com"]
+    # another process sees the copy on disk
+    assert Cache(60, str(tmp_path)).get("user", "domains") == ["example.com"]
+    cache.invalidate("user", "domains")
+    assert cache.get("user", "domains") is None
+    assert Cache(60, str(tmp_path)).get("user", "domains") is None
+
+
+def test_disk_returns_the_type_set(tmp_path):
+    cache = Cache(60, str(tmp_path))
+    values = {
+        "domains": ["example.com"],
+        "zone:example.com": (["Owner"], [["www.example.com", {"zoneentryid": "1"}]]),
+    }
+    for key, value in values.items():
+        cache.set("user", key, value)
+        assert cache.get("user", key) == value
+        from_disk = Cache(60, str(tmp_path)).get("user", key)
+        assert from_disk == value and type(from_disk) is type(value)
+
+
+def test_expired(tmp_path):
+    cache = Cache(-1, str(tmp_path))
+    cache.set("user", "domains", ["example.com"])
+    assert cache.get("user", "domains") is None
+
+
+def test_failed_write_leaves_no_temporary_file(tmp_path):
+    cache = Cache(60, str(tmp_path))
+    with pytest.raises(TypeError):
+        cache.set("user", "domains", [object()])
+    assert [x.name for x in tmp_path.rglob("*.tmp")] == []
+    assert not list(tmp_path.rglob("*.json"))
+
+
+def test_changes_invalidate_the_cached_zone(standin, api, tmp_path):
+    standin.state.add_domain("example.com")
+    api.cache = Cache(60, str(tmp_path))
+
+    def cached():
+        """The cached records, in memory and on disk for other processes"""
+        zones = [
+            x.get("user", "zone:example.com")
+            for x in (api.cache, Cache(60, str(tmp_path)))
+        ]
+        return [None if x is None else [y[:4] for y in x[1]] for x in zones]
+
+    api.get_domain_records("example.com")
+    assert cached() == [[], []]
+    www = ["www.example.com", "IN", "A", "192.0.2.1"]
+    api.add_record("example.com", "www", "A", "192.0.2.1")
+    assert cached() in ([None, None], [[www], [www]])
+    assert [x[:4] for x in api.get_domain_records("example.com")[1]] == [www]
+    api.remove_record("example.com", "www", "A", "192.0.2.1")
+    assert cached() in ([None, None], [[], []])
+    assert api.get_domain_records("example.com")[1] == []
@@ -0,0 +1,81 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from bawuenet.domains.daemon import Coalescer, DaemonClient, DomainsServer
+
+
+@pytest.fixture
+def server(api, tmp_path):
+    """A DomainsServer for the stand-in API in a background thread"""
+    server = DomainsServer(str(tmp_path / "sock"), api)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_coalescer():
+    coalescer = Coalescer()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return len(calls)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(coalescer.do, "key", func) for x in range(4)]
+        started.wait()
+        time.sleep(0.2)  # let the others join the running call
+        release.set()
+        assert [x.result() for x in futures] == [1] * 4
+    assert coalescer.do("key", func) == 2
+
+
+def test_concurrent_identical_requests_are_fetched_once(standin, server, sent):
+    standin.state.add_domain("example.com")
+    standin.state.add_record("example.com", "www.example.com", "A", "192.0.2.1")
+    standin.http.latency = 0.3
+    client = DaemonClient(server.server_address)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(
+            executor.map(lambda x: client.get_domain_records("example.com"), range(4))
+        )
+    client.close()
+    assert all(x == results[0] for x in results)
+    assert results[0][1][0][:4] == ["www.example.com", "IN", "A", "192.0.2.1"]
+    assert sent.count("edit") == 1
+
+
+def test_changes_through_the_daemon(standin, server):
+    standin.state.add_domain("example.com")
+    client = DaemonClient(server.server_address)
+    change = {"host": "www", "type": "A", "rr": "192.0.2.1"}
+    assert client.apply_changes("example.com", [change]) == [True]
+    with pytest.raises(RuntimeError):
+        client.apply_changes("example.com", [dict(change, type="BOGUS")])
+    client.close()
+    assert list(standin.state.zones["example.com"].values()) == [
+        ("www.example.com", "A", "192.0.2.1")
+    ]
+
+
+def test_a_running_server_is_not_replaced(api, server):
+    with pytest.raises(RuntimeError):
+        DomainsServer(server.server_address, api)
+    client = DaemonClient(server.server_address)
+    assert client.get_domains() == []
+    client.close()
+
+
+def test_a_stale_socket_is_replaced(api, tmp_path):
+    path = str(tmp_path / "sock")
+    DomainsServer(path, api).socket.close()  # left behind without cleanup
+    server = DomainsServer(path, api)
+    server.server_close()
@@ -0,0 +1,59 @@
+def change(host, dnstype, rr, state="present"):
+    return {"host": host, "type": dnstype, "rr": rr, "state": state}
+
+
+def test_diff_records_only_returns_what_changes(standin, api):
+    standin.state.add_domain("example.com")
+    standin.state.add_record("example.com", "www.example.com", "A", "192.0.2.1")
+    standin.state.add_record("example.com", "example.com", "MX", "10 mx.example.com")
+    changes = [
+        change("www", "A", "192.0.2.1"),
+        change("www", "A", "192.0.2.2"),
+        change("@", "MX", "10 mx.example.com", "absent"),
+        change("old", "A", "192.0.2.9", "absent"),
+    ]
+    assert api.diff_records("example.com", changes) == [
+        change("www", "A", "192.0.2.2"),
+        change("@", "MX", "10 mx.example.com", "absent"),
+    ]
+
+
+def test_diff_records_takes_the_first_of_duplicates(standin, api):
+    standin.state.add_domain("example.com")
+    changes = [
+        change("www", "A", "192.0.2.1"),
+        change("www", "A", "192.0.2.1", "absent"),
+        change("www", "A", "192.0.2.1"),
+    ]
+    assert api.diff_records("example.com", changes) == [change("www", "A", "192.0.2.1")]
+
+
+def test_diff_records_exclusive_removes_the_rest(standin, api):
+    standin.state.add_domain("example.com")
+    standin.state.add_record("example.com", "www.example.com", "A", "192.0.2.1")
+    standin.state.add_record("example.com", "old.example.com", "A", "192.0.2.9")
+    standin.state.add_record("example.com", "example.com", "TXT", '"x"')
+    changes = [change("www", "A", "192.0.2.1"), change("new", "AAAA", "2001:db8::1")]
+    delta = api.diff_records("example.com", changes, exclusive=True)
+    assert delta[0] == change("new", "AAAA", "2001:db8::1")
+    assert sorted(delta[1:], key=lambda x: x["host"]) == [
+        change("@", "TXT", '"x"', "absent"),
+        change("old", "A", "192.0.2.9", "absent"),
+    ]
+
+
+def test_diff_records_exclusive_keeps_foreign_owners(standin, api, capsys):
+    standin.state.add_domain("example.com")
+    standin.state.add_record("example.com", "example.org", "A", "192.0.2.1")
+    assert api.diff_records("example.com", [], exclusive=True) == []
+    assert "example.org" in capsys.readouterr().err
+
+
+def test_diff_records_uses_the_snapshot(standin, api, sent):
+    standin.state.add_domain("example.com")
+    records = api.get_domain_records("example.com")
+    standin.state.add_record("example.com", "www.example.com", "A", "192.0.2.1")
+    del sent[:]
+    changes = [change("www", "A", "192.0.2.1")]
+    assert api.diff_records("example.com", changes, records=records) == changes
+    assert sent == []
@@ -0,0 +1,85 @@
+import json
+
+import yaml
+
+from bawuenet.domains.journal import Journal
+
+
+def entry(host):
+    return {"domain": "example.com", "host": host}
+
+
+def test_resume_skips_done_entries(tmp_path):
+    path = str(tmp_path / "journal")
+    with Journal(path) as journal:
+        assert journal.plan([entry("a"), entry("b")]) == [True, True]
+        journal.complete(entry("a"))
+        journal.fail(entry("b"), "failed")
+    with Journal(path) as journal:
+        assert journal.outstanding() == [entry("b")]
+        assert journal.plan([entry("a"), entry("b"), entry("c")]) == [
+            False,
+            True,
+            True,
+        ]
+        assert journal.skipped == 1
+        assert journal.outstanding() == [entry("b"), entry("c")]
+
+
+def test_line_cut_off(tmp_path):
+    path = tmp_path / "journal"
+    with Journal(str(path)) as journal:
+        journal.plan([entry("a")])
+        journal.complete(entry("a"))
+    path.write_text(path.read_text() + '{"event": "done", "ent')
+    with Journal(str(path)) as journal:
+        assert journal.plan([entry("a"), entry("b")]) == [False, True]
+    lines = path.read_text().splitlines()
+    assert json.loads(lines[-1])["entry"] == entry("b")
+
+
+def test_apply_changes_resumes(standin, api, sent, tmp_path):
+    standin.state.add_domain("example.com")
+    path = str(tmp_path / "journal")
+    changes = [
+        {"host": "www", "type": "A", "rr": "192.0.2.1"},
+        {"host": "mail", "type": "A", "rr": "192.0.2.2"},
+    ]
+    with Journal(path) as api.journal:
+        api.apply_changes("example.com", changes[:1])
+    del sent[:]
+    with Journal(path) as api.journal:
+        assert api.apply_changes("example.com", changes) == [None, True]
+        assert api.journal.skipped == 1
+    assert sent.count("domain-dns-admin-commit-zone-entry") == 1
+    with Journal(path) as api.journal:
+        del sent[:]
+        assert api.apply_changes("example.com", changes) == [None, None]
+    assert sent == []
+
+
+def test_apply_template_resume(standin, domainctl, tmp_path, monkeypatch):
+    # report and close the journals here, not when the tests exit
+    reports = []
+    monkeypatch.setattr("atexit.register", lambda *args: reports.append(args))
+
+    def report():
+        func, opened = reports.pop()
+        func(opened)
+
+    for domain in ("a.example", "b.example"):
+        standin.state.add_domain(domain)
+    template = tmp_path / "template.yaml"
+    template.write_text(yaml.safe_dump([{"host": "www", "type": "A", "rr": "1.2.3.4"}]))
+    journal = tmp_path / "journal"
+    args = ["--domain=a.example", f"--template={template}"]
+    code, out, err = domainctl(*args, f"--journal={journal}", "apply_template")
+    assert code == 0
+    report()
+    args[0] = "--domain=ALL"
+    code, out, err = domainctl(*args, f"--resume={journal}", "apply_template")
+    report()
+    assert code == 0
+    assert "a.example: übersprungen" in err
+    assert "b.example: 1 Änderungen" in err
+    assert "2 Domains: 1 geändert, 0 aktuell, 1 übersprungen, 0 mit Fehlern" in err
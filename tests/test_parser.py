@@ -0,0 +1,103 @@
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+from bawuenet.domains import DomainsAPI
+from bawuenet.domains import parser
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+BACKENDS = ["html.parser", "lxml"]
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def parse_bs4(page, formdata):
+    """The way DomainsAPI parsed pages before the streaming extractor"""
+    table = BeautifulSoup(page, "html.parser").find("table")
+    return DomainsAPI.parse_html_table(None, table, formdata)
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request):
+    if request.param == "lxml" and not parser.have_lxml():
+        pytest.skip("lxml is not installed")
+    return request.param
+
+
+@pytest.mark.parametrize(
+    "name,formdata", [("domains.html", False), ("zone.html", True)]
+)
+def test_extract_table_matches_beautifulsoup(backend, name, formdata):
+    page = fixture(name)
+    assert parser.extract_table(page, formdata, backend) == parse_bs4(page, formdata)
+
+
+def test_domains_page(backend):
+    headers, data = parser.extract_table(fixture("domains.html"), False, backend)
+    assert headers == [
+        "Domainname",
+        "Dienstname",
+        "Domain-Typ",
+        "Webserver",
+        "Mailserver",
+    ]
+    assert [x[0] for x in data] == ["example.com", "example.org", "müller-bäckerei.de"]
+    assert data[0][1:] == [
+        ".com Domainhosting",
+        "Automatischer Standard",
+        "virtweb02.bawue.net",
+        "Spamfilter",
+        "Bearbeiten",
+    ]
+
+
+def test_zone_page(backend):
+    headers, data, metadata = parser.extract_table(fixture("zone.html"), True, backend)
+    assert headers == ["Owner", "Class", "Type", "Ressource Record"]
+    assert len(data) == len(metadata) == 8
+    # the last cell, holding the delete form, is kept as an empty string
+    assert data[5] == ["_acme-challenge.example.com", "IN", "TXT", '"a<b & c>d"', ""]
+    assert data[6] == ["ftp.example.com", "IN", "CNAME", "www.example.com.", ""]
+    assert data[7][0] == "_sip._tcp.example.com"
+    assert metadata[0] == {
+        "Domainname": "example.com",
+        "zoneentryid": "101",
+        "action": "domain-dns-admin-del-zone-entry",
+        "null": "Eintrag löschen",
+    }
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 100, parser.CHUNK_SIZE])
+def test_iter_table_matches_extract_table(backend, chunk_size):
+    page = fixture("zone.html")
+    headers, data, metadata = parser.extract_table(page, True, backend)
+    # iter_table is fed from the start of the page, not of the table
+    chunks = [page[x : x + chunk_size] for x in range(0, len(page), chunk_size)]
+    rows = list(parser.iter_table(chunks, True, backend))
+    assert rows == [(headers, x, y) for x, y in zip(data, metadata)]
+
+
+@pytest.mark.parametrize(
+    "page",
+    [
+        "",
+        "<html><body><h1>401 Unauthorized</h1></body></html>",
+        "<html><body><form><input name='user'></form></body></html>",
+    ],
+)
+def test_page_without_table(backend, page):
+    with pytest.raises(parser.NoTableError):
+        parser.extract_table(page, True, backend)
+    with pytest.raises(parser.NoTableError):
+        list(parser.iter_table([page], True, backend))
+
+
+def test_zone_from_page_ignores_other_pages():
+    api = DomainsAPI("user", "secret")
+    assert api._zone_from_page("example.com", "<html>Fehler</html>") is None
+    zone = api._zone_from_page("example.com", fixture("zone.html"))
+    assert len(zone) == 8
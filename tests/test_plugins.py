@@ -0,0 +1,118 @@
+import os
+
+import pytest
+
+from bawuenet.domains import DomainsAPI
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session")
+def collections(tmp_path_factory):
+    """Let Ansible load the plugins of this collection from the tree"""
+    pytest.importorskip("ansible")
+    from ansible.plugins.loader import init_plugin_loader
+
+    path = tmp_path_factory.mktemp("collections")
+    namespace = path / "ansible_collections" / "bawuenet"
+    namespace.mkdir(parents=True)
+    (namespace / "domainctl").symlink_to(ROOT)
+    init_plugin_loader([str(path)])
+
+
+@pytest.fixture
+def controller(standin, collections, monkeypatch):
+    """The stand-in with two domains, a fresh DomainsAPI for the plugins"""
+    from ansible_collections.bawuenet.domainctl.plugins.plugin_utils import bwnet
+
+    monkeypatch.setattr(DomainsAPI, "base_url", standin.base_url)
+    monkeypatch.setattr(bwnet, "_apis", {})
+    standin.state.add_domain("example.com")
+    standin.state.add_record("example.com", "www.example.com", "A", "192.0.2.1")
+    standin.state.add_record("example.com", "www.example.com", "AAAA", "2001:db8::1")
+    standin.state.add_record("example.com", "example.com", "MX", "10 mx.example.com.")
+    standin.state.add_domain("example.org")
+    standin.state.add_record("example.org", "*.example.org", "A", "192.0.2.9")
+    return standin
+
+
+def lookup(name, *terms, **kwargs):
+    from ansible.plugins.loader import lookup_loader
+
+    plugin = lookup_loader.get("bawuenet.domainctl." + name)
+    return plugin.run(list(terms), {}, username="user", password="secret", **kwargs)
+
+
+def test_bwnet_domains(controller):
+    assert lookup("bwnet_domains") == ["example.com", "example.org"]
+    data = lookup("bwnet_domains", data=True)
+    assert len(data) == 2 and all(isinstance(x, dict) for x in data)
+
+
+def test_bwnet_records(controller, sent):
+    zones = lookup("bwnet_records", "example.org", "example.com", "example.org")
+    assert [[x["Owner"] for x in zone] for zone in zones] == [
+        ["*.example.org"],
+        ["www.example.com", "www.example.com", "example.com"],
+        ["*.example.org"],
+    ]
+    # the zones are fetched once per process, unless refreshed
+    lookup("bwnet_records", "example.com")
+    assert sent.count("edit") == 2
+    lookup("bwnet_records", "example.com", refresh=True)
+    assert sent.count("edit") == 3
+
+
+def test_bwnet_records_unknown_domain(controller):
+    from ansible.errors import AnsibleLookupError
+
+    with pytest.raises(AnsibleLookupError):
+        lookup("bwnet_records", "example.net")
+
+
+def inventory(path, config):
+    from ansible.inventory.manager import InventoryManager
+    from ansible.parsing.dataloader import DataLoader
+
+    source = path / "test.bwnet.yml"
+    source.write_text(
+        "plugin: bawuenet.domainctl.bwnet\nusername: user\npassword: secret\n" + config
+    )
+    return InventoryManager(loader=DataLoader(), sources=[str(source)])
+
+
+def test_bwnet_inventory(controller, tmp_path):
+    manager = inventory(
+        tmp_path,
+        "keyed_groups:\n  - key: bwnet_domain.split('.')[-1]\n    prefix: tld\n",
+    )
+    # wildcards and records other than A and AAAA are left out
+    assert [x.name for x in manager.get_hosts()] == ["www.example.com"]
+    host = manager.get_host("www.example.com")
+    assert host.vars["ansible_host"] == "192.0.2.1"
+    assert host.vars["bwnet_addresses"] == {"A": ["192.0.2.1"], "AAAA": ["2001:db8::1"]}
+    assert sorted(x.name for x in host.get_groups()) == [
+        "a",
+        "aaaa",
+        "all",
+        "example_com",
+        "tld_com",
+    ]
+
+
+def test_bwnet_inventory_cache(controller, tmp_path, sent, monkeypatch):
+    from ansible_collections.bawuenet.domainctl.plugins.plugin_utils import bwnet
+
+    config = (
+        "cache: true\n"
+        "cache_plugin: ansible.builtin.jsonfile\n"
+        f"cache_connection: {tmp_path / 'cache'}\n"
+    )
+    inventory(tmp_path, config)
+    fetched = sent.count("edit")
+    assert fetched == 2
+    # a new controller process, only the inventory cache is left
+    monkeypatch.setattr(bwnet, "_apis", {})
+    manager = inventory(tmp_path, config)
+    assert sent.count("edit") == fetched
+    assert [x.name for x in manager.get_hosts()] == ["www.example.com"]
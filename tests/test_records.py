@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+import time
+
+
+def add_domains(standin):
+    for domain in ("c.example", "a.example", "b.example"):
+        standin.state.add_domain(domain)
+        standin.state.add_record(domain, "www." + domain, "A", "192.0.2.1")
+        standin.state.add_record(domain, "www." + domain, "AAAA", "2001:db8::1")
+
+
+def test_iter_domain_records(standin, api):
+    add_domains(standin)
+    records = list(api.iter_domain_records("a.example"))
+    assert [(x["Owner"], x["Type"]) for x in records] == [
+        ("www.a.example", "A"),
+        ("www.a.example", "AAAA"),
+    ]
+    assert all(x["metadata"]["zoneentryid"] for x in records)
+
+
+def test_list_records_ndjson(standin, domainctl):
+    add_domains(standin)
+    code, out, err = domainctl("--domain=ALL", "--format=ndjson", "list_records")
+    assert code == 0
+    records = [json.loads(x) for x in out.splitlines()]
+    assert [(x["Domain"], x["Type"]) for x in records] == [
+        (domain, dnstype)
+        for domain in ("a.example", "b.example", "c.example")
+        for dnstype in ("A", "AAAA")
+    ]
+    assert "metadata" not in records[0]
+
+
+def test_list_records_csv(standin, domainctl):
+    add_domains(standin)
+    code, out, err = domainctl("--domain=b.example", "--format=csv", "list_records")
+    assert code == 0
+    rows = list(csv.reader(io.StringIO(out)))
+    assert rows[0][:3] == ["Owner", "Class", "Type"]
+    assert [x[2] for x in rows[1:]] == ["A", "AAAA"]
+
+
+def test_list_records_streams_zones_concurrently(standin, domainctl):
+    for idx in range(6):
+        standin.state.add_domain(f"example{idx}.de", 2)
+    standin.http.latency = 0.2
+    began = time.monotonic()
+    code, out, err = domainctl(
+        "--domain=ALL", "--format=ndjson", "--workers=6", "list_records"
+    )
+    assert code == 0
+    domains = [json.loads(x)["Domain"] for x in out.splitlines()]
+    assert domains == sorted(domains) and len(domains) == 12
+    # the login and the domain list, then all zones at once instead of 6 * 0.2
+    assert time.monotonic() - began < 1.2
@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from bawuenet.domains import DomainsAPI
+
+
+class Response:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.reason = "Status %d" % status_code
+        self.headers = headers or {}
+        self.content = b""
+        self.text = ""
+
+    def close(self):
+        pass
+
+
+class Session:
+    """Answers requests with the given responses, raising exceptions"""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.sent = []
+
+    def get(self, url, params=None, **kwargs):
+        self.sent.append((params or {}).get("action", "list"))
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+@pytest.fixture
+def pauses(monkeypatch):
+    """The seconds slept between repeated requests"""
+    slept = []
+    monkeypatch.setattr("bawuenet.domains.time.sleep", slept.append)
+    return slept
+
+
+def client(*answers):
+    api = DomainsAPI("user", "secret")
+    api.session = Session(*answers)
+    return api
+
+
+def test_reads_are_repeated(pauses):
+    api = client(
+        Response(502), requests.ReadTimeout(), requests.ConnectionError(), Response(200)
+    )
+    assert api._get().status_code == 200
+    assert len(api.session.sent) == 4
+    assert len(pauses) == 3
+
+
+def test_repeats_are_limited(pauses):
+    api = client(*[Response(503)] * 10)
+    assert api._get().status_code == 503
+    assert len(api.session.sent) == api.retries + 1
+    api = client(*[requests.ReadTimeout()] * 10)
+    with pytest.raises(RuntimeError):
+        api._get()
+    assert len(api.session.sent) == api.retries + 1
+
+
+def test_backoff_grows(pauses, monkeypatch):
+    monkeypatch.setattr("bawuenet.domains.random.uniform", lambda a, b: b)
+    api = client(*[Response(502)] * 10)
+    api.retry_backoff = (1, 5)
+    api._get()
+    assert pauses == [1, 2, 4, 5]
+
+
+def test_retry_after(pauses):
+    api = client(Response(429, {"Retry-After": "7"}), Response(200))
+    api.retry_backoff = (0.1, 0.1)
+    assert api._get().status_code == 200
+    assert pauses == [7]
+
+
+def test_other_errors_are_not_repeated(pauses):
+    api = client(Response(404))
+    assert api._get().status_code == 404
+    assert pauses == []
+
+
+def test_adds_are_not_repeated_after_a_read_timeout(pauses):
+    api = client(requests.ReadTimeout())
+    with pytest.raises(RuntimeError):
+        api._get(idempotent=False)
+    assert api.session.sent == ["list"]
+    api = client(Response(502))
+    assert api._get(idempotent=False).status_code == 502
+    assert pauses == []
+
+
+def test_adds_are_repeated_if_not_sent(pauses):
+    api = client(requests.ConnectTimeout(), Response(429), Response(200))
+    assert api._get(idempotent=False).status_code == 200
+    assert len(pauses) == 2
+
+
+def test_add_record_is_sent_once(standin, api, pauses):
+    standin.state.add_domain("example.com")
+    session = api.session
+    sent = []
+
+    def get(url, params=None, **kwargs):
+        sent.append((params or {}).get("action", "list"))
+        if sent[-1] == "domain-dns-admin-commit-zone-entry":
+            raise requests.ReadTimeout()
+        return session.get(url, params=params, **kwargs)
+
+    api.session = SimpleNamespace(get=get, close=session.close)
+    with pytest.raises(RuntimeError):
+        api.add_record("example.com", "www", "A", "192.0.2.1")
+    assert sent.count("domain-dns-admin-commit-zone-entry") == 1
+    assert standin.state.zones["example.com"] == {}
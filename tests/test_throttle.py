@@ -0,0 +1,73 @@
+import threading
+import time
+
+from bawuenet.domains.throttle import Throttle
+
+
+def run(throttles, count, hold=0.0):
+    """Take count slots in threads, return the seconds and the most at once"""
+    lock = threading.Lock()
+    running = [0, 0]
+
+    def work(throttle):
+        with throttle.slot():
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(hold)
+            with lock:
+                running[0] -= 1
+
+    began = time.monotonic()
+    threads = [
+        threading.Thread(target=work, args=(throttles[idx % len(throttles)],))
+        for idx in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.monotonic() - began, running[1]
+
+
+def test_no_limits():
+    throttle = Throttle()
+    seconds, most = run([throttle], 8, 0.1)
+    assert seconds < 0.5
+    assert most == 8
+
+
+def test_burst_then_rate():
+    throttle = Throttle(rate=20, burst=4)
+    seconds, most = run([throttle], 4)
+    assert seconds < 0.1
+    # the bucket is empty now, four more take 4 / 20 seconds
+    seconds, most = run([throttle], 4)
+    assert 0.15 <= seconds < 0.5
+
+
+def test_max_concurrent():
+    throttle = Throttle(max_concurrent=2)
+    seconds, most = run([throttle], 6, 0.1)
+    assert most == 2
+    assert seconds >= 0.3
+
+
+def test_rate_is_shared_through_the_path(tmp_path):
+    throttles = [Throttle(rate=20, burst=1, path=str(tmp_path)) for x in range(2)]
+    seconds, most = run(throttles, 5)
+    assert seconds >= 0.15
+
+
+def test_max_concurrent_is_shared_through_the_path(tmp_path):
+    throttles = [Throttle(max_concurrent=2, path=str(tmp_path)) for x in range(3)]
+    seconds, most = run(throttles, 6, 0.1)
+    assert most == 2
+    assert seconds >= 0.3
+
+
+def test_damaged_state(tmp_path):
+    (tmp_path / "bucket").write_text("garbage")
+    throttle = Throttle(rate=1, burst=2, path=str(tmp_path))
+    seconds, most = run([throttle], 2)
+    assert seconds < 0.5
@@ -0,0 +1,88 @@
+import json
+import re
+
+from bawuenet.domains.timings import BUCKETS, Timings
+
+# a sample line of the Prometheus text format: name{labels} value
+SAMPLE = re.compile(r'^([a-z_]+)\{((?:[a-z]+="[^"]*",?)+)\} ([0-9.e+-]+)$')
+
+
+def test_observe():
+    timings = Timings()
+    timings.observe("http", 0.02, 100)
+    timings.observe("http", 0.2, 50)
+    timings.observe("http", 100)
+    with timings.span("parse") as span:
+        span.bytes += 10
+    stats = timings.as_dict()
+    assert list(stats) == ["http", "parse"]
+    http = stats["http"]
+    assert (http["count"], http["max_seconds"], http["bytes"]) == (3, 100, 150)
+    assert http["buckets"]["0.025"] == 1
+    assert http["buckets"]["0.25"] == 2
+    assert http["buckets"]["60"] == 2
+    assert http["buckets"]["+Inf"] == 3
+    assert stats["parse"]["bytes"] == 10
+
+
+def test_api_spans(standin, api):
+    standin.state.add_domain("example.com")
+    api.timings = Timings()
+    api.add_record("example.com", "www", "A", "192.0.2.1")
+    api.wait_for_add_record("example.com", "www", "A", "192.0.2.1")
+    phases = api.timings.as_dict()
+    assert {"http", "parse", "dns"} <= set(phases)
+    assert phases["http"]["bytes"] > 0
+
+
+def test_prometheus_format():
+    timings = Timings()
+    timings.observe("http", 0.02, 100)
+    timings.observe("dns", 2)
+    text = timings.prometheus()
+    assert text.endswith("\n")
+    types = {}
+    samples = []
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            name, kind = line.split()[2:]
+            types[name] = kind
+        elif not line.startswith("# HELP "):
+            match = SAMPLE.match(line)
+            assert match, line
+            samples.append(match.groups())
+    assert types == {
+        "domainctl_phase_seconds": "histogram",
+        "domainctl_phase_bytes_total": "counter",
+    }
+    buckets = [
+        (labels, float(value))
+        for name, labels, value in samples
+        if name == "domainctl_phase_seconds_bucket" and 'phase="http"' in labels
+    ]
+    assert len(buckets) == len(BUCKETS) + 1
+    assert buckets[-1] == ('phase="http",le="+Inf"', 1)
+    # cumulative counts never decrease
+    assert [x[1] for x in buckets] == sorted(x[1] for x in buckets)
+    assert ("domainctl_phase_seconds_count", 'phase="dns"', "1") in samples
+    assert ("domainctl_phase_bytes_total", 'phase="http"', "100") in samples
+
+
+def test_timings_options(standin, domainctl, tmp_path, monkeypatch, capsys):
+    reports = []
+    monkeypatch.setattr("atexit.register", lambda *args: reports.append(args))
+    standin.state.add_domain("example.com")
+    prom, js = tmp_path / "timings.prom", tmp_path / "timings.json"
+    code, out, err = domainctl(
+        "--timings",
+        f"--timings-prom={prom}",
+        f"--timings-json={js}",
+        "list_domains",
+    )
+    assert code == 0
+    func, *args = reports.pop()
+    func(*args)
+    err = capsys.readouterr().err
+    assert "phase" in err and "http" in err and "parse" in err
+    assert 'domainctl_phase_seconds_count{phase="http"}' in prom.read_text()
+    assert json.loads(js.read_text())["http"]["count"] >= 1
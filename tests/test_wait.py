@@ -0,0 +1,81 @@
+import asyncio
+import json
+import time
+
+import pytest
+import yaml
+
+from bawuenet.domains import DomainsAPI
+from bawuenet.domains.asyncapi import AsyncDomainsAPI
+
+RECORD = ("example.com", "www", "A", "192.0.2.1", "present")
+
+
+@pytest.fixture
+def late(standin):
+    """A record published 1.2 seconds after it was added"""
+    standin.state.propagation = 1.2
+    standin.state.add_domain("example.com")
+    standin.state.add_record("example.com", "www.example.com", *RECORD[2:4])
+    return standin
+
+
+def test_wait_uses_the_whole_timeout(late, api):
+    # polls at 1s and 3s would miss a record published at 1.2s
+    api.poll_schedule = (1.0, 2, 10)
+    timings = api.wait_for_records([RECORD], timeout=1.6)
+    assert 1.2 <= timings[0] < 2
+
+
+def test_wait_ends_at_the_deadline(late, api):
+    api.poll_schedule = (0.3, 2, 10)
+    began = time.monotonic()
+    with pytest.raises(RuntimeError):
+        api.wait_for_records([RECORD], timeout=0.5)
+    assert 0.5 <= time.monotonic() - began < 0.8
+
+
+def test_async_wait_uses_the_whole_timeout(late):
+    async def wait():
+        async with late.configure(AsyncDomainsAPI("user", "secret")) as api:
+            api.poll_schedule = (1.0, 2, 10)
+            return await api.wait_for_records([RECORD], timeout=1.6)
+
+    timings = asyncio.run(wait())
+    assert 1.2 <= timings[0] < 2
+
+
+@pytest.fixture
+def quick(monkeypatch):
+    monkeypatch.setattr(DomainsAPI, "poll_schedule", (0.1, 2, 0.5))
+
+
+def test_wait_action_keeps_stdout_parsable(late, domainctl, quick):
+    host, dnstype, rr = RECORD[1:4]
+    code, out, err = domainctl(
+        "--domain=example.com",
+        f"--host={host}",
+        f"--type={dnstype}",
+        f"--rr={rr}",
+        "--format=json",
+        "wait",
+    )
+    assert code == 0
+    assert [x["host"] for x in json.loads(out)] == ["www"]
+    assert "Waiting for DNS change..." in err
+    assert "." in err
+
+
+def test_apply_wait_keeps_stdout_parsable(late, domainctl, quick, tmp_path):
+    filename = tmp_path / "changes.yaml"
+    filename.write_text(yaml.safe_dump([{"host": "ftp", "type": "A", "rr": "1.2.3.4"}]))
+    code, out, err = domainctl(
+        "--domain=example.com",
+        f"--changes={filename}",
+        "--format=ndjson",
+        "--wait",
+        "apply",
+    )
+    assert code == 0
+    assert [json.loads(x)["changed"] for x in out.splitlines()] == [True]
+    assert "Waiting for DNS change..." in err
@@ -0,0 +1,100 @@
+from bawuenet.domains.zone import Record, Zone
+
+HEADERS = ["Owner", "Class", "Type", "Ressource Record", "metadata"]
+
+
+def form(zoneentryid, domain="example.com"):
+    return {
+        "Domainname": domain,
+        "zoneentryid": zoneentryid,
+        "action": "domain-dns-admin-del-zone-entry",
+        "null": "Eintrag löschen",
+    }
+
+
+def table():
+    return [
+        ["www.example.com", "IN", "A", "192.0.2.1", "", form("1")],
+        ["www.example.com", "IN", "A", "192.0.2.2", "", form("2")],
+        ["www.example.com", "IN", "AAAA", "2001:db8::1", "", form("3")],
+        ["example.com", "IN", "TXT", '"v=spf1 -all"', "", form("4")],
+    ]
+
+
+def test_indexes():
+    zone = Zone.from_table("example.com", HEADERS, table())
+    assert len(zone) == 4
+    assert [x.rr for x in zone.lookup("www.example.com", "A")] == [
+        "192.0.2.1",
+        "192.0.2.2",
+    ]
+    assert zone.lookup("www.example.com", "MX") == []
+    assert [x.zoneentryid for x in zone.find("www.example.com", "192.0.2.2")] == ["2"]
+    assert zone.get("3").type == "AAAA"
+    assert zone.get("99") is None
+    assert ("example.com", '"v=spf1 -all"') in zone
+    assert ("example.com", "v=spf1 -all") not in zone
+
+
+def test_remove_updates_all_indexes():
+    zone = Zone.from_table("example.com", HEADERS, table())
+    zone.remove(zone.get("1"))
+    assert [x.rr for x in zone.lookup("www.example.com", "A")] == ["192.0.2.2"]
+    assert ("www.example.com", "192.0.2.1") not in zone
+    assert zone.get("1") is None
+    zone.remove(zone.get("2"))
+    assert zone.lookup("www.example.com", "A") == []
+    assert len(zone) == 2
+
+
+def test_add_without_id():
+    zone = Zone.from_table("example.com", HEADERS, table())
+    record = Record("new.example.com", "IN", "A", "192.0.2.9")
+    zone.add(record)
+    assert zone.find("new.example.com", "192.0.2.9") == [record]
+    assert zone.get(None) is None
+    zone.remove(record)
+    assert ("new.example.com", "192.0.2.9") not in zone
+
+
+def test_table_round_trip():
+    rows = table()
+    # a record whose delete form differs keeps its own metadata
+    rows[1][-1] = dict(form("2"), extra="x")
+    zone = Zone.from_table("example.com", HEADERS, rows)
+    headers, result = zone.as_table()
+    assert headers == HEADERS
+    assert [x[:4] for x in result] == [x[:4] for x in rows]
+    assert [x[-1] for x in result] == [x[-1] for x in rows]
+
+
+def test_from_snapshot_and_update():
+    zone = Zone.from_table("example.com", HEADERS, table())
+    assert Zone.from_snapshot("example.com", zone) is zone
+    newer = Zone.from_snapshot("example.com", (HEADERS, table()[:1]))
+    zone.update(newer)
+    assert len(zone) == 1
+    assert zone.get("4") is None
+
+
+def test_match():
+    zone = Zone.from_table("example.com", HEADERS, table())
+    assert [x.zoneentryid for x in zone.match("www")] == ["1", "2", "3"]
+    assert [x.zoneentryid for x in zone.match("w*", "A")] == ["1", "2"]
+    assert [x.zoneentryid for x in zone.match("@")] == ["4"]
+    assert zone.match("mail") == []
+
+
+def test_match_keeps_the_newest():
+    zone = Zone.from_table("example.com", HEADERS, table())
+    zone.add(Record("www.example.com", "IN", "A", "192.0.2.3", zoneentryid="10"))
+    assert [x.zoneentryid for x in zone.match("www", "A", keep=1)] == ["1", "2"]
+    assert [x.zoneentryid for x in zone.match("www", keep=1)] == ["1", "2"]
+    assert zone.match("www", "AAAA", keep=1) == []
+
+
+def test_match_skips_records_without_id():
+    zone = Zone.from_table("example.com", HEADERS, table())
+    zone.add(Record("new.example.com", "IN", "A", "192.0.2.5"))
+    assert zone.match("new") == []
+    assert len(zone.match()) == 4
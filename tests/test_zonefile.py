@@ -0,0 +1,167 @@
+import io
+
+from bawuenet.domains.zone import Record, Zone
+from bawuenet.domains.zonefile import read_zonefile, sync_changes, write_zonefile
+
+ZONEFILE = """\
+$ORIGIN example.com.
+$TTL 3600
+@ IN SOA ns1.bawue.net. hostmaster.bawue.net. 1 3600 600 86400 3600
+@ IN NS ns1.bawue.net.
+@ IN MX 10 mx
+@ IN TXT "v=spf1 -all"
+www IN A 192.0.2.1
+www IN AAAA 2001:db8::1
+ftp IN CNAME www
+sub IN NS ns.sub
+ns.sub IN A 192.0.2.53
+_sip._tcp IN SRV 10 5 5060 sip
+www IN HINFO "PC" "Linux"
+"""
+
+
+def change(host, dnstype, rr, state="present"):
+    return {"host": host, "type": dnstype, "rr": rr, "state": state}
+
+
+def zone(*records):
+    zone = Zone("example.com")
+    for idx, (owner, dnstype, rr) in enumerate(records):
+        zone.add(Record(owner, "IN", dnstype, rr, str(idx + 1)))
+    return zone
+
+
+def test_read_zonefile(capsys):
+    changes = read_zonefile(io.StringIO(ZONEFILE), "example.com")
+    assert sorted(changes, key=lambda x: (x["host"], x["type"])) == [
+        change("@", "MX", "10 mx.example.com."),
+        change("@", "TXT", '"v=spf1 -all"'),
+        change("_sip._tcp", "SRV", "10 5 5060 sip.example.com."),
+        change("ftp", "CNAME", "www.example.com."),
+        change("ns.sub", "A", "192.0.2.53"),
+        change("sub", "NS", "ns.sub.example.com."),
+        change("www", "A", "192.0.2.1"),
+        change("www", "AAAA", "2001:db8::1"),
+    ]
+    assert "HINFO" in capsys.readouterr().err
+
+
+def test_sync_changes_ignores_notation():
+    wanted = read_zonefile(io.StringIO(ZONEFILE), "example.com")
+    live = zone(
+        ("example.com", "MX", "10 mx.example.com."),
+        ("example.com", "TXT", '"v=spf1 -all"'),
+        ("_sip._tcp.example.com", "SRV", "10  5 5060  sip.example.com."),
+        ("FTP.example.com", "CNAME", "www.example.com."),
+        ("www.example.com", "AAAA", "2001:DB8:0::1"),
+        ("ns.sub.example.com", "A", "192.0.2.53"),
+        ("sub.example.com", "NS", "ns.sub.example.com."),
+        ("www.example.com", "A", "192.0.2.1"),
+    )
+    assert sync_changes("example.com", wanted, live, prune=True) == []
+
+
+def test_sync_changes_removes_first():
+    wanted = [change("www", "A", "192.0.2.2"), change("@", "TXT", '"new"')]
+    live = zone(
+        ("www.example.com", "A", "192.0.2.1"),
+        ("example.com", "TXT", '"old"'),
+        ("example.org", "A", "192.0.2.1"),
+    )
+    assert sync_changes("example.com", wanted, live) == [
+        change("@", "TXT", '"new"'),
+        change("www", "A", "192.0.2.2"),
+    ]
+    assert sync_changes("example.com", wanted, live, prune=True) == [
+        change("@", "TXT", '"old"', "absent"),
+        change("www", "A", "192.0.2.1", "absent"),
+        change("@", "TXT", '"new"'),
+        change("www", "A", "192.0.2.2"),
+    ]
+
+
+def test_sync_changes_accepts_a_table():
+    live = zone(("www.example.com", "A", "192.0.2.1"))
+    wanted = [change("www", "A", "192.0.2.1")]
+    assert sync_changes("example.com", wanted, live.as_table()) == []
+
+
+def test_sync_changes_keeps_soa_and_apex_ns():
+    live = zone(
+        (
+            "example.com",
+            "SOA",
+            "ns1.bawue.net. hostmaster.bawue.net. 1 3600 600 86400 3600",
+        ),
+        ("example.com", "NS", "ns1.bawue.net."),
+        ("sub.example.com", "NS", "ns.sub.example.com."),
+    )
+    assert sync_changes("example.com", [], live, prune=True) == [
+        change("sub", "NS", "ns.sub.example.com.", "absent")
+    ]
+
+
+def test_write_zonefile_round_trip():
+    live = zone(
+        ("example.com", "MX", "10 mx.example.com."),
+        ("example.com", "TXT", '"v=spf1 -all"'),
+        ("www.example.com", "A", "192.0.2.1"),
+    )
+    f = io.StringIO()
+    write_zonefile(f, "example.com", live)
+    f.seek(0)
+    wanted = read_zonefile(f, "example.com")
+    assert len(wanted) == 3
+    assert sync_changes("example.com", wanted, live, prune=True) == []
+
+
+def test_sync_action(standin, domainctl, tmp_path):
+    standin.state.add_domain("example.com")
+    standin.state.add_record("example.com", "www.example.com", "A", "192.0.2.9")
+    standin.state.add_record("example.com", "old.example.com", "A", "192.0.2.8")
+    filename = tmp_path / "example.com.zone"
+    filename.write_text(ZONEFILE)
+    code, out, err = domainctl(
+        "--domain=example.com", f"--zonefile={filename}", "--prune", "sync"
+    )
+    assert code == 0
+    zone = sorted(standin.state.zones["example.com"].values())
+    assert ("www.example.com", "A", "192.0.2.1") in zone
+    assert ("www.example.com", "A", "192.0.2.9") not in zone
+    assert ("old.example.com", "A", "192.0.2.8") not in zone
+    assert len(zone) == 8
+    code, out, err = domainctl(
+        "--domain=example.com", f"--zonefile={filename}", "--prune", "sync"
+    )
+    assert code == 0
+    assert "True" not in out
+
+
+def test_sync_action_reads_stdin(standin, domainctl, monkeypatch):
+    standin.state.add_domain("example.com")
+    monkeypatch.setattr("sys.stdin", io.StringIO(ZONEFILE))
+    code, out, err = domainctl("--domain=example.com", "--zonefile=-", "sync")
+    assert code == 0
+    assert len(standin.state.zones["example.com"]) == 8
+
+
+def test_export_action(standin, domainctl, tmp_path):
+    standin.state.add_domain("example.com")
+    standin.state.add_record("example.com", "www.example.com", "A", "192.0.2.1")
+    standin.state.add_record("example.com", "example.com", "MX", "10 mx.example.com.")
+    code, out, err = domainctl("--domain=example.com", "--zonefile=-", "export")
+    assert code == 0
+    assert out.startswith("$ORIGIN example.com.\n")
+    wanted = read_zonefile(io.StringIO(out), "example.com")
+    assert sorted(wanted, key=lambda x: x["type"]) == [
+        change("www", "A", "192.0.2.1"),
+        change("@", "MX", "10 mx.example.com."),
+    ]
+    filename = tmp_path / "example.com.zone"
+    code, out, err = domainctl(
+        "--domain=example.com", f"--zonefile={filename}", "export"
+    )
+    assert code == 0
+    assert out == ""
+    with open(filename) as f:
+        assert read_zonefile(f, "example.com") == wanted